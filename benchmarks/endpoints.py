@@ -0,0 +1,321 @@
+"""
+Latency and throughput benchmarks for every endpoint in ``users.urls``,
+``donor.urls``, ``hospital.urls`` and ``blood_request.urls``.
+
+    python benchmarks/endpoints.py run [--scales 1000,10000,100000] [--transports test,wsgi]
+                                       [--iterations N] [--concurrency N] [--only name,...]
+                                       [--output results.json] [--baseline baseline.json]
+    python benchmarks/endpoints.py compare baseline.json results.json [--threshold 0.2]
+
+``run`` creates (or with ``--keepdb`` reuses) a separate ``<DB_NAME>_bench``
+database, and for each scale seeds that many donors with ``manage.py seed``
+and times each scenario from ``benchmarks/scenarios.py``:
+
+  - ``test``: through the Django test client, in process and sequentially, so
+    the numbers are the cost of the view, middleware and SQL alone;
+  - ``wsgi``: over HTTP against Django's threaded WSGI server on a local port,
+    with ``--concurrency`` client threads, adding request parsing and sockets.
+
+Per endpoint it records p50/p95/p99/mean latency in milliseconds, requests
+per second and the number of responses with an unexpected status, and writes
+them as JSON. ``compare`` (or ``run --baseline``) flags every latency
+percentile that grew, or throughput that fell, by more than ``--threshold``
+relative to the baseline and exits with status 1 if there is any.
+
+Outgoing email goes to the dummy backend, geocoding stays offline, candidate
+matching runs inline and the hospital rate limits are lifted for the run.
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'raktseva.settings')
+
+TRANSPORTS = ['test', 'wsgi']
+LATENCY_METRICS = ['p50_ms', 'p95_ms', 'p99_ms']
+
+
+def percentile(samples, pct):
+    return samples[min(len(samples) - 1, int(len(samples) * pct / 100))]
+
+
+def summarize(latencies, statuses, expected_status, elapsed):
+    samples = sorted(seconds * 1000 for seconds in latencies)
+    return {
+        'n': len(samples),
+        'p50_ms': round(percentile(samples, 50), 3),
+        'p95_ms': round(percentile(samples, 95), 3),
+        'p99_ms': round(percentile(samples, 99), 3),
+        'mean_ms': round(statistics.mean(samples), 3),
+        'rps': round(len(samples) / elapsed, 1),
+        'errors': sum(status != expected_status for status in statuses),
+    }
+
+
+def compare(baseline, current, threshold=0.2, min_delta_ms=1.0):
+    """
+    Regressions of ``current`` against ``baseline`` (both ``run`` outputs):
+    a latency percentile more than ``threshold`` (and ``min_delta_ms``) above
+    the baseline, throughput more than ``threshold`` below it, or errors where
+    the baseline had none. Endpoints missing from either side are skipped.
+    """
+    regressions = []
+    for scale, transports in current['results'].items():
+        for transport, endpoints in transports.items():
+            for name, now in endpoints.items():
+                before = baseline['results'].get(scale, {}).get(transport, {}).get(name)
+                if before is None:
+                    continue
+                where = {'scale': scale, 'transport': transport, 'endpoint': name}
+                for metric in LATENCY_METRICS:
+                    if now[metric] > before[metric] * (1 + threshold) and now[metric] - before[metric] >= min_delta_ms:
+                        regressions.append({**where, 'metric': metric, 'baseline': before[metric],
+                                            'current': now[metric]})
+                if now['rps'] < before['rps'] / (1 + threshold):
+                    regressions.append({**where, 'metric': 'rps', 'baseline': before['rps'], 'current': now['rps']})
+                if now['errors'] and not before['errors']:
+                    regressions.append({**where, 'metric': 'errors', 'baseline': 0, 'current': now['errors']})
+    return regressions
+
+
+def report_regressions(regressions, threshold):
+    if not regressions:
+        print(f"No regressions beyond {threshold:.0%}.")
+        return 0
+    print(f"{len(regressions)} regression(s) beyond {threshold:.0%}:")
+    for item in regressions:
+        change = f"{item['current'] / item['baseline'] - 1:+.0%}" if item['baseline'] else 'new'
+        print(f"  donors={item['scale']} {item['transport']:4} {item['endpoint']:26} {item['metric']:7} "
+              f"{item['baseline']:>10} -> {item['current']:<10} ({change})")
+    return 1
+
+
+class ClientTransport:
+    name = 'test'
+
+    def __init__(self, ctx):
+        from django.test import Client
+        self.client = Client()
+        self.ctx = ctx
+
+    def request(self, scenario, call):
+        headers = {'HTTP_AUTHORIZATION': f"Bearer {self.ctx.token(call.user)}"} if call.user else {}
+        data = json.dumps(call.data) if call.data is not None else ''
+        return self.client.generic(scenario.method.upper(), call.path, data,
+                                   content_type='application/json', **headers).status_code
+
+    def close(self):
+        pass
+
+
+class WSGITransport:
+    name = 'wsgi'
+
+    def __init__(self, ctx):
+        import requests
+        from wsgiref.simple_server import WSGIRequestHandler, make_server
+        from django.core.servers.basehttp import ThreadedWSGIServer
+        from django.core.wsgi import get_wsgi_application
+
+        class QuietHandler(WSGIRequestHandler):
+            def log_message(self, *args):
+                pass
+
+        self.ctx = ctx
+        self.requests = requests
+        self.local = threading.local()
+        self.server = make_server('127.0.0.1', 0, get_wsgi_application(),
+                                  server_class=ThreadedWSGIServer, handler_class=QuietHandler)
+        self.base_url = f"http://127.0.0.1:{self.server.server_port}"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def request(self, scenario, call):
+        session = getattr(self.local, 'session', None)
+        if session is None:
+            session = self.local.session = self.requests.Session()
+        headers = {'Authorization': f"Bearer {self.ctx.token(call.user)}"} if call.user else {}
+        response = session.request(scenario.method, self.base_url + call.path, json=call.data, headers=headers)
+        return response.status_code
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def measure(scenario, transport, ctx, iterations, warmup, concurrency):
+    from benchmarks.scenarios import resolve
+
+    calls = [resolve(scenario, ctx) for _ in range(warmup + iterations)]
+    for call in calls:
+        if call.user:
+            ctx.token(call.user)
+    for call in calls[:warmup]:
+        transport.request(scenario, call)
+
+    def timed(call):
+        started = time.perf_counter()
+        status = transport.request(scenario, call)
+        return time.perf_counter() - started, status
+
+    started = time.perf_counter()
+    if concurrency > 1:
+        with ThreadPoolExecutor(concurrency) as pool:
+            results = list(pool.map(timed, calls[warmup:]))
+    else:
+        results = [timed(call) for call in calls[warmup:]]
+    elapsed = time.perf_counter() - started
+    latencies, statuses = zip(*results)
+    return summarize(latencies, statuses, scenario.expected_status, elapsed)
+
+
+def benchmark_settings():
+    from django.conf import settings
+    from django.test.utils import override_settings
+    return override_settings(
+        DEBUG=False,
+        ALLOWED_HOSTS=['*'],
+        EMAIL_BACKEND='django.core.mail.backends.dummy.EmailBackend',
+        GEOCODING_OFFLINE=True,
+        CANDIDATE_MATCHING_ASYNC=False,
+        HOSPITAL_RATE_LIMITS={scope: (10 ** 9, 10 ** 9) for scope in settings.HOSPITAL_RATE_LIMITS},
+    )
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_scale(donors, args, scenarios):
+    from django.core.management import call_command
+    from benchmarks.scenarios import BenchContext
+
+    started = time.monotonic()
+    call_command('seed', donors=donors, seed=args.seed, flush=True, stdout=io.StringIO())
+    print(f"\ndonors={donors}: seeded in {time.monotonic() - started:.1f}s")
+    ctx = BenchContext()
+    results = {}
+    for transport_class in (t for t in (ClientTransport, WSGITransport) if t.name in args.transports):
+        transport = transport_class(ctx)
+        concurrency = args.concurrency if transport.name == 'wsgi' else 1
+        results[transport.name] = {}
+        print(f"  {transport.name} (concurrency {concurrency})")
+        print(f"    {'endpoint':26} {'p50':>8} {'p95':>8} {'p99':>8} {'req/s':>8} errors")
+        try:
+            for scenario in scenarios:
+                stats = measure(scenario, transport, ctx, args.iterations, args.warmup, concurrency)
+                results[transport.name][scenario.name] = stats
+                print(f"    {scenario.name:26} {stats['p50_ms']:8.2f} {stats['p95_ms']:8.2f} "
+                      f"{stats['p99_ms']:8.2f} {stats['rps']:8.1f} {stats['errors']}")
+        finally:
+            transport.close()
+    return results
+
+
+def run(args):
+    import django
+    django.setup()
+    from django.db import connection
+    from benchmarks.scenarios import SCENARIOS
+
+    scenarios = [s for s in SCENARIOS if not args.only or s.name in args.only]
+    unknown = set(args.only or []) - {s.name for s in SCENARIOS}
+    if unknown:
+        sys.exit(f"Unknown endpoint(s): {', '.join(sorted(unknown))}")
+
+    connection.settings_dict['TEST']['NAME'] = f"{connection.settings_dict['NAME']}_bench"
+    connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=args.keepdb)
+    output = {
+        'meta': {
+            'created_at': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'git_revision': git_revision(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'postgres': connection.pg_version,
+            'iterations': args.iterations,
+            'warmup': args.warmup,
+            'concurrency': args.concurrency,
+            'seed': args.seed,
+        },
+        'results': {},
+    }
+    try:
+        with benchmark_settings():
+            for donors in args.scales:
+                output['results'][str(donors)] = run_scale(donors, args, scenarios)
+    finally:
+        if not args.keepdb:
+            connection.creation.destroy_test_db(connection.settings_dict['NAME'], verbosity=0)
+
+    with open(args.output, 'w') as fh:
+        json.dump(output, fh, indent=2)
+    print(f"\nWrote {args.output}")
+    if args.baseline:
+        with open(args.baseline) as fh:
+            return report_regressions(compare(json.load(fh), output, args.threshold, args.min_delta_ms),
+                                      args.threshold)
+    return 0
+
+
+def compare_files(args):
+    with open(args.baseline) as fh:
+        baseline = json.load(fh)
+    with open(args.current) as fh:
+        current = json.load(fh)
+    return report_regressions(compare(baseline, current, args.threshold, args.min_delta_ms), args.threshold)
+
+
+def comma_list(cast):
+    return lambda value: [cast(item) for item in value.split(',') if item]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = commands.add_parser('run', help='Seed, benchmark and write a results file.')
+    run_parser.add_argument('--scales', type=comma_list(int), default=[1000, 10000, 100000],
+                            help='Comma-separated donor counts to seed, one run per scale.')
+    run_parser.add_argument('--transports', type=comma_list(str), default=TRANSPORTS)
+    run_parser.add_argument('--iterations', type=int, default=200)
+    run_parser.add_argument('--warmup', type=int, default=10)
+    run_parser.add_argument('--concurrency', type=int, default=4, help='Client threads for the wsgi transport.')
+    run_parser.add_argument('--only', type=comma_list(str), help='Comma-separated URL names to benchmark.')
+    run_parser.add_argument('--seed', type=int, default=42)
+    run_parser.add_argument('--keepdb', action='store_true', help='Reuse and keep the benchmark database.')
+    run_parser.add_argument('--output', default='endpoint-benchmarks.json')
+    run_parser.add_argument('--baseline', help='Compare the results against this file.')
+    run_parser.set_defaults(handler=run)
+
+    compare_parser = commands.add_parser('compare', help='Compare a results file against a baseline.')
+    compare_parser.add_argument('baseline')
+    compare_parser.add_argument('current')
+    compare_parser.set_defaults(handler=compare_files)
+
+    for sub in (run_parser, compare_parser):
+        sub.add_argument('--threshold', type=float, default=0.2,
+                         help='Allowed relative slowdown before flagging a regression (0.2 = 20%%).')
+        sub.add_argument('--min-delta-ms', type=float, default=1.0,
+                         help='Ignore latency increases smaller than this many milliseconds.')
+
+    args = parser.parse_args()
+    if args.command == 'run' and set(args.transports) - set(TRANSPORTS):
+        parser.error(f"--transports must be drawn from {', '.join(TRANSPORTS)}")
+    sys.exit(args.handler(args))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,181 @@
+"""
+Fan-out benchmark for the new-request donor stream (``available/stream/``).
+
+    python benchmarks/fanout.py [--subscribers 5000,50000] [--events 2000] [--radius 25]
+                                [--city-mode 0.1] [--seed 42] [--output fanout-benchmarks.json]
+
+For each subscriber count it registers that many simulated donor streams with
+``blood_request.events.request_broker``'s routing (no sockets, no LISTEN
+connection), placed like ``manage.py seed`` places donors: Zipf-weighted
+canonical cities, jittered around the centre, Indian blood group
+frequencies, with ``--city-mode`` of them searching by city instead of
+radius. It then publishes ``--events`` new-request events from the same
+distribution and records, per event, the publish time and how many streams
+received it, next to a linear scan over every subscriber (the cost of a
+broadcast-and-filter design) for a sample of the events.
+
+The index should keep publish time proportional to the streams that
+receive the event: going from 5k to 50k subscribers multiplies both by
+about ten, while the scan grows with the total. Only the City table is read,
+so any migrated database will do.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'raktseva.settings')
+
+SCAN_SAMPLE = 200
+
+
+def percentile(samples, pct):
+    return samples[min(len(samples) - 1, int(len(samples) * pct / 100))]
+
+
+def micros(samples):
+    samples = sorted(seconds * 1e6 for seconds in samples)
+    return {
+        'p50_us': round(percentile(samples, 50), 1),
+        'p95_us': round(percentile(samples, 95), 1),
+        'p99_us': round(percentile(samples, 99), 1),
+        'mean_us': round(statistics.mean(samples), 1),
+    }
+
+
+class Population:
+    """Random donors and requests distributed like the seeded dataset."""
+
+    def __init__(self, seed, city_mode):
+        from city.models import City
+        from raktseva.seeding import BLOOD_GROUP_FREQUENCIES, LOCATION_JITTER_DEG
+
+        self.random = random.Random(seed)
+        self.city_mode = city_mode
+        self.jitter = LOCATION_JITTER_DEG
+        self.cities = list(City.objects.filter(latitude__isnull=False).order_by('id'))
+        if not self.cities:
+            sys.exit("No cities with coordinates; run the migrations first.")
+        self.city_weights = [1 / rank for rank in range(1, len(self.cities) + 1)]
+        self.blood_groups = list(BLOOD_GROUP_FREQUENCIES)
+        self.blood_group_weights = list(BLOOD_GROUP_FREQUENCIES.values())
+
+    def place(self):
+        city = self.random.choices(self.cities, self.city_weights)[0]
+        lat = city.latitude + self.random.uniform(-self.jitter, self.jitter)
+        lon = city.longitude + self.random.uniform(-self.jitter, self.jitter)
+        return city, lat, lon
+
+    def blood_group(self):
+        return self.random.choices(self.blood_groups, self.blood_group_weights)[0]
+
+    def donor(self):
+        from types import SimpleNamespace
+
+        city, lat, lon = self.place()
+        if self.random.random() < self.city_mode:
+            lat = lon = None
+        return SimpleNamespace(blood_group=self.blood_group(), latitude=lat, longitude=lon,
+                               canonical_city_id=city.id, city=city.name)
+
+    def request_event(self, event_id):
+        from blood_request.utils import cell_key
+
+        city, lat, lon = self.place()
+        return {'id': event_id, 'blood_group': self.blood_group(), 'latitude': lat, 'longitude': lon,
+                'cell': cell_key(lat, lon), 'canonical_city': city.id, 'city': city.name}
+
+
+def run_scale(count, args):
+    from blood_request.events import donor_subscription, request_keys
+    from raktseva.broker import Broker, Subscription
+
+    population = Population(args.seed, args.city_mode)
+    broker = Broker('fanout-benchmark', route=request_keys)
+    subscriptions = []
+    started = time.perf_counter()
+    for _ in range(count):
+        keys, accept = donor_subscription(population.donor(), args.radius)
+        # Unbounded, so every delivery is a plain put; a real stream drains its queue as it goes.
+        subscriptions.append(broker.add(Subscription(keys, 0, accept)))
+    subscribe_seconds = time.perf_counter() - started
+
+    events = [population.request_event(n) for n in range(args.events)]
+    publish, delivered = [], []
+    for event in events:
+        started = time.perf_counter()
+        delivered.append(broker.publish(event))
+        publish.append(time.perf_counter() - started)
+
+    scan = []
+    for event in events[:SCAN_SAMPLE]:
+        keys = set(request_keys(event))
+        started = time.perf_counter()
+        sum(1 for subscription in subscriptions
+            if keys.intersection(subscription.keys) and (subscription.accept is None or subscription.accept(event)))
+        scan.append(time.perf_counter() - started)
+
+    per_delivery = [seconds / n for seconds, n in zip(publish, delivered) if n]
+    return {
+        'subscribers': count,
+        'index_keys': len(broker.index),
+        'subscribe_us_per_subscriber': round(subscribe_seconds / count * 1e6, 2),
+        'delivered_mean': round(statistics.mean(delivered), 1),
+        'delivered_max': max(delivered),
+        'publish': micros(publish),
+        'publish_us_per_delivery': round(statistics.median(per_delivery) * 1e6, 3) if per_delivery else None,
+        'scan': micros(scan),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--subscribers', type=lambda value: [int(n) for n in value.split(',') if n],
+                        default=[5000, 50000], help='Comma-separated subscriber counts, one run per count.')
+    parser.add_argument('--events', type=int, default=2000)
+    parser.add_argument('--radius', type=float, default=None,
+                        help='Donor search radius in km (default AVAILABLE_REQUESTS_RADIUS_KM).')
+    parser.add_argument('--city-mode', type=float, default=0.1, help='Fraction of donors searching by city.')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', default='fanout-benchmarks.json')
+    args = parser.parse_args()
+
+    import django
+    django.setup()
+    from django.conf import settings
+    if args.radius is None:
+        args.radius = settings.AVAILABLE_REQUESTS_RADIUS_KM
+
+    print(f"{'subscribers':>11} {'keys':>7} {'delivered':>9} {'p50':>9} {'p99':>9} {'us/recv':>8} {'scan p50':>10}")
+    results = []
+    for count in args.subscribers:
+        stats = run_scale(count, args)
+        results.append(stats)
+        print(f"{count:11} {stats['index_keys']:7} {stats['delivered_mean']:9.1f} {stats['publish']['p50_us']:9.1f} "
+              f"{stats['publish']['p99_us']:9.1f} {stats['publish_us_per_delivery'] or 0:8.3f} "
+              f"{stats['scan']['p50_us']:10.1f}")
+
+    output = {
+        'meta': {
+            'created_at': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'events': args.events,
+            'radius_km': args.radius,
+            'city_mode': args.city_mode,
+            'seed': args.seed,
+        },
+        'results': results,
+    }
+    with open(args.output, 'w') as fh:
+        json.dump(output, fh, indent=2)
+    print(f"\nWrote {args.output}")
+
+
+if __name__ == '__main__':
+    main()
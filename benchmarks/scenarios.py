@@ -0,0 +1,184 @@
+"""
+One benchmark scenario per URL name in ``users.urls``, ``donor.urls``,
+``hospital.urls`` and ``blood_request.urls``, except the event streams in
+``STREAMING_ROUTES``, which hold their connection open rather than answer.
+
+A scenario's ``build`` runs outside the timed section and returns the
+``Call`` to make: it may create whatever the call consumes (a fresh request
+to cancel, a fresh account to register a profile for), so every timed call
+does the same work. ``BenchContext`` holds the actors the calls run as,
+picked from the seeded dataset.
+"""
+from dataclasses import dataclass
+from itertools import count
+from typing import Callable, Optional
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.urls import reverse
+from rest_framework_simplejwt.tokens import RefreshToken
+from blood_request.models import BloodRequest
+from donor.models import Donor
+from hospital.models import Hospital
+from raktseva.seeding import SEED_EMAIL_DOMAIN
+from users.models import User
+from users.utils import generate_otp, otp_cache_key
+
+URL_MODULES = ['users.urls', 'donor.urls', 'hospital.urls', 'blood_request.urls']
+STREAMING_ROUTES = {'donor-interest-stream', 'available-blood-requests-stream'}
+NOTIFY_RECIPIENTS = 10
+
+
+@dataclass
+class Call:
+    path: str
+    data: Optional[dict] = None
+    user: Optional[User] = None
+
+
+@dataclass
+class Scenario:
+    name: str
+    method: str
+    expected_status: int
+    build: Callable[['BenchContext'], Call]
+    role: Optional[str] = None
+
+
+class BenchContext:
+    """The hospital, donor and admin the scenarios act as, plus helpers to mint fresh rows."""
+
+    def __init__(self):
+        self.sequence = count()
+        self.hospital = (
+            Hospital.objects.filter(user__email__endswith=SEED_EMAIL_DOMAIN, latitude__isnull=False)
+            .select_related('user', 'canonical_city').order_by('canonical_city_id', 'id').first()
+        )
+        if self.hospital is None:
+            raise ValueError("No seeded hospitals; seed the database first.")
+        self.donor = (
+            Donor.objects.filter(user__email__endswith=SEED_EMAIL_DOMAIN, is_available=True,
+                                 canonical_city_id=self.hospital.canonical_city_id)
+            .select_related('user').order_by('id').first()
+        )
+        if self.donor is None:
+            raise ValueError("No seeded donor shares the benchmark hospital's city.")
+        self.admin = User.objects.filter(email=f"bench-admin@{SEED_EMAIL_DOMAIN}").first() or self.new_user(
+            'admin', is_staff=True, is_superuser=True, email=f"bench-admin@{SEED_EMAIL_DOMAIN}"
+        )
+        self.open_request = self.new_request()
+        self.recipients = list(
+            Donor.objects.filter(canonical_city_id=self.hospital.canonical_city_id)
+            .order_by('id').values_list('id', flat=True)[:NOTIFY_RECIPIENTS]
+        )
+        self.tokens = {}
+
+    def users(self):
+        return {'hospital': self.hospital.user, 'donor': self.donor.user, 'admin': self.admin}
+
+    def token(self, user):
+        if user.pk not in self.tokens:
+            self.tokens[user.pk] = str(RefreshToken.for_user(user).access_token)
+        return self.tokens[user.pk]
+
+    def email(self, prefix):
+        return f"bench-{prefix}-{next(self.sequence)}@{SEED_EMAIL_DOMAIN}"
+
+    def new_user(self, role, is_verified=True, email=None, **extra):
+        return User.objects.create(
+            email=email or self.email(role), name=f"Bench {role}", role=role,
+            password=make_password(None), is_verified=is_verified, **extra
+        )
+
+    def new_request(self):
+        return BloodRequest.objects.create(
+            hospital=self.hospital, city=self.hospital.city, blood_group=self.donor.blood_group, quantity=1
+        )
+
+
+def register(ctx):
+    return Call(reverse('register'), {
+        'email': ctx.email('register'), 'name': "Bench User", 'password': 'benchpass123', 'role': 'donor',
+    })
+
+
+def verify_otp(ctx):
+    user = ctx.new_user('donor', is_verified=False)
+    generate_otp(user.email)
+    return Call(reverse('verify-otp'), {'email': user.email, 'code': cache.get(otp_cache_key(user.email))})
+
+
+def resend_otp(ctx):
+    return Call(reverse('resend-otp'), {'email': ctx.new_user('donor', is_verified=False).email})
+
+
+def donor_create(ctx):
+    return Call(reverse('donor-create'), {
+        'blood_group': 'O+', 'city': ctx.hospital.city, 'contact_number': '+919800000000', 'is_available': True,
+    }, user=ctx.new_user('donor'))
+
+
+def hospital_create(ctx):
+    number = next(ctx.sequence)
+    return Call(reverse('hospital-create'), {
+        'name': f"Bench Hospital {number}", 'city': ctx.hospital.city, 'address': "1 Bench Road",
+        'contact_number': '+919800000001', 'registration_number': f"BENCH-{number:08d}",
+    }, user=ctx.new_user('hospital'))
+
+
+def request_action(url_name):
+    return lambda ctx: Call(reverse(url_name, args=[ctx.new_request().pk]))
+
+
+def open_request(url_name):
+    return lambda ctx: Call(reverse(url_name, args=[ctx.open_request.pk]))
+
+
+def static(url_name, **params):
+    query = '&'.join(f"{key}={value}" for key, value in params.items())
+    return lambda ctx: Call(reverse(url_name) + (f"?{query}" if query else ''))
+
+
+SCENARIOS = [
+    # users.urls
+    Scenario('register', 'post', 201, register),
+    Scenario('verify-otp', 'post', 200, verify_otp),
+    Scenario('user-profile', 'get', 200, static('user-profile'), role='hospital'),
+    Scenario('user-list', 'get', 200, static('user-list'), role='admin'),
+    Scenario('resend-otp', 'post', 200, resend_otp),
+    # donor.urls
+    Scenario('donor-create', 'post', 201, donor_create),
+    Scenario('donor-me', 'get', 200, static('donor-me'), role='donor'),
+    Scenario('donor-list', 'get', 200, static('donor-list'), role='hospital'),
+    Scenario('donor-detail', 'get', 200, lambda ctx: Call(reverse('donor-detail', args=[ctx.donor.pk])),
+             role='hospital'),
+    Scenario('my-donor-interests', 'get', 200, static('my-donor-interests'), role='donor'),
+    # hospital.urls
+    Scenario('hospital-create', 'post', 201, hospital_create),
+    Scenario('hospital-profile', 'get', 200, static('hospital-profile'), role='hospital'),
+    Scenario('hospital-dashboard', 'get', 200, static('hospital-dashboard'), role='hospital'),
+    # blood_request.urls
+    Scenario('blood-request-create', 'post', 201, lambda ctx: Call(reverse('blood-request-create'), {
+        'blood_group': ctx.donor.blood_group, 'city': ctx.hospital.city, 'quantity': 2,
+    }), role='hospital'),
+    Scenario('blood-request-list', 'get', 200, static('blood-request-list'), role='hospital'),
+    Scenario('available-blood-requests', 'get', 200, static('available-blood-requests'), role='donor'),
+    Scenario('blood-request-fulfill', 'patch', 200, request_action('blood-request-fulfill'), role='hospital'),
+    Scenario('blood-request-extend', 'patch', 200, request_action('blood-request-extend'), role='hospital'),
+    Scenario('blood-request-cancel', 'delete', 200, request_action('blood-request-cancel'), role='hospital'),
+    Scenario('donor-help', 'post', 201, request_action('donor-help'), role='donor'),
+    Scenario('interested-donors', 'get', 200, open_request('interested-donors'), role='hospital'),
+    Scenario('request-candidates', 'get', 200, open_request('request-candidates'), role='hospital'),
+    Scenario('nearby-donors', 'get', 200, static('nearby-donors', blood_group='O%2B', min_results=20),
+             role='hospital'),
+    Scenario('notify-donors', 'post', 200, lambda ctx: Call(reverse('notify-donors'), {
+        'donor_ids': ctx.recipients, 'message': "Urgent requirement, please reach out.",
+    }), role='hospital'),
+]
+
+
+def resolve(scenario, ctx):
+    """Build ``scenario``'s next call, filling in the acting user from its role."""
+    call = scenario.build(ctx)
+    if call.user is None and scenario.role:
+        call.user = ctx.users()[scenario.role]
+    return call
@@ -0,0 +1,59 @@
+"""
+Measures the per-request overhead of the hospital token-bucket throttle.
+
+    python benchmarks/throttle_overhead.py [--iterations N] [--backend dotted.path]
+
+Runs ``TokenBucket.consume`` against the configured default cache (or the given
+cache backend) and prints latency percentiles in microseconds. The database
+cache needs ``manage.py createcachetable`` first.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'raktseva.settings')
+
+
+def percentile(samples, pct):
+    return samples[min(len(samples) - 1, int(len(samples) * pct / 100))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--iterations', type=int, default=2000)
+    parser.add_argument('--backend', help='Cache backend to benchmark instead of the configured default.')
+    args = parser.parse_args()
+
+    import django
+    django.setup()
+    from django.conf import settings
+    from django.core.cache import caches
+    from blood_request.throttling import TokenBucket
+
+    if args.backend:
+        settings.CACHES['benchmark'] = {'BACKEND': args.backend, 'LOCATION': settings.CACHES['default'].get('LOCATION', '')}
+        cache = caches['benchmark']
+    else:
+        cache = caches['default']
+
+    bucket = TokenBucket('throttle:benchmark', capacity=args.iterations * 2, per_minute=60, cache=cache)
+    samples = []
+    for _ in range(args.iterations):
+        started = time.perf_counter()
+        bucket.consume()
+        samples.append((time.perf_counter() - started) * 1e6)
+    cache.delete('throttle:benchmark')
+
+    samples.sort()
+    print(f"backend: {cache.__class__.__module__}.{cache.__class__.__name__}")
+    print(f"iterations: {args.iterations}")
+    print(f"mean: {statistics.mean(samples):.1f} us")
+    for pct in (50, 95, 99):
+        print(f"p{pct}: {percentile(samples, pct):.1f} us")
+
+
+if __name__ == '__main__':
+    main()
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class BloodRequestConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "blood_request"
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,89 @@
+"""
+Event streams for blood requests.
+
+``INTEREST_CHANNEL`` carries one event per new ``DonorInterest`` (published by
+``record_donor_interest``), routed to the owning hospital's streams.
+
+``REQUEST_CHANNEL`` carries one event per new ``BloodRequest``. Donor streams
+are indexed under ``(blood group, cell)`` for every grid cell their search
+radius touches, and an event is routed by the request's own cell, so a new
+request is looked at only by donors of its group whose radius reaches its
+cell; an exact distance check then drops the corners. Donors searching by
+city are indexed under their canonical city, or under the raw city name when
+they have none, matching ``available_requests``; a request is routed under
+both.
+"""
+from raktseva.broker import Broker
+from donor.models import DonorInterest
+from .serializers import BloodRequestSerializer
+from .utils import INTEREST_CHANNEL, available_requests, calculate_distance, cells_within
+
+REQUEST_CHANNEL = 'new_blood_request'
+
+interest_broker = Broker(INTEREST_CHANNEL, route=lambda event: [event['hospital']])
+
+
+async def missed_interest_events(hospital_id, after, limit):
+    """Interest events for ``hospital_id`` with ids above ``after``, for ``Last-Event-ID`` replay."""
+    rows = (
+        DonorInterest.objects.filter(blood_request__hospital_id=hospital_id, id__gt=after)
+        .order_by('id')
+        .values('id', 'blood_request_id', 'donor_id', 'timestamp')[:limit]
+    )
+    return [
+        {'id': row['id'], 'hospital': hospital_id, 'request': row['blood_request_id'],
+         'donor': row['donor_id'], 'timestamp': row['timestamp'].isoformat()}
+        async for row in rows
+    ]
+
+
+def request_keys(event):
+    group = event['blood_group']
+    keys = [(group, 'city-name', event['city'])]
+    if event['canonical_city']:
+        keys.append((group, 'city', event['canonical_city']))
+    if event['cell']:
+        keys.append((group, event['cell']))
+    return keys
+
+
+request_broker = Broker(REQUEST_CHANNEL, route=request_keys)
+
+
+def request_event(blood_request):
+    """What donors are sent about a new request, plus the fields it is routed on."""
+    return {
+        **BloodRequestSerializer(blood_request).data,
+        'city': blood_request.city,
+        'canonical_city': blood_request.canonical_city_id,
+        'cell': blood_request.cell,
+    }
+
+
+def donor_subscription(donor, radius, mode='geo'):
+    """
+    ``(keys, accept)`` to subscribe ``donor`` to the requests
+    ``available_requests(donor, radius, mode)`` would list.
+    """
+    group = donor.blood_group
+    if mode == 'city' or donor.latitude is None or donor.longitude is None:
+        if donor.canonical_city_id:
+            return [(group, 'city', donor.canonical_city_id)], None
+        return [(group, 'city-name', donor.city)], None
+
+    lat, lon = donor.latitude, donor.longitude
+
+    def accept(event):
+        return (event['latitude'] is not None
+                and calculate_distance(lat, lon, event['latitude'], event['longitude']) <= radius)
+
+    return [(group, cell) for cell in cells_within(lat, lon, radius)], accept
+
+
+async def missed_request_events(donor, radius, mode, after, limit):
+    """New-request events ``donor`` missed since request id ``after``, for ``Last-Event-ID`` replay."""
+    rows = (
+        available_requests(donor, radius, mode).filter(id__gt=after)
+        .select_related('hospital').order_by('id')[:limit]
+    )
+    return [request_event(blood_request) async for blood_request in rows]
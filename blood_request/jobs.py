@@ -0,0 +1,26 @@
+from django.conf import settings
+from raktseva.scheduler import job
+from .sweeper import mark_expired, archive_requests
+from .reminders import send_expiry_reminders
+
+
+@job(interval=settings.BLOOD_REQUEST_SWEEP_INTERVAL)
+def sweep_blood_requests():
+    mark_expired()
+    archive_requests(settings.BLOOD_REQUEST_ARCHIVE_AFTER_DAYS)
+
+
+@job(interval=settings.BLOOD_REQUEST_REMINDER_INTERVAL)
+def remind_expiring_requests():
+    send_expiry_reminders()
+
+
+@job(interval=24 * 60 * 60)
+def maintain_archive_partitions():
+    if not settings.BLOOD_REQUEST_ARCHIVE_PARTITIONING:
+        return
+    from .partitioning import PARTITIONED_MODELS, ensure_partitions, is_partitioned
+
+    for model in PARTITIONED_MODELS:
+        if is_partitioned(model):
+            ensure_partitions(model)
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+from blood_request.partitioning import (
+    PARTITIONED_MODELS, convert_to_partitioned, ensure_partitions, detach_partitions, is_partitioned,
+)
+
+
+class Command(BaseCommand):
+    help = 'Maintains the monthly partitions of the blood request archive tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--convert', action='store_true',
+                            help='Convert the archive tables to partitioned tables if they are not already.')
+        parser.add_argument('--months-ahead', type=int, default=3,
+                            help='Create partitions up to this many months ahead.')
+        parser.add_argument('--detach-older-than', type=int, metavar='MONTHS',
+                            help='Detach partitions that ended more than this many months ago.')
+        parser.add_argument('--drop', action='store_true', help='Drop detached partitions instead of keeping them.')
+
+    def handle(self, *args, **options):
+        for model in PARTITIONED_MODELS:
+            table = model._meta.db_table
+            if options['convert'] and convert_to_partitioned(model, options['months_ahead']):
+                self.stdout.write(f"Converted {table} to a partitioned table.")
+            if not is_partitioned(model):
+                self.stdout.write(self.style.WARNING(f"{table} is not partitioned; run with --convert."))
+                continue
+
+            created = ensure_partitions(model, options['months_ahead'])
+            self.stdout.write(f"Created {len(created)} partitions for {table}.")
+
+            if options['detach_older_than'] is not None:
+                detached = detach_partitions(model, options['detach_older_than'], drop=options['drop'])
+                action = 'Dropped' if options['drop'] else 'Detached'
+                self.stdout.write(f"{action} {len(detached)} partitions of {table}: {', '.join(detached) or '-'}")
+
+        self.stdout.write(self.style.SUCCESS('Partition maintenance complete.'))
@@ -0,0 +1,27 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from blood_request.sweeper import mark_expired, archive_requests
+
+
+class Command(BaseCommand):
+    help = 'Marks expired blood requests and archives old fulfilled/expired ones'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--archive-after-days', type=int, default=None,
+                            help='Archive fulfilled/expired requests created more than this many days ago '
+                                 '(default: BLOOD_REQUEST_ARCHIVE_AFTER_DAYS).')
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--no-archive', action='store_true', help='Only mark expired requests.')
+
+    def handle(self, *args, **options):
+        expired = mark_expired(batch_size=options['batch_size'])
+        self.stdout.write(f"Marked {expired} requests as expired.")
+
+        if not options['no_archive']:
+            archive_after_days = options['archive_after_days']
+            if archive_after_days is None:
+                archive_after_days = settings.BLOOD_REQUEST_ARCHIVE_AFTER_DAYS
+            archived = archive_requests(archive_after_days, batch_size=options['batch_size'])
+            self.stdout.write(f"Archived {archived} requests.")
+
+        self.stdout.write(self.style.SUCCESS('Sweep complete.'))
@@ -0,0 +1,177 @@
+"""
+Write-time donor matching.
+
+Open blood requests keep a RequestCandidate row for every available, compatible
+donor within ``CANDIDATE_RADIUS_KM`` of the request location. Candidates are
+(re)built after the triggering transaction commits, so hospitals read them with
+a single indexed range scan instead of recomputing distances per call.
+
+Rebuilds may overlap (a donor save racing a request save, or two extends of one
+request), so every rebuild first locks the affected BloodRequest rows in id
+order and rows are upserted on (blood_request, donor).
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+from donor.enums import COMPATIBLE_DONOR_GROUPS
+from donor.models import Donor
+from hospital.models import Hospital
+from .models import BloodRequest, RequestCandidate
+from .utils import REQUEST_LIFETIME, bounding_box, calculate_distance, cell_key, cells_within
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+
+
+def executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(settings.CANDIDATE_MATCHING_WORKERS, thread_name_prefix='candidate-matching')
+    return _executor
+
+
+def schedule(func, *args):
+    """
+    Run ``func(*args)`` once the current transaction commits, on the shared
+    matching thread pool when ``CANDIDATE_MATCHING_ASYNC`` is enabled.
+    """
+    def run():
+        if not settings.CANDIDATE_MATCHING_ASYNC:
+            func(*args)
+            return
+        executor().submit(run_logged, func, *args)
+
+    transaction.on_commit(run)
+
+
+def run_logged(func, *args):
+    close_old_connections()
+    try:
+        func(*args)
+    except Exception:
+        logger.exception("Candidate matching %s%r failed.", func.__name__, args)
+    finally:
+        close_old_connections()
+
+
+def lock_requests(request_ids):
+    """Lock the request rows whose candidates are about to be rewritten, in id order."""
+    list(BloodRequest.objects.select_for_update().filter(pk__in=request_ids).order_by('pk').values_list('pk', flat=True))
+
+
+def save_candidates(candidates):
+    RequestCandidate.objects.bulk_create(
+        candidates,
+        batch_size=1000,
+        update_conflicts=True,
+        unique_fields=['blood_request', 'donor'],
+        update_fields=['distance_km', 'score'],
+    )
+
+
+def candidate_score(recipient_group, donor_group, distance_km):
+    exact = 1.0 if donor_group == recipient_group else 0.8
+    return round(exact / (1 + distance_km), 6)
+
+
+def open_requests():
+    return BloodRequest.objects.filter(
+        is_fulfilled=False,
+        is_expired=False,
+        created_at__gte=timezone.now() - REQUEST_LIFETIME,
+    )
+
+
+def build_request_candidates(request_id):
+    """Replace all candidates of one blood request."""
+    try:
+        blood_request = BloodRequest.objects.get(pk=request_id)
+    except BloodRequest.DoesNotExist:
+        return 0
+
+    origin_lat, origin_lon = blood_request.latitude, blood_request.longitude
+    radius = settings.CANDIDATE_RADIUS_KM
+    candidates = []
+
+    if not blood_request.is_fulfilled and origin_lat is not None and origin_lon is not None:
+        min_lat, max_lat, min_lon, max_lon = bounding_box(origin_lat, origin_lon, radius)
+        donors = Donor.objects.filter(
+            is_available=True,
+            blood_group__in=COMPATIBLE_DONOR_GROUPS[blood_request.blood_group],
+            latitude__range=(min_lat, max_lat),
+            longitude__range=(min_lon, max_lon),
+        ).values_list('id', 'blood_group', 'latitude', 'longitude')
+
+        for donor_id, donor_group, lat, lon in donors.iterator():
+            distance = calculate_distance(origin_lat, origin_lon, lat, lon)
+            if distance <= radius:
+                candidates.append(RequestCandidate(
+                    blood_request_id=blood_request.id,
+                    donor_id=donor_id,
+                    distance_km=distance,
+                    score=candidate_score(blood_request.blood_group, donor_group, distance),
+                ))
+
+    with transaction.atomic():
+        lock_requests([blood_request.id])
+        RequestCandidate.objects.filter(blood_request_id=blood_request.id).delete()
+        save_candidates(candidates)
+    return len(candidates)
+
+
+def refresh_donor_candidates(donor_id):
+    """Replace all candidate rows of one donor across open requests."""
+    try:
+        donor = Donor.objects.get(pk=donor_id)
+    except Donor.DoesNotExist:
+        return 0
+
+    radius = settings.CANDIDATE_RADIUS_KM
+    candidates = []
+
+    if donor.is_available and donor.latitude is not None and donor.longitude is not None:
+        recipient_groups = [
+            group for group, donors in COMPATIBLE_DONOR_GROUPS.items() if donor.blood_group in donors
+        ]
+        requests = open_requests().filter(
+            cell__in=cells_within(donor.latitude, donor.longitude, radius),
+            blood_group__in=recipient_groups,
+        ).values_list('id', 'blood_group', 'latitude', 'longitude')
+
+        for request_id, recipient_group, lat, lon in requests.iterator():
+            distance = calculate_distance(lat, lon, donor.latitude, donor.longitude)
+            if distance <= radius:
+                candidates.append(RequestCandidate(
+                    blood_request_id=request_id,
+                    donor_id=donor.id,
+                    distance_km=distance,
+                    score=candidate_score(recipient_group, donor.blood_group, distance),
+                ))
+
+    with transaction.atomic():
+        existing = RequestCandidate.objects.filter(donor_id=donor.id)
+        lock_requests({candidate.blood_request_id for candidate in candidates}
+                      | set(existing.values_list('blood_request_id', flat=True)))
+        existing.delete()
+        save_candidates(candidates)
+    return len(candidates)
+
+
+def refresh_hospital_candidates(hospital_id):
+    """Move every open request of a relocated hospital and rebuild its candidates."""
+    hospital = Hospital.objects.filter(pk=hospital_id).first()
+    if hospital is None or hospital.latitude is None or hospital.longitude is None:
+        return
+
+    requests = open_requests().filter(hospital_id=hospital_id)
+    requests.update(
+        latitude=hospital.latitude,
+        longitude=hospital.longitude,
+        cell=cell_key(hospital.latitude, hospital.longitude),
+    )
+    request_ids = requests.values_list('id', flat=True)
+    for request_id in list(request_ids):
+        build_request_candidates(request_id)
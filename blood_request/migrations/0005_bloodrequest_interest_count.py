@@ -0,0 +1,34 @@
+# Generated by Django 4.2.20 on 2026-10-19 15:52
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_interest_count(apps, schema_editor):
+    BloodRequest = apps.get_model('blood_request', 'BloodRequest')
+    DonorInterest = apps.get_model('donor', 'DonorInterest')
+    counts = (
+        DonorInterest.objects.filter(blood_request=OuterRef('pk'))
+        .values('blood_request')
+        .annotate(total=Count('id'))
+        .values('total')
+    )
+    BloodRequest.objects.update(interest_count=Coalesce(Subquery(counts), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blood_request', '0004_alter_bloodrequest_options'),
+        ('donor', '0004_alter_donor_options_alter_donorinterest_options'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bloodrequest',
+            name='interest_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_interest_count, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 4.2.20 on 2026-10-19 15:53
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('donor', '0005_alter_donor_blood_group'),
+        ('blood_request', '0005_bloodrequest_interest_count'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RequestCandidate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('distance_km', models.FloatField()),
+                ('score', models.FloatField()),
+                ('blood_request', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='candidates', to='blood_request.bloodrequest')),
+                ('donor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='candidates', to='donor.donor')),
+            ],
+            options={
+                'ordering': ['distance_km', 'id'],
+                'indexes': [models.Index(fields=['blood_request', 'distance_km'], name='candidate_request_distance')],
+                'unique_together': {('blood_request', 'donor')},
+            },
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 4.2.20 on 2026-10-19 15:57
+
+from math import floor
+from django.db import migrations, models
+
+GEO_CELL_SIZE_DEG = 0.1
+
+
+def copy_hospital_location(apps, schema_editor):
+    BloodRequest = apps.get_model('blood_request', 'BloodRequest')
+    requests = BloodRequest.objects.filter(
+        hospital__latitude__isnull=False, hospital__longitude__isnull=False
+    ).select_related('hospital')
+
+    batch = []
+    for blood_request in requests.iterator(chunk_size=1000):
+        lat, lon = blood_request.hospital.latitude, blood_request.hospital.longitude
+        blood_request.latitude = lat
+        blood_request.longitude = lon
+        blood_request.cell = f"{floor(lat / GEO_CELL_SIZE_DEG)}:{floor(lon / GEO_CELL_SIZE_DEG)}"
+        batch.append(blood_request)
+        if len(batch) >= 1000:
+            BloodRequest.objects.bulk_update(batch, ['latitude', 'longitude', 'cell'])
+            batch = []
+    BloodRequest.objects.bulk_update(batch, ['latitude', 'longitude', 'cell'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blood_request', '0006_requestcandidate'),
+        ('hospital', '0002_hospital_latitude_hospital_longitude'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bloodrequest',
+            name='cell',
+            field=models.CharField(blank=True, default='', help_text='Spatial grid cell of the request location.', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='bloodrequest',
+            name='latitude',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='bloodrequest',
+            name='longitude',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='bloodrequest',
+            index=models.Index(fields=['cell', 'blood_group', 'created_at'], name='request_cell_group_created'),
+        ),
+        migrations.RunPython(copy_hospital_location, migrations.RunPython.noop),
+    ]
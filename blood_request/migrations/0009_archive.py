@@ -0,0 +1,56 @@
+# Generated by Django 4.2.20 on 2026-10-19 16:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blood_request', '0008_canonical_city'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedBloodRequest',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('hospital_id', models.BigIntegerField(db_index=True)),
+                ('canonical_city_id', models.BigIntegerField(blank=True, null=True)),
+                ('blood_group', models.CharField(max_length=3)),
+                ('city', models.CharField(max_length=100)),
+                ('quantity', models.PositiveIntegerField()),
+                ('is_fulfilled', models.BooleanField()),
+                ('is_expired', models.BooleanField()),
+                ('interest_count', models.PositiveIntegerField()),
+                ('created_at', models.DateTimeField()),
+                ('latitude', models.FloatField(blank=True, null=True)),
+                ('longitude', models.FloatField(blank=True, null=True)),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['id'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedDonorInterest',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('donor_id', models.BigIntegerField(db_index=True)),
+                ('blood_request_id', models.BigIntegerField(db_index=True)),
+                ('timestamp', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['id'],
+            },
+        ),
+        migrations.AddField(
+            model_name='bloodrequest',
+            name='is_expired',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddIndex(
+            model_name='bloodrequest',
+            index=models.Index(condition=models.Q(('is_expired', False), ('is_fulfilled', False)), fields=['created_at'], name='request_open_created'),
+        ),
+    ]
@@ -0,0 +1,22 @@
+from django.conf import settings
+from django.db import migrations
+
+
+def partition_archives(apps, schema_editor):
+    if not settings.BLOOD_REQUEST_ARCHIVE_PARTITIONING:
+        return
+    from blood_request.partitioning import convert_to_partitioned
+
+    for name in ('ArchivedBloodRequest', 'ArchivedDonorInterest'):
+        convert_to_partitioned(apps.get_model('blood_request', name))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blood_request', '0009_archive'),
+    ]
+
+    operations = [
+        migrations.RunPython(partition_archives, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 4.2.20 on 2026-10-19 16:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blood_request', '0010_partition_archives'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bloodrequest',
+            name='reminder_sent_at',
+            field=models.DateTimeField(blank=True, help_text='When the hospital was reminded of the upcoming expiry.', null=True),
+        ),
+        migrations.AddIndex(
+            model_name='bloodrequest',
+            index=models.Index(condition=models.Q(('is_expired', False), ('is_fulfilled', False), ('reminder_sent_at__isnull', True)), fields=['created_at', 'hospital'], name='request_reminder_due'),
+        ),
+    ]
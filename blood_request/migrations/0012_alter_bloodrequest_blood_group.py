@@ -0,0 +1,18 @@
+# Generated by Django 4.2.20 on 2026-10-19 17:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blood_request', '0011_bloodrequest_reminder_sent_at'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='bloodrequest',
+            name='blood_group',
+            field=models.CharField(choices=[('A+', 'A+'), ('A-', 'A-'), ('B+', 'B+'), ('B-', 'B-'), ('O+', 'O+'), ('O-', 'O-'), ('AB+', 'AB+'), ('AB-', 'AB-')], help_text="Required blood group (e.g. 'O+').", max_length=3),
+        ),
+    ]
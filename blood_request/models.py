@@ -1,8 +1,9 @@
 from django.db import models
 from hospital.models import Hospital
 from donor.enums import BloodGroupEnum
+from city.models import CanonicalCityModel
 
-class BloodRequest(models.Model):
+class BloodRequest(CanonicalCityModel):
 
     hospital = models.ForeignKey(Hospital, on_delete=models.CASCADE, related_name='blood_requests')
     blood_group = models.CharField(max_length=3,
@@ -11,10 +12,95 @@ class BloodRequest(models.Model):
     city = models.CharField(max_length=100)
     quantity = models.PositiveIntegerField()
     is_fulfilled = models.BooleanField(default=False)
+    is_expired = models.BooleanField(default=False)
+    interest_count = models.PositiveIntegerField(default=0)
+    reminder_sent_at = models.DateTimeField(null=True, blank=True,
+                                            help_text="When the hospital was reminded of the upcoming expiry.")
     created_at = models.DateTimeField(auto_now_add=True)
+    latitude = models.FloatField(null=True, blank=True)
+    longitude = models.FloatField(null=True, blank=True)
+    cell = models.CharField(max_length=20, blank=True, default='',
+                            help_text="Spatial grid cell of the request location.")
 
     class Meta:
         ordering = ['id']
+        indexes = [
+            models.Index(fields=['cell', 'blood_group', 'created_at'], name='request_cell_group_created'),
+            models.Index(fields=['created_at'], name='request_open_created',
+                         condition=models.Q(is_fulfilled=False, is_expired=False)),
+            models.Index(fields=['created_at', 'hospital'], name='request_reminder_due',
+                         condition=models.Q(is_fulfilled=False, is_expired=False, reminder_sent_at__isnull=True)),
+        ]
 
     def __str__(self):
         return f"{self.blood_group} - {self.city} ({self.quantity} units)"
+
+    def save(self, *args, **kwargs):
+        from .utils import cell_key
+
+        if self._state.adding and self.latitude is None and self.hospital.latitude is not None:
+            self.latitude = self.hospital.latitude
+            self.longitude = self.hospital.longitude
+        if self.latitude is not None and self.longitude is not None:
+            self.cell = cell_key(self.latitude, self.longitude)
+        super().save(*args, **kwargs)
+
+
+class RequestCandidate(models.Model):
+    """A compatible donor pre-matched to a blood request, with its distance."""
+
+    blood_request = models.ForeignKey(BloodRequest, on_delete=models.CASCADE, related_name='candidates')
+    donor = models.ForeignKey('donor.Donor', on_delete=models.CASCADE, related_name='candidates')
+    distance_km = models.FloatField()
+    score = models.FloatField()
+
+    class Meta:
+        unique_together = ('blood_request', 'donor')
+        ordering = ['distance_km', 'id']
+        indexes = [
+            models.Index(fields=['blood_request', 'distance_km'], name='candidate_request_distance'),
+        ]
+
+    def __str__(self):
+        return f"Donor {self.donor_id} for request {self.blood_request_id} ({self.distance_km:.1f} km)"
+
+
+class ArchivedBloodRequest(models.Model):
+    """
+    Fulfilled or expired BloodRequest moved out of the hot table by the sweeper.
+    Ids are kept from the original row; related ids are plain columns so the
+    archive survives deletion of hospitals or cities.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    hospital_id = models.BigIntegerField(db_index=True)
+    canonical_city_id = models.BigIntegerField(null=True, blank=True)
+    blood_group = models.CharField(max_length=3)
+    city = models.CharField(max_length=100)
+    quantity = models.PositiveIntegerField()
+    is_fulfilled = models.BooleanField()
+    is_expired = models.BooleanField()
+    interest_count = models.PositiveIntegerField()
+    created_at = models.DateTimeField()
+    latitude = models.FloatField(null=True, blank=True)
+    longitude = models.FloatField(null=True, blank=True)
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['id']
+
+    def __str__(self):
+        return f"Archived {self.blood_group} - {self.city} ({self.quantity} units)"
+
+
+class ArchivedDonorInterest(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    donor_id = models.BigIntegerField(db_index=True)
+    blood_request_id = models.BigIntegerField(db_index=True)
+    timestamp = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['id']
+
+    def __str__(self):
+        return f"Archived interest of donor {self.donor_id} in request {self.blood_request_id}"
@@ -0,0 +1,61 @@
+import base64
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+class DistanceCursorPagination(BasePagination):
+    """
+    Keyset pagination over a queryset annotated with ``distance``.
+
+    The cursor encodes the ``(distance, id)`` of the last row on the page, so
+    each page is a range read that continues after it regardless of how many
+    rows come before.
+    """
+    cursor_query_param = 'cursor'
+    page_size = api_settings.PAGE_SIZE
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.extra = {}
+        position = self.decode_cursor(request)
+        if position is not None:
+            distance, pk = position
+            queryset = queryset.filter(Q(distance__gt=distance) | Q(distance=distance, id__gt=pk))
+
+        rows = list(queryset.order_by('distance', 'id')[:self.page_size + 1])
+        self.has_next = len(rows) > self.page_size
+        self.page = rows[:self.page_size]
+        return self.page
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            **self.extra,
+            'results': data,
+        })
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        last = self.page[-1]
+        return replace_query_param(
+            self.request.build_absolute_uri(), self.cursor_query_param, self.encode_cursor(last.distance, last.id)
+        )
+
+    def encode_cursor(self, distance, pk):
+        return base64.urlsafe_b64encode(f"{distance!r}:{pk}".encode()).decode()
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            distance, pk = base64.urlsafe_b64decode(encoded.encode()).decode().split(':')
+            return float(distance), int(pk)
+        except (TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
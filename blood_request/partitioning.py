@@ -0,0 +1,179 @@
+"""
+Monthly range partitioning for the blood request archive tables.
+
+The sweeper moves closed requests and their donor interests out of the hot
+tables, so the archive tables are the ones that grow without bound. They carry
+no foreign keys, which lets them become native Postgres partitioned tables:
+``ArchivedBloodRequest`` by ``created_at`` and ``ArchivedDonorInterest`` by
+``timestamp``, one partition per month plus a default partition.
+
+Partitions are named ``<table>_pYYYYMM``. The primary key becomes
+``(id, <partition column>)`` because Postgres requires the partition key in
+every unique constraint; ids are still unique since archived rows are never
+re-dated.
+"""
+from datetime import date
+from django.db import connection, transaction
+from .models import ArchivedBloodRequest, ArchivedDonorInterest
+
+PARTITIONED_MODELS = [ArchivedBloodRequest, ArchivedDonorInterest]
+# Keyed by table name so migrations can pass historical models.
+PARTITION_COLUMNS = {
+    ArchivedBloodRequest._meta.db_table: 'created_at',
+    ArchivedDonorInterest._meta.db_table: 'timestamp',
+}
+
+
+def add_months(day, months):
+    month = day.month - 1 + months
+    return date(day.year + month // 12, month % 12 + 1, 1)
+
+
+def month_start(day):
+    return date(day.year, day.month, 1)
+
+
+def partition_name(table, month):
+    return f"{table}_p{month:%Y%m}"
+
+
+def is_partitioned(model):
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT relkind FROM pg_class WHERE oid = to_regclass(%s)", [model._meta.db_table])
+        row = cursor.fetchone()
+    return bool(row) and row[0] == 'p'
+
+
+def list_partitions(model):
+    """Monthly partitions of ``model`` as ``[(name, month), ...]``, oldest first."""
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = to_regclass(%s)",
+            [table],
+        )
+        names = [row[0] for row in cursor.fetchall()]
+    prefix = f"{table}_p"
+    partitions = []
+    for name in names:
+        suffix = name[len(prefix):]
+        if name.startswith(prefix) and len(suffix) == 6 and suffix.isdigit():
+            partitions.append((name, date(int(suffix[:4]), int(suffix[4:]), 1)))
+    return sorted(partitions, key=lambda p: p[1])
+
+
+def convert_to_partitioned(model, months_ahead=3):
+    """
+    Rebuild ``model``'s table as a partitioned table, copying existing rows
+    into monthly partitions. Does nothing if it is already partitioned.
+    """
+    if is_partitioned(model):
+        return False
+    table = model._meta.db_table
+    column = PARTITION_COLUMNS[table]
+    legacy = f"{table}_legacy"
+    qn = connection.ops.quote_name
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT indexdef FROM pg_indexes WHERE tablename = %s "
+            "AND indexname NOT IN (SELECT conname FROM pg_constraint WHERE conrelid = to_regclass(%s))",
+            [table, table],
+        )
+        index_defs = [row[0] for row in cursor.fetchall()]
+        cursor.execute(f"SELECT min({qn(column)}), max({qn(column)}) FROM {qn(table)}")
+        oldest, newest = cursor.fetchone()
+
+        cursor.execute(f"ALTER TABLE {qn(table)} RENAME TO {qn(legacy)}")
+        cursor.execute(
+            f"CREATE TABLE {qn(table)} (LIKE {qn(legacy)} INCLUDING DEFAULTS) "
+            f"PARTITION BY RANGE ({qn(column)})"
+        )
+        cursor.execute(f"CREATE TABLE {qn(table + '_default')} PARTITION OF {qn(table)} DEFAULT")
+        first = month_start(oldest.date()) if oldest else None
+        _create_months(model, first, newest.date() if newest else None, months_ahead)
+        cursor.execute(f"INSERT INTO {qn(table)} SELECT * FROM {qn(legacy)}")
+        cursor.execute(f"DROP TABLE {qn(legacy)}")
+        cursor.execute(f"ALTER TABLE {qn(table)} ADD PRIMARY KEY (id, {qn(column)})")
+        for index_def in index_defs:
+            cursor.execute(index_def)
+    return True
+
+
+def _create_months(model, first, last, months_ahead):
+    current = month_start(date.today())
+    first = min(first or current, current)
+    last = max(month_start(last) if last else current, add_months(current, months_ahead))
+    created = []
+    month = first
+    while month <= last:
+        if create_partition(model, month):
+            created.append(month)
+        month = add_months(month, 1)
+    return created
+
+
+def create_partition(model, month):
+    """
+    Create the partition for ``month`` if it is missing. Rows that already
+    landed in the default partition for that month are moved into it.
+    """
+    table = model._meta.db_table
+    name = partition_name(table, month)
+    if any(existing == name for existing, _ in list_partitions(model)):
+        return False
+    column = PARTITION_COLUMNS[table]
+    qn = connection.ops.quote_name
+    bounds = [month, add_months(month, 1)]
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f"CREATE TABLE {qn(name)} (LIKE {qn(table)} INCLUDING DEFAULTS)")
+        cursor.execute(
+            f"WITH moved AS (DELETE FROM {qn(table + '_default')} "
+            f"WHERE {qn(column)} >= %s AND {qn(column)} < %s RETURNING *) "
+            f"INSERT INTO {qn(name)} SELECT * FROM moved",
+            bounds,
+        )
+        cursor.execute(
+            f"ALTER TABLE {qn(table)} ATTACH PARTITION {qn(name)} FOR VALUES FROM (%s) TO (%s)",
+            bounds,
+        )
+    return True
+
+
+def ensure_partitions(model, months_ahead=3):
+    """
+    Create partitions from the current month through ``months_ahead`` months
+    from now, plus any month with rows stranded in the default partition.
+    """
+    table = model._meta.db_table
+    qn = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT DISTINCT date_trunc('month', {qn(PARTITION_COLUMNS[table])})::date "
+            f"FROM {qn(table + '_default')}"
+        )
+        stranded = [row[0] for row in cursor.fetchall()]
+    created = [month for month in sorted(stranded) if create_partition(model, month)]
+    current = month_start(date.today())
+    return created + _create_months(model, current, add_months(current, months_ahead), 0)
+
+
+def detach_partitions(model, keep_months, drop=False):
+    """
+    Detach monthly partitions that ended more than ``keep_months`` months ago.
+    Detached tables are left in place for backup unless ``drop`` is set.
+    """
+    cutoff = add_months(month_start(date.today()), -keep_months)
+    qn = connection.ops.quote_name
+    detached = []
+    for name, month in list_partitions(model):
+        if add_months(month, 1) > cutoff:
+            continue
+        with connection.cursor() as cursor:
+            cursor.execute(f"ALTER TABLE {qn(model._meta.db_table)} DETACH PARTITION {qn(name)}")
+            if drop:
+                cursor.execute(f"DROP TABLE {qn(name)}")
+        detached.append(name)
+    return detached
@@ -0,0 +1,89 @@
+"""
+Expiry reminders: one digest email per hospital listing its open requests that
+hit the 48h cutoff within ``BLOOD_REQUEST_REMINDER_WINDOW_HOURS``.
+"""
+import logging
+from datetime import timedelta
+from itertools import groupby
+from operator import itemgetter
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.utils import timezone
+from raktseva.metrics import external_call
+from .models import BloodRequest
+from .utils import REQUEST_LIFETIME
+
+logger = logging.getLogger(__name__)
+
+REMINDER_FIELDS = ['id', 'hospital_id', 'hospital__name', 'hospital__user__email',
+                   'blood_group', 'quantity', 'created_at']
+
+
+def due_reminders(window_hours):
+    """Open, un-reminded requests expiring within ``window_hours``, grouped by hospital."""
+    now = timezone.now()
+    return (
+        BloodRequest.objects.filter(
+            is_fulfilled=False,
+            is_expired=False,
+            reminder_sent_at__isnull=True,
+            created_at__gt=now - REQUEST_LIFETIME,
+            created_at__lte=now - REQUEST_LIFETIME + timedelta(hours=window_hours),
+        )
+        .order_by('hospital_id', 'created_at')
+        .values(*REMINDER_FIELDS)
+    )
+
+
+def build_digest(rows, connection):
+    lines = [
+        f"- #{row['id']}: {row['quantity']} unit(s) of {row['blood_group']}, "
+        f"expires {timezone.localtime(row['created_at'] + REQUEST_LIFETIME):%d %b %H:%M}"
+        for row in rows
+    ]
+    return EmailMessage(
+        "RaktSeva: blood requests about to expire",
+        f"Hello {rows[0]['hospital__name']},\n\n"
+        f"These requests will stop being shown to donors soon:\n\n" + "\n".join(lines) +
+        "\n\nExtend or fulfil them from your dashboard.",
+        settings.EMAIL_HOST_USER,
+        [rows[0]['hospital__user__email']],
+        connection=connection,
+    )
+
+
+def send_expiry_reminders(window_hours=None, chunk_size=2000):
+    """
+    Send the reminder digests over a single SMTP connection and stamp
+    ``reminder_sent_at`` so each request is reminded once. Requests are
+    streamed from a server-side cursor, so only one hospital's rows are held
+    in memory at a time. A failed send is logged and that hospital's requests
+    are released for the next run; the other hospitals are still reminded.
+    Returns ``(hospitals, requests)`` reminded.
+    """
+    if window_hours is None:
+        window_hours = settings.BLOOD_REQUEST_REMINDER_WINDOW_HOURS
+    hospitals = reminded = 0
+    with get_connection() as connection:
+        rows = due_reminders(window_hours).iterator(chunk_size=chunk_size)
+        for _, group in groupby(rows, key=itemgetter('hospital_id')):
+            group = list(group)
+            ids = [row['id'] for row in group]
+            # Claim before sending so a concurrent or retried run can't send the same reminder.
+            claimed_at = timezone.now()
+            claimed = BloodRequest.objects.filter(id__in=ids, reminder_sent_at__isnull=True)
+            if not claimed.update(reminder_sent_at=claimed_at):
+                continue
+            try:
+                with external_call('smtp'):
+                    build_digest(group, connection).send()
+            except Exception:
+                logger.exception("Expiry reminder for hospital %s failed; retrying next run.", group[0]['hospital_id'])
+                # Release only this run's claim, not rows another run stamped meanwhile.
+                BloodRequest.objects.filter(id__in=ids, reminder_sent_at=claimed_at).update(reminder_sent_at=None)
+                # The SMTP session may be broken; the next send reopens it.
+                connection.close()
+                continue
+            hospitals += 1
+            reminded += len(ids)
+    return hospitals, reminded
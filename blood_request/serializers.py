@@ -1,8 +1,10 @@
 from rest_framework import serializers
-from .models import BloodRequest
+from .models import BloodRequest, RequestCandidate
 from hospital.serializers import HospitalPublicSerializer
+from donor.serializers import DonorPublicSerializer
 from datetime import timedelta
 from django.utils import timezone
+from django.conf import settings
 
 class BloodRequestSerializer(serializers.ModelSerializer):
     """
@@ -15,8 +17,11 @@ class BloodRequestSerializer(serializers.ModelSerializer):
         - blood_group (string)
         - quantity (int)
         - is_fulfilled (bool)
+        - is_expired (bool, read-only; set by the expiry sweeper)
+        - interest_count (int, read-only)
         - expired (bool, read-only)
         - created_at (datetime, read-only)
+        - latitude, longitude (float, read-only; copied from the hospital)
     """
     hospital = HospitalPublicSerializer(read_only=True)
     city = serializers.CharField(write_only=True)
@@ -24,23 +29,95 @@ class BloodRequestSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = BloodRequest
-        fields = '__all__'
-        read_only_fields = ['hospital', 'created_at']
+        exclude = ['cell', 'canonical_city', 'reminder_sent_at']
+        read_only_fields = ['hospital', 'is_expired', 'interest_count', 'created_at', 'latitude', 'longitude']
 
     def get_expired(self, obj):
         return obj.created_at + timedelta(hours=48) < timezone.now()
 
+class BloodRequestHistorySerializer(serializers.Serializer):
+    """
+        Blood request schema covering live and archived requests.
+
+        Fields:
+        - id (int)
+        - hospital (HospitalPublicSerializer)
+        - blood_group (string)
+        - quantity (int)
+        - is_fulfilled (bool)
+        - is_expired (bool)
+        - interest_count (int)
+        - expired (bool)
+        - created_at (datetime)
+        - latitude, longitude (float)
+        - archived (bool)
+    """
+    id = serializers.IntegerField()
+    hospital = serializers.SerializerMethodField()
+    blood_group = serializers.CharField()
+    quantity = serializers.IntegerField()
+    is_fulfilled = serializers.BooleanField()
+    is_expired = serializers.BooleanField()
+    interest_count = serializers.IntegerField()
+    expired = serializers.SerializerMethodField()
+    created_at = serializers.DateTimeField()
+    latitude = serializers.FloatField(allow_null=True)
+    longitude = serializers.FloatField(allow_null=True)
+    archived = serializers.BooleanField()
+
+    class Meta:
+        fields = ['id', 'blood_group', 'quantity', 'is_fulfilled', 'is_expired', 'interest_count', 'created_at',
+                  'latitude', 'longitude']
+
+    def get_hospital(self, obj):
+        return HospitalPublicSerializer(self.context['hospital']).data
+
+    def get_expired(self, obj):
+        return obj['is_expired'] or obj['created_at'] + timedelta(hours=48) < timezone.now()
+
+class BloodRequestSummarySerializer(serializers.ModelSerializer):
+    """
+        Compact blood request schema for the hospital dashboard.
+
+        Fields:
+        - id (int, read-only)
+        - blood_group (string)
+        - quantity (int)
+        - interest_count (int)
+        - created_at (datetime)
+    """
+    class Meta:
+        model = BloodRequest
+        fields = ['id', 'blood_group', 'quantity', 'interest_count', 'created_at']
+        read_only_fields = fields
+
+class RequestCandidateSerializer(serializers.ModelSerializer):
+    """
+        Pre-matched donor for a blood request.
+
+        Fields:
+        - donor (DonorPublicSerializer)
+        - distance_km (float)
+        - score (float)
+    """
+    donor = DonorPublicSerializer(read_only=True)
+
+    class Meta:
+        model = RequestCandidate
+        fields = ['donor', 'distance_km', 'score']
+
 class NotifyDonorSerializer(serializers.Serializer):
     """
         Schema to notify donors.
 
         Input:
-        - donor_ids (list of ints, required)
+        - donor_ids (list of ints, required; at most NOTIFY_DONORS_MAX_RECIPIENTS)
         - message (string, required)
 
         Output:
-        - sent (int): number of messages sent
+        - queued (int): number of messages queued for the donors' next digest
     """
-    donor_ids = serializers.ListField()
+    donor_ids = serializers.ListField(child=serializers.IntegerField(), min_length=1,
+                                      max_length=settings.NOTIFY_DONORS_MAX_RECIPIENTS)
     message = serializers.CharField(max_length=500)
 
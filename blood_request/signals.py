@@ -0,0 +1,20 @@
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from hospital.models import Hospital
+from .matching import schedule, build_request_candidates, refresh_hospital_candidates
+from .models import BloodRequest
+
+MATCHING_FIELDS = {'blood_group', 'is_fulfilled', 'created_at'}
+LOCATION_FIELDS = {'latitude', 'longitude'}
+
+
+@receiver(post_save, sender=BloodRequest)
+def match_request_candidates(sender, instance, created, update_fields=None, **kwargs):
+    if created or update_fields is None or MATCHING_FIELDS & set(update_fields):
+        schedule(build_request_candidates, instance.pk)
+
+
+@receiver(post_save, sender=Hospital)
+def rematch_hospital_requests(sender, instance, created, update_fields=None, **kwargs):
+    if not created and (update_fields is None or LOCATION_FIELDS & set(update_fields)):
+        schedule(refresh_hospital_candidates, instance.pk)
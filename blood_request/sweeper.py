@@ -0,0 +1,84 @@
+"""
+Housekeeping for the blood request tables.
+
+``mark_expired`` flags open requests that passed their 48h lifetime and
+``archive_requests`` moves old fulfilled/expired requests, with their donor
+interests, into the archive tables. Both work in bounded batches, each in its
+own short transaction, so they can run against a live database.
+"""
+from datetime import timedelta
+from django.db import connection, transaction
+from django.utils import timezone
+from donor.models import DonorInterest
+from .models import BloodRequest, RequestCandidate, ArchivedBloodRequest, ArchivedDonorInterest
+from .utils import REQUEST_LIFETIME
+
+ARCHIVED_REQUEST_COLUMNS = [
+    'id', 'hospital_id', 'canonical_city_id', 'blood_group', 'city', 'quantity', 'is_fulfilled',
+    'is_expired', 'interest_count', 'created_at', 'latitude', 'longitude',
+]
+ARCHIVED_INTEREST_COLUMNS = ['id', 'donor_id', 'blood_request_id', 'timestamp']
+
+
+def mark_expired(batch_size=1000):
+    """Flag open requests older than REQUEST_LIFETIME as expired. Returns the count."""
+    cutoff = timezone.now() - REQUEST_LIFETIME
+    total = 0
+    while True:
+        with transaction.atomic():
+            ids = list(
+                BloodRequest.objects.filter(is_fulfilled=False, is_expired=False, created_at__lt=cutoff)
+                .order_by('created_at')
+                .select_for_update(skip_locked=True)
+                .values_list('id', flat=True)[:batch_size]
+            )
+            if not ids:
+                return total
+            total += BloodRequest.objects.filter(id__in=ids).update(is_expired=True)
+
+
+def archive_requests(older_than_days, batch_size=500):
+    """
+    Move fulfilled or expired requests created more than ``older_than_days``
+    ago, and their donor interests, into the archive tables. Returns the
+    number of requests archived.
+    """
+    cutoff = timezone.now() - timedelta(days=older_than_days)
+    total = 0
+    while True:
+        with transaction.atomic():
+            ids = list(
+                BloodRequest.objects.filter(created_at__lt=cutoff)
+                .exclude(is_fulfilled=False, is_expired=False)
+                .order_by('id')
+                .select_for_update(skip_locked=True)
+                .values_list('id', flat=True)[:batch_size]
+            )
+            if not ids:
+                return total
+            move_to_archive(ids)
+            total += len(ids)
+
+
+def move_to_archive(request_ids):
+    """Copy the rows into the archive tables and delete them, in the caller's transaction."""
+    now = timezone.now()
+    request_columns = ', '.join(ARCHIVED_REQUEST_COLUMNS)
+    interest_columns = ', '.join(ARCHIVED_INTEREST_COLUMNS)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {ArchivedDonorInterest._meta.db_table} ({interest_columns}, archived_at) "
+            f"SELECT {interest_columns}, %s FROM {DonorInterest._meta.db_table} "
+            f"WHERE blood_request_id = ANY(%s) ON CONFLICT DO NOTHING",
+            [now, request_ids],
+        )
+        cursor.execute(
+            f"INSERT INTO {ArchivedBloodRequest._meta.db_table} ({request_columns}, archived_at) "
+            f"SELECT {request_columns}, %s FROM {BloodRequest._meta.db_table} "
+            f"WHERE id = ANY(%s) ON CONFLICT DO NOTHING",
+            [now, request_ids],
+        )
+        # Raw deletes skip the per-row DonorInterest signals; the counters die with the request.
+        for model in (DonorInterest, RequestCandidate):
+            cursor.execute(f"DELETE FROM {model._meta.db_table} WHERE blood_request_id = ANY(%s)", [request_ids])
+        cursor.execute(f"DELETE FROM {BloodRequest._meta.db_table} WHERE id = ANY(%s)", [request_ids])
@@ -0,0 +1,95 @@
+"""
+Per-hospital token-bucket rate limiting.
+
+Each hospital gets one bucket per scope, stored in the default Django cache so
+every uWSGI worker shares it. A bucket holds up to ``capacity`` tokens and
+refills at ``per_minute`` tokens a minute; a request costs one token, or one
+per recipient for the notify endpoint.
+"""
+import math
+import time
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.throttling import BaseThrottle
+from raktseva.metrics import cache_lookup
+
+LOCK_TIMEOUT = 1
+LOCK_ATTEMPTS = 5
+
+
+class TokenBucket:
+    """
+    A token bucket persisted in a Django cache as ``(tokens, updated_at)``.
+    Updates are serialized with a short ``cache.add`` lock, which is atomic on
+    every built-in backend. If the lock can't be taken the update goes ahead
+    unlocked; a lost update only ever lets a request through.
+    """
+
+    def __init__(self, key, capacity, per_minute, cache=cache):
+        self.key = key
+        self.capacity = capacity
+        self.rate = per_minute / 60.0
+        self.cache = cache
+
+    def consume(self, cost=1, now=None):
+        """Take ``cost`` tokens. Returns ``(allowed, seconds_until_allowed or None)``."""
+        now = time.time() if now is None else now
+        locked = self._lock()
+        try:
+            tokens, updated = cache_lookup('throttle', self.cache.get(self.key)) or (self.capacity, now)
+            tokens = min(self.capacity, tokens + max(0.0, now - updated) * self.rate)
+
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+            wait = 0.0 if allowed else (cost - tokens) / self.rate if self.rate else None
+            # Keep the bucket only as long as it takes to refill; a full bucket needs no state.
+            ttl = math.ceil((self.capacity - tokens) / self.rate) + 1 if self.rate else None
+            self.cache.set(self.key, (tokens, now), ttl)
+            return allowed, wait
+        finally:
+            if locked:
+                self.cache.delete(f"{self.key}:lock")
+
+    def _lock(self):
+        for attempt in range(LOCK_ATTEMPTS):
+            if self.cache.add(f"{self.key}:lock", 1, LOCK_TIMEOUT):
+                return True
+            time.sleep(0.001 * (attempt + 1))
+        return False
+
+
+class HospitalRateThrottle(BaseThrottle):
+    """
+    Throttles a hospital user per ``scope`` using the ``HOSPITAL_RATE_LIMITS``
+    setting, ``{scope: (capacity, per_minute)}``. Other users are not throttled.
+    """
+    scope = None
+
+    def get_cost(self, request, view):
+        return 1
+
+    def allow_request(self, request, view):
+        hospital = getattr(request.user, 'hospital', None)
+        if hospital is None:
+            return True
+        capacity, per_minute = settings.HOSPITAL_RATE_LIMITS[self.scope]
+        bucket = TokenBucket(f"throttle:{self.scope}:{hospital.pk}", capacity, per_minute)
+        allowed, self._wait = bucket.consume(min(self.get_cost(request, view), capacity))
+        return allowed
+
+    def wait(self):
+        return self._wait
+
+
+class CreateRequestThrottle(HospitalRateThrottle):
+    scope = 'create_request'
+
+
+class NotifyDonorsThrottle(HospitalRateThrottle):
+    """Costs one token per recipient."""
+    scope = 'notify_donors'
+
+    def get_cost(self, request, view):
+        donor_ids = request.data.get('donor_ids') if hasattr(request.data, 'get') else None
+        return max(1, len(donor_ids)) if isinstance(donor_ids, list) else 1
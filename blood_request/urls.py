@@ -3,7 +3,8 @@ from .views import (
                    BloodRequestCreateView, BloodRequestListView, AvailableBloodRequestsView, \
                    FulfillBloodRequestView, ExtendBloodRequestView , CancelBloodRequestView, \
                    DonorInterestCreateView, InterestedDonorsView, NearbyDonorsView, \
-                   NotifyDonorView
+                   NotifyDonorView, RequestCandidatesView, DonorInterestStreamView, \
+                   AvailableRequestStreamView
 )
 
 
@@ -11,12 +12,15 @@ urlpatterns = [
     path('create/', BloodRequestCreateView.as_view(), name='blood-request-create'),
     path('my/', BloodRequestListView.as_view(), name='blood-request-list'),
     path('available/', AvailableBloodRequestsView.as_view(), name='available-blood-requests'),
+    path('available/stream/', AvailableRequestStreamView.as_view(), name='available-blood-requests-stream'),
     path('<int:pk>/fulfill/', FulfillBloodRequestView.as_view(), name='blood-request-fulfill'),
     path('<int:pk>/extend/', ExtendBloodRequestView.as_view(), name='blood-request-extend'),
     path('<int:pk>/cancel/', CancelBloodRequestView.as_view(), name='blood-request-cancel'),
     path('<int:pk>/help/', DonorInterestCreateView.as_view(), name='donor-help'),
     path('<int:pk>/interested-donors/', InterestedDonorsView.as_view(), name='interested-donors'),
+    path('<int:pk>/candidates/', RequestCandidatesView.as_view(), name='request-candidates'),
     path('nearby-donors/', NearbyDonorsView.as_view(), name='nearby-donors'),
+    path('interest-stream/', DonorInterestStreamView.as_view(), name='donor-interest-stream'),
     path('notify-donors/', NotifyDonorView.as_view(), name='notify-donors'),
 
 ]
@@ -1,7 +1,21 @@
 from rest_framework.response import Response
 from rest_framework import status
+from django.db import connection
+from django.db.models import F, Value, FloatField
+from django.db.models.functions import ASin, Cos, Least, Power, Radians, Sin, Sqrt
+from django.utils import timezone
+from datetime import timedelta
 from .models import BloodRequest
-from math import radians, cos, sin, asin, sqrt
+from donor.models import DonorInterest
+from hospital.models import Hospital
+from math import radians, degrees, cos, sin, asin, sqrt, floor
+
+REQUEST_LIFETIME = timedelta(hours=48)
+# NOTIFY channel for new donor interest; see blood_request.events.
+INTEREST_CHANNEL = 'donor_interest'
+EARTH_RADIUS_KM = 6371
+# Side of a spatial grid cell in degrees (~11 km of latitude).
+GEO_CELL_SIZE_DEG = 0.1
 
 
 def get_hospital_owned_request(pk, hospital):
@@ -14,11 +28,128 @@ def get_hospital_owned_request(pk, hospital):
             status=status.HTTP_404_NOT_FOUND
         )
 
+def record_donor_interest(donor, request_pk):
+    """
+    Insert a DonorInterest row for an open blood request in a single statement.
+
+    The request must exist, be unfulfilled, be younger than REQUEST_LIFETIME
+    and not belong to the donor's own hospital. Duplicate offers are absorbed
+    by ON CONFLICT DO NOTHING on the (donor, blood_request) unique constraint,
+    and the request's interest_count is bumped only when a row was inserted.
+    A new row is also announced on ``INTEREST_CHANNEL`` for the hospital's
+    event stream; Postgres delivers the NOTIFY only if the transaction commits.
+
+    Returns a tuple ``(request_open, created)``.
+    """
+    now = timezone.now()
+    sql = f"""
+        WITH target AS (
+            SELECT br.id, br.hospital_id
+            FROM {BloodRequest._meta.db_table} br
+            WHERE br.id = %s
+              AND br.is_fulfilled = FALSE
+              AND br.is_expired = FALSE
+              AND br.created_at >= %s
+              AND NOT EXISTS (
+                  SELECT 1 FROM {Hospital._meta.db_table} h
+                  WHERE h.id = br.hospital_id AND h.user_id = %s
+              )
+        ),
+        inserted AS (
+            INSERT INTO {DonorInterest._meta.db_table} (donor_id, blood_request_id, timestamp)
+            SELECT %s, target.id, %s FROM target
+            ON CONFLICT (donor_id, blood_request_id) DO NOTHING
+            RETURNING id, blood_request_id, donor_id, timestamp
+        ),
+        bumped AS (
+            UPDATE {BloodRequest._meta.db_table}
+            SET interest_count = interest_count + 1
+            WHERE id IN (SELECT blood_request_id FROM inserted)
+        ),
+        notified AS (
+            SELECT pg_notify(%s, json_build_object(
+                'id', inserted.id, 'hospital', target.hospital_id, 'request', inserted.blood_request_id,
+                'donor', inserted.donor_id, 'timestamp', inserted.timestamp
+            )::text)
+            FROM inserted JOIN target ON target.id = inserted.blood_request_id
+        )
+        SELECT EXISTS (SELECT 1 FROM target), EXISTS (SELECT 1 FROM inserted), (SELECT count(*) FROM notified)
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [request_pk, now - REQUEST_LIFETIME, donor.user_id, donor.id, now, INTEREST_CHANNEL])
+        request_open, created, _ = cursor.fetchone()
+    return request_open, created
+
 def calculate_distance(lat1, lon1, lat2, lon2):
     lon1, lat1, lon2, lat2 = map(radians, [lon1, lat1, lon2, lat2])
     dlon = lon2 - lon1
     dlat = lat2 - lat1
     a = sin(dlat/2)**2 + cos(lat1) * cos(lat2) * sin(dlon/2)**2
     c = 2 * asin(sqrt(a))
-    km = 6371 * c
+    km = EARTH_RADIUS_KM * c
     return km
+
+
+def bounding_box(lat, lon, radius_km):
+    """
+    Return ``(min_lat, max_lat, min_lon, max_lon)`` enclosing a circle of
+    ``radius_km`` around the point, for cheap range pre-filtering before the
+    exact haversine distance is applied.
+    """
+    dlat = degrees(radius_km / EARTH_RADIUS_KM)
+    lat_cos = cos(radians(lat))
+    dlon = 180.0 if lat_cos < 1e-6 else min(180.0, degrees(radius_km / (EARTH_RADIUS_KM * lat_cos)))
+    return lat - dlat, lat + dlat, lon - dlon, lon + dlon
+
+
+def distance_expression(lat, lon, lat_field='latitude', lon_field='longitude'):
+    """
+    Haversine distance in km from ``(lat, lon)`` to the row's coordinates as a
+    database expression, so distances can be filtered and ordered in SQL.
+    """
+    lat1 = Radians(Value(lat, output_field=FloatField()))
+    lon1 = Radians(Value(lon, output_field=FloatField()))
+    lat2 = Radians(F(lat_field))
+    lon2 = Radians(F(lon_field))
+    a = (
+        Power(Sin((lat2 - lat1) / 2), 2)
+        + Cos(lat1) * Cos(lat2) * Power(Sin((lon2 - lon1) / 2), 2)
+    )
+    return Value(2 * EARTH_RADIUS_KM, output_field=FloatField()) * ASin(Sqrt(Least(a, Value(1.0))))
+
+
+def available_requests(donor, radius, mode='geo'):
+    """
+    Open requests for ``donor``'s blood group within ``radius`` km of them,
+    or in their city for ``mode='city'`` and donors without coordinates.
+    """
+    requests = BloodRequest.objects.filter(
+        blood_group=donor.blood_group,
+        is_fulfilled=False,
+        is_expired=False,
+        created_at__gte=timezone.now() - REQUEST_LIFETIME
+    )
+
+    if mode == 'city' or donor.latitude is None or donor.longitude is None:
+        if donor.canonical_city_id:
+            return requests.filter(canonical_city_id=donor.canonical_city_id)
+        return requests.filter(city=donor.city)
+
+    return requests.filter(
+        cell__in=cells_within(donor.latitude, donor.longitude, radius)
+    ).annotate(
+        distance=distance_expression(donor.latitude, donor.longitude)
+    ).filter(distance__lte=radius)
+
+
+def cell_key(lat, lon):
+    """Grid cell containing the point, e.g. ``'129:775'``."""
+    return f"{floor(float(lat) / GEO_CELL_SIZE_DEG)}:{floor(float(lon) / GEO_CELL_SIZE_DEG)}"
+
+
+def cells_within(lat, lon, radius_km):
+    """Keys of every grid cell overlapping the bounding box of the circle."""
+    min_lat, max_lat, min_lon, max_lon = bounding_box(lat, lon, radius_km)
+    lat_range = range(floor(min_lat / GEO_CELL_SIZE_DEG), floor(max_lat / GEO_CELL_SIZE_DEG) + 1)
+    lon_range = range(floor(min_lon / GEO_CELL_SIZE_DEG), floor(max_lon / GEO_CELL_SIZE_DEG) + 1)
+    return [f"{i}:{j}" for i in lat_range for j in lon_range]
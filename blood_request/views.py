@@ -1,20 +1,39 @@
 # coding=utf-8
+import math
+from functools import partial
+from adrf.views import APIView as AsyncAPIView
 from rest_framework import generics, permissions
-from .models import BloodRequest
+from .models import BloodRequest, RequestCandidate, ArchivedBloodRequest
 from donor.models import Donor, DonorInterest
-from donor.serializers import DonorPublicSerializer
-from .serializers import BloodRequestSerializer, NotifyDonorSerializer
+from donor.serializers import DonorPublicSerializer, NearbyDonorSerializer
+from donor.enums import COMPATIBLE_DONOR_GROUPS
+from city.utils import resolve_city
+from .serializers import BloodRequestSerializer, BloodRequestHistorySerializer, NotifyDonorSerializer, RequestCandidateSerializer
 from users.permissions import IsActiveDonor, IsActiveHospital
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from django.utils import timezone
-from datetime import timedelta
-from .utils import get_hospital_owned_request, calculate_distance
+from django.db.models import Value, BooleanField
+from django.conf import settings
+from datetime import datetime, time, timedelta
+from django.utils.dateparse import parse_date
+from .utils import get_hospital_owned_request, record_donor_interest, bounding_box, distance_expression, \
+    available_requests
+from .pagination import DistanceCursorPagination
+from .throttling import CreateRequestThrottle, NotifyDonorsThrottle
 from rest_framework import status
 from django.shortcuts import get_object_or_404
-from rest_framework.exceptions import PermissionDenied
-from django.core.mail import send_mail
+from rest_framework.exceptions import PermissionDenied, NotFound, ValidationError
+from donor.notifications import aenqueue_notifications
 from drf_yasg.utils import swagger_auto_schema
+from rest_framework.renderers import JSONRenderer
+from raktseva.sse import EventStreamRenderer, event_stream, last_event_id, require_asgi, stream_response
+from raktseva.broker import notify
+from raktseva.replicas import ReplicaReadMixin
+from .events import (
+    REQUEST_CHANNEL, donor_subscription, interest_broker, missed_interest_events, missed_request_events,
+    request_broker, request_event,
+)
 
 
 class BloodRequestCreateView(generics.CreateAPIView):
@@ -34,12 +53,16 @@ class BloodRequestCreateView(generics.CreateAPIView):
         Responses:
           - 201 Created: BloodRequest data
           - 403 Forbidden: wrong role
+          - 429 Too Many Requests: hospital rate limit hit; see `Retry-After`
     """
     serializer_class = BloodRequestSerializer
     permission_classes = [permissions.IsAuthenticated, IsActiveHospital]
+    throttle_classes = [CreateRequestThrottle]
 
     def perform_create(self, serializer):
-        serializer.save(hospital=self.request.user.hospital)
+        blood_request = serializer.save(hospital=self.request.user.hospital)
+        # Delivered to donors' available/stream/ once the request commits.
+        notify(REQUEST_CHANNEL, request_event(blood_request))
 
 
 class BloodRequestListView(generics.ListAPIView):
@@ -51,42 +74,158 @@ class BloodRequestListView(generics.ListAPIView):
         Headers:
           - Authorization: Bearer `<access_token>`
 
+        Optional query params:
+          - include_archived (bool): also list archived requests, flagged `archived: true`
+          - since (date, YYYY-MM-DD): with include_archived, only requests created on or after
+            this date (default: the last `BLOOD_REQUEST_HISTORY_DAYS` days)
+
         Responses:
           - 200 OK: paginated list of your requests
     """
     serializer_class = BloodRequestSerializer
     permission_classes = [permissions.IsAuthenticated, IsActiveHospital]
 
+    def include_archived(self):
+        return self.request.query_params.get('include_archived', '').lower() in ('1', 'true', 'yes')
+
+    def get_serializer_class(self):
+        if self.include_archived():
+            return BloodRequestHistorySerializer
+        return BloodRequestSerializer
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        if not getattr(self, 'swagger_fake_view', False):
+            context['hospital'] = self.request.user.hospital
+        return context
+
     def get_queryset(self):
-        return BloodRequest.objects.filter(hospital=self.request.user.hospital).order_by('id')
+        if getattr(self, 'swagger_fake_view', False):
+            return BloodRequest.objects.none()
+        hospital = self.request.user.hospital
+        if not self.include_archived():
+            return BloodRequest.objects.filter(hospital=hospital).order_by('id')
+
+        # Bounding created_at lets Postgres prune archive partitions outside the window.
+        since = self.request.query_params.get('since')
+        if since:
+            try:
+                since_date = parse_date(since)
+            except ValueError:
+                since_date = None
+            if since_date is None:
+                raise ValidationError({'since': 'Expected a date in YYYY-MM-DD format.'})
+            since = timezone.make_aware(datetime.combine(since_date, time.min))
+        else:
+            since = timezone.now() - timedelta(days=settings.BLOOD_REQUEST_HISTORY_DAYS)
+
+        fields = BloodRequestHistorySerializer.Meta.fields
+        live = BloodRequest.objects.filter(hospital=hospital, created_at__gte=since).values(*fields).annotate(
+            archived=Value(False, output_field=BooleanField())
+        )
+        archived = ArchivedBloodRequest.objects.filter(
+            hospital_id=hospital.id, created_at__gte=since
+        ).values(*fields).annotate(
+            archived=Value(True, output_field=BooleanField())
+        )
+        return live.union(archived, all=True).order_by('id')
+
+class AvailableRequestsSearchMixin:
+    """The `radius` and `mode` query params shared by the available-requests list and stream."""
+
+    def get_search(self):
+        """``(donor, radius, mode)`` for ``available_requests``."""
+        donor = self.request.user.donor
+        mode = self.get_mode()
+        # The radius only applies to a geo search, so it isn't validated for city mode.
+        geo = mode == 'geo' and donor.latitude is not None and donor.longitude is not None
+        return donor, self.get_radius() if geo else None, mode
+
+    def get_mode(self):
+        mode = self.request.query_params.get('mode', 'geo')
+        if mode not in ('geo', 'city'):
+            raise ValidationError({"mode": "Must be 'geo' or 'city'."})
+        return mode
+
+    def get_radius(self):
+        value = self.request.query_params.get('radius')
+        if value in (None, ''):
+            return settings.AVAILABLE_REQUESTS_RADIUS_KM
+        try:
+            radius = float(value)
+        except ValueError:
+            raise ValidationError({"radius": "Must be a number."})
+        if not 0 < radius <= settings.AVAILABLE_REQUESTS_MAX_RADIUS_KM:
+            raise ValidationError({"radius": f"Must be between 0 and {settings.AVAILABLE_REQUESTS_MAX_RADIUS_KM} km."})
+        return radius
+
 
-class AvailableBloodRequestsView(generics.ListAPIView):
+class AvailableBloodRequestsView(ReplicaReadMixin, AvailableRequestsSearchMixin, generics.ListAPIView):
     """
         List unfulfilled, non-expired requests matching your donor profile.
 
+        Requests within `radius` km of your location are returned; donors
+        without coordinates (or `mode=city`) get requests from their city.
+
         **GET** `/api/blood-requests/available/`
 
         Headers:
           - Authorization: Bearer `<access_token>`
 
+        Optional query params:
+          - radius (km, default 25)
+          - mode (`geo` or `city`)
+
         Responses:
           - 200 OK: matching BloodRequest list
+          - 400 Bad Request: invalid query params
           - 403/401: wrong role or unauthenticated
     """
     serializer_class = BloodRequestSerializer
     permission_classes = [permissions.IsAuthenticated, IsActiveDonor]
 
     def get_queryset(self):
-        donor = self.request.user.donor
-        now = timezone.now()
-        expiry_time = now - timedelta(hours=48)
+        return available_requests(*self.get_search()).order_by('-created_at')
+
+
+class AvailableRequestStreamView(AvailableRequestsSearchMixin, AsyncAPIView):
+    """
+        Stream new blood requests matching your donor profile as server-sent events.
+
+        Pushes each request a hospital creates that `available/` would list for the same
+        `radius`/`mode`, so the app no longer needs to poll. Requires the ASGI deployment.
+        Streams close after `EVENT_STREAM_MAX_SECONDS`; reconnect with `Last-Event-ID`
+        (sent automatically by `EventSource`) or `?last_event_id=` to receive the requests
+        created in between.
+
+        **GET** `/api/blood-requests/available/stream/`
 
-        return BloodRequest.objects.filter(
-            blood_group=donor.blood_group,
-            city=donor.city,
-            is_fulfilled=False,
-            created_at__gte=expiry_time
-        ).order_by('-created_at')
+        Headers:
+          - Authorization: Bearer `<access_token>`
+          - Last-Event-ID: id of the last request received (optional)
+
+        Optional query params:
+          - radius (km, default 25)
+          - mode (`geo` or `city`)
+
+        Responses:
+          - 200 OK: `text/event-stream` of `blood-request` events carrying BloodRequest data
+          - 400 Bad Request: invalid query params
+          - 401/403: unauthenticated or not an active donor
+          - 503 Service Unavailable: served by a WSGI worker; poll instead
+    """
+    permission_classes = [permissions.IsAuthenticated, IsActiveDonor]
+    renderer_classes = [JSONRenderer, EventStreamRenderer]
+
+    async def get(self, request, *args, **kwargs):
+        require_asgi(request)
+        donor, radius, mode = self.get_search()
+        keys, accept = donor_subscription(donor, radius, mode)
+        after = last_event_id(request)
+        backlog = None
+        if after is not None:
+            backlog = partial(missed_request_events, donor, radius, mode, after, settings.EVENT_STREAM_REPLAY_LIMIT)
+        return stream_response(event_stream(request_broker, 'blood-request', keys, accept, backlog))
 
 class FulfillBloodRequestView(APIView):
     """
@@ -112,7 +251,7 @@ class FulfillBloodRequestView(APIView):
             return Response({"message": "Request already fulfilled."}, status=status.HTTP_400_BAD_REQUEST)
 
         blood_request.is_fulfilled = True
-        blood_request.save()
+        blood_request.save(update_fields=['is_fulfilled'])
         return Response({"message": "Request marked as fulfilled."})
 
 
@@ -140,7 +279,9 @@ class ExtendBloodRequestView(APIView):
             return Response({"message": "Cannot extend a fulfilled request."}, status=status.HTTP_400_BAD_REQUEST)
 
         blood_request.created_at = timezone.now()
-        blood_request.save()
+        blood_request.is_expired = False
+        blood_request.reminder_sent_at = None
+        blood_request.save(update_fields=['created_at', 'is_expired', 'reminder_sent_at'])
         return Response({"message": "Request extended by 48 hours."})
 
 class CancelBloodRequestView(APIView):
@@ -173,6 +314,8 @@ class DonorInterestCreateView(APIView):
     """
         Express interest in helping with a blood request.
 
+        Idempotent: repeating the call for the same request returns 200.
+
         **POST** `/api/blood-requests/{id}/help/`
 
         Headers:
@@ -180,33 +323,26 @@ class DonorInterestCreateView(APIView):
 
         Responses:
           - 201 Created: interest recorded
-          - 400/403/404: duplicate, forbidden, or not found
+          - 200 OK: interest was already recorded
+          - 403/404: forbidden, or request not found / no longer open
     """
     permission_classes = [permissions.IsAuthenticated, IsActiveDonor]
 
     def post(self, request, pk):
-        user = request.user
-        try:
-            donor = user.donor
-        except Donor.DoesNotExist:
-            return Response({"error": "Donor profile not found."}, status=status.HTTP_400_BAD_REQUEST)
-
-        try:
-            blood_request = BloodRequest.objects.get(pk=pk)
-        except BloodRequest.DoesNotExist:
-            return Response({"error": "Blood request not found."}, status=status.HTTP_404_NOT_FOUND)
+        request_open, created = record_donor_interest(request.user.donor, pk)
 
-        if hasattr(user, 'hospital') and blood_request.hospital == user.hospital:
-            return Response({"error": "You cannot respond to your own hospital's request."}, status=400)
-
-        if DonorInterest.objects.filter(donor=donor, blood_request=blood_request).exists():
-            return Response({"message": "You've already offered to help with this request."}, status=400)
+        if not request_open:
+            return Response(
+                {"error": "Blood request not found or no longer open."},
+                status=status.HTTP_404_NOT_FOUND
+            )
 
-        DonorInterest.objects.create(donor=donor, blood_request=blood_request)
+        if not created:
+            return Response({"message": "You've already offered to help with this request."}, status=status.HTTP_200_OK)
 
         return Response({"message": "Thank you for offering to help!"}, status=status.HTTP_201_CREATED)
 
-class InterestedDonorsView(generics.ListAPIView):
+class InterestedDonorsView(ReplicaReadMixin, generics.ListAPIView):
     """
         List all donors who offered help on your request.
 
@@ -233,9 +369,73 @@ class InterestedDonorsView(generics.ListAPIView):
         donor_ids = DonorInterest.objects.filter(blood_request=blood_request).values_list('donor', flat=True)
         return Donor.objects.filter(id__in=donor_ids).order_by('id')
 
-class NearbyDonorsView(generics.ListAPIView):
+class DonorInterestStreamView(AsyncAPIView):
+    """
+        Stream new donor interest on your hospital's requests as server-sent events.
+
+        Each event is sent when a donor offers help (`POST /api/blood-requests/{id}/help/`),
+        so dashboards no longer need to poll `interested-donors`. Requires the ASGI
+        deployment. Streams close after `EVENT_STREAM_MAX_SECONDS`; reconnect with
+        `Last-Event-ID` (sent automatically by `EventSource`) or `?last_event_id=` to
+        receive the events missed in between.
+
+        **GET** `/api/blood-requests/interest-stream/`
+
+        Headers:
+          - Authorization: Bearer `<access_token>`
+          - Last-Event-ID: id of the last event received (optional)
+
+        Responses:
+          - 200 OK: `text/event-stream` of `donor-interest` events,
+            `data: { "id", "hospital", "request", "donor", "timestamp" }`
+          - 401/403: unauthenticated or not an active hospital
+          - 503 Service Unavailable: served by a WSGI worker; poll instead
+    """
+    permission_classes = [permissions.IsAuthenticated, IsActiveHospital]
+    renderer_classes = [JSONRenderer, EventStreamRenderer]
+
+    async def get(self, request, *args, **kwargs):
+        require_asgi(request)
+        hospital_id = request.user.hospital.id
+        after = last_event_id(request)
+        backlog = None
+        if after is not None:
+            backlog = partial(missed_interest_events, hospital_id, after, settings.EVENT_STREAM_REPLAY_LIMIT)
+        return stream_response(event_stream(interest_broker, 'donor-interest', [hospital_id], backlog=backlog))
+
+class RequestCandidatesView(generics.ListAPIView):
+    """
+        List donors pre-matched to your request, nearest first.
+
+        **GET** `/api/blood-requests/{id}/candidates/`
+
+        Headers:
+          - Authorization: Bearer `<access_token>`
+
+        Responses:
+          - 200 OK: list of `{ donor, distance_km, score }`
+          - 403/404: forbidden or not found
+    """
+    serializer_class = RequestCandidateSerializer
+    permission_classes = [permissions.IsAuthenticated, IsActiveHospital]
+
+    def get_queryset(self):
+        if getattr(self, 'swagger_fake_view', False):
+            return RequestCandidate.objects.none()
+        blood_request, error = get_hospital_owned_request(self.kwargs['pk'], self.request.user.hospital)
+        if error:
+            raise NotFound(error.data['error'])
+
+        return RequestCandidate.objects.filter(
+            blood_request=blood_request
+        ).select_related('donor').order_by('distance_km', 'id')
+
+class NearbyDonorsView(ReplicaReadMixin, generics.ListAPIView):
     """
-        List donors within 20 km matching your request.
+        List available donors near your hospital, nearest first.
+
+        The search starts at `radius` km and doubles (up to `max_radius`, at
+        most 8 times) until at least `min_results` donors are found.
 
         **GET** `/api/blood-requests/nearby-donors/`
 
@@ -243,91 +443,142 @@ class NearbyDonorsView(generics.ListAPIView):
           - Authorization: Bearer `<access_token>`
 
         Optional query params:
-          - blood_group, city
+          - blood_group (recipient group; compatible donors are returned)
+          - city
+          - radius (km, default 20)
+          - min_results (default 0, no expansion; at most 100)
+          - max_radius (km, default 200; both radii are capped at 500)
+          - cursor (from the `next` link)
 
         Responses:
-          - 200 OK: nearby donor list
+          - 200 OK: `{ next, radius_km, results }` with `distance_km` per donor
+          - 400 Bad Request: invalid query params
           - 403/401: wrong role or unauthenticated
     """
-    serializer_class = DonorPublicSerializer
+    serializer_class = NearbyDonorSerializer
     permission_classes = [permissions.IsAuthenticated, IsActiveHospital]
+    pagination_class = DistanceCursorPagination
+    # Doublings of the starting radius tried before settling for what was found.
+    max_expansions = 8
+    max_min_results = 100
 
     def get_queryset(self):
-        user = self.request.user
-        hospital = user.hospital
-
-        hospital_lat = hospital.latitude
-        hospital_lon = hospital.longitude
-
-        donors = Donor.objects.filter(is_available=True).order_by('id')
+        if getattr(self, 'swagger_fake_view', False):
+            return Donor.objects.none()
+        hospital = self.request.user.hospital
+        params = self.request.query_params
 
-        blood_group = self.request.query_params.get('blood_group')
-        if blood_group:
-            donors = donors.filter(blood_group=blood_group)
+        radius = self.get_radius_param('radius', settings.NEARBY_DONORS_RADIUS_KM)
+        max_radius = max(radius, self.get_radius_param('max_radius', settings.NEARBY_DONORS_MAX_RADIUS_KM))
+        min_results = self.get_min_results()
+        self.search_radius = radius
 
-        nearby_donors = []
+        if hospital.latitude is None or hospital.longitude is None:
+            return Donor.objects.none()
 
-        for donor in donors:
-            if donor.latitude and donor.longitude:
-                distance = calculate_distance(hospital_lat, hospital_lon, donor.latitude, donor.longitude)
-                if distance <= 20:
-                    nearby_donors.append(donor.id)
+        donors = Donor.objects.filter(is_available=True)
 
-        return Donor.objects.filter(id__in=nearby_donors).order_by('id')
+        blood_group = params.get('blood_group')
+        if blood_group:
+            if blood_group not in COMPATIBLE_DONOR_GROUPS:
+                raise ValidationError({"blood_group": f"Unknown blood group '{blood_group}'."})
+            donors = donors.filter(blood_group__in=COMPATIBLE_DONOR_GROUPS[blood_group])
+
+        city = params.get('city')
+        if city:
+            canonical_city = resolve_city(city, create=False)
+            donors = donors.filter(canonical_city=canonical_city) if canonical_city else donors.none()
+
+        donors = donors.annotate(distance=distance_expression(hospital.latitude, hospital.longitude))
+
+        def within(radius):
+            min_lat, max_lat, min_lon, max_lon = bounding_box(hospital.latitude, hospital.longitude, radius)
+            return donors.filter(
+                latitude__range=(min_lat, max_lat),
+                longitude__range=(min_lon, max_lon),
+                distance__lte=radius,
+            )
 
-class NotifyDonorView(APIView):
+        for _ in range(self.max_expansions):
+            if not min_results or radius >= max_radius or within(radius)[:min_results].count() >= min_results:
+                break
+            radius = min(radius * 2, max_radius)
+
+        self.search_radius = radius
+        return within(radius)
+
+    def get_radius_param(self, name, default):
+        value = self.get_number_param(name, default)
+        if value <= 0:
+            raise ValidationError({name: "Must be positive."})
+        return min(value, settings.NEARBY_DONORS_RADIUS_LIMIT_KM)
+
+    def get_min_results(self):
+        value = self.get_number_param('min_results', 0)
+        if not 0 <= value <= self.max_min_results:
+            raise ValidationError({"min_results": f"Must be between 0 and {self.max_min_results}."})
+        return int(value)
+
+    def get_number_param(self, name, default):
+        value = self.request.query_params.get(name)
+        if value in (None, ''):
+            return default
+        try:
+            number = float(value)
+        except ValueError:
+            raise ValidationError({name: "Must be a number."})
+        if not math.isfinite(number):
+            raise ValidationError({name: "Must be a finite number."})
+        return number
+
+    def get_paginated_response(self, data):
+        self.paginator.extra = {'radius_km': self.search_radius}
+        return super().get_paginated_response(data)
+
+class NotifyDonorView(AsyncAPIView):
     """
         Send a private message to one or more donors.
 
+        Messages are queued and delivered in each donor's next digest email,
+        sent once their oldest queued message is `DONOR_DIGEST_WINDOW_MINUTES` old.
+
         **POST** `/api/blood-requests/notify-donors/`
 
         Headers:
           - Authorization: Bearer `<access_token>`
 
         Request JSON:
-          - donor_ids (list of ints, required)
+          - donor_ids (list of ints, required; at most `NOTIFY_DONORS_MAX_RECIPIENTS`)
           - message (string, required)
 
         Responses:
-          - 200 OK: `{ "sent": <count> }`
+          - 200 OK: `{ "detail": "Messages queued", "queued": <count> }`
           - 400/403: invalid input or forbidden
+          - 404 Not Found: none of the donors exist
+          - 429 Too Many Requests: hospital rate limit hit (each recipient costs one token); see `Retry-After`
     """
     permission_classes = [permissions.IsAuthenticated, IsActiveHospital]
+    throttle_classes = [NotifyDonorsThrottle]
 
-    def post(self, request, *args, **kwargs):
+    async def post(self, request, *args, **kwargs):
         serializer = NotifyDonorSerializer(data=request.data)
         if serializer.is_valid():
             donor_ids = serializer.validated_data['donor_ids']
             message = serializer.validated_data['message']
 
+            # Loaded by IsActiveHospital during the permission check.
             hospital = request.user.hospital
             hospital_name = hospital.name
 
             cutomized_message = f"Message from {hospital_name}:\n\n{message}"
-            donors = self.get_donors(donor_ids)
-            if not donors:
+            donor_ids = await self.get_donor_ids(donor_ids)
+            if not donor_ids:
                 return Response({"detail": "Donors not found"}, status=status.HTTP_404_NOT_FOUND)
 
-            for donor in donors:
-                if not self.send_email(donor, cutomized_message):
-                    return Response({"detail": f"Failed to send message to donor {donor.email}"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-
-            return Response({"detail": "Messages sent successfully"}, status=status.HTTP_200_OK)
+            queued = await aenqueue_notifications(donor_ids, cutomized_message)
+            return Response({"detail": "Messages queued", "queued": queued}, status=status.HTTP_200_OK)
 
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-    def get_donors(self, donor_ids):
-        return Donor.objects.filter(id__in=donor_ids)
-
-    def send_email(self, donor, message):
-        try:
-            send_mail(
-                f"Blood Donation Request",
-                message,
-                'from@example.com',
-                [donor.user.email],
-                fail_silently=False
-            )
-            return True
-        except Exception as e:
-            return False
\ No newline at end of file
+    async def get_donor_ids(self, donor_ids):
+        return [donor_id async for donor_id in Donor.objects.filter(id__in=donor_ids).values_list('id', flat=True)]
@@ -0,0 +1,14 @@
+from django.contrib import admin
+from .models import City, CityAlias
+
+
+class CityAliasInline(admin.TabularInline):
+    model = CityAlias
+    extra = 1
+
+
+@admin.register(City)
+class CityAdmin(admin.ModelAdmin):
+    list_display = ['name', 'latitude', 'longitude']
+    search_fields = ['name', 'aliases__name']
+    inlines = [CityAliasInline]
@@ -0,0 +1,94 @@
+"""
+Offline gazetteer: city name -> (latitude, longitude) without any network.
+
+``gazetteer.bin`` is a sorted array of fixed-size records
+``(blake2b-64 of the normalized name, float32 lat, float32 lon)`` behind a
+small header. It is memory-mapped on first use and searched with a binary
+search, so lookups cost a handful of page reads and no parsing at startup.
+Rebuild it from ``gazetteer.csv`` with ``manage.py build_gazetteer``.
+"""
+import csv
+import mmap
+import struct
+import threading
+from hashlib import blake2b
+from pathlib import Path
+from django.conf import settings
+from .utils import normalize_city_name
+
+MAGIC = b'RKGZ'
+VERSION = 1
+HEADER = struct.Struct('<4sHI')
+RECORD = struct.Struct('<Qff')
+
+DATA_DIR = Path(__file__).resolve().parent / 'data'
+DEFAULT_SOURCE = DATA_DIR / 'gazetteer.csv'
+DEFAULT_PATH = DATA_DIR / 'gazetteer.bin'
+
+_gazetteer = None
+_gazetteer_lock = threading.Lock()
+
+
+def name_key(name):
+    digest = blake2b(normalize_city_name(name).encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'little')
+
+
+def build(source=DEFAULT_SOURCE, path=DEFAULT_PATH):
+    """Compile the CSV (name, latitude, longitude) into the binary format."""
+    records = {}
+    with open(source, newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            key = name_key(row['name'])
+            records.setdefault(key, (float(row['latitude']), float(row['longitude'])))
+
+    with open(path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, len(records)))
+        for key in sorted(records):
+            f.write(RECORD.pack(key, *records[key]))
+    return len(records)
+
+
+class Gazetteer:
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self.buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.count = HEADER.unpack_from(self.buffer, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} gazetteer file")
+
+    def key_at(self, index):
+        return struct.unpack_from('<Q', self.buffer, HEADER.size + index * RECORD.size)[0]
+
+    def lookup(self, name):
+        key = name_key(name)
+        low, high = 0, self.count
+        while low < high:
+            mid = (low + high) // 2
+            if self.key_at(mid) < key:
+                low = mid + 1
+            else:
+                high = mid
+        if low < self.count and self.key_at(low) == key:
+            _, lat, lon = RECORD.unpack_from(self.buffer, HEADER.size + low * RECORD.size)
+            return round(lat, 5), round(lon, 5)
+        return None
+
+
+def get_gazetteer():
+    global _gazetteer
+    if _gazetteer is None:
+        with _gazetteer_lock:
+            if _gazetteer is None:
+                _gazetteer = Gazetteer(getattr(settings, 'GAZETTEER_PATH', None) or DEFAULT_PATH)
+    return _gazetteer
+
+
+def lookup(name):
+    """``(latitude, longitude)`` for a known city name, else None."""
+    if not name:
+        return None
+    try:
+        return get_gazetteer().lookup(name)
+    except (OSError, ValueError):
+        return None
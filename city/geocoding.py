@@ -0,0 +1,261 @@
+"""
+Maps geocoding client.
+
+One pooled ``requests.Session`` per process, explicit connect/read timeouts,
+a few jittered retries for transient failures, and a circuit breaker that
+fails fast while the upstream is unhealthy so signups never hang a worker.
+``AsyncGeocodingClient`` does the same over ``httpx`` for async views.
+"""
+import asyncio
+import random
+import threading
+import time
+import weakref
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from django.conf import settings
+from raktseva import metrics
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+
+class CircuitBreaker:
+    """
+    Opens after ``failure_threshold`` consecutive failures, rejects calls for
+    ``reset_timeout`` seconds, then lets a single trial call through
+    (half-open) whose outcome closes or re-opens it.
+    """
+    CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.lock = threading.Lock()
+
+    def allow(self):
+        with self.lock:
+            if self.state == self.OPEN and self.clock() - self.opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                return True
+            return self.state == self.CLOSED
+
+    def record_success(self):
+        with self.lock:
+            self.state = self.CLOSED
+            self.failures = 0
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self.opened_at = self.clock()
+
+
+class GeocodingClient:
+    def __init__(self, endpoint, api_key, connect_timeout=2.0, read_timeout=5.0,
+                 max_retries=2, backoff=0.2, breaker=None, pool_size=10):
+        self.endpoint = endpoint
+        self.api_key = api_key
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.breaker = breaker or CircuitBreaker()
+        self.pool_size = pool_size
+        self.session = self.create_session()
+
+        self.stats_lock = threading.Lock()
+        self.stats = {
+            'requests': 0,
+            'successes': 0,
+            'failures': 0,
+            'retries': 0,
+            'short_circuited': 0,
+            'latency_seconds_total': 0.0,
+        }
+
+    def create_session(self):
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size, max_retries=0)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
+
+    def count(self, **increments):
+        with self.stats_lock:
+            for name, value in increments.items():
+                self.stats[name] += value
+
+    def metrics(self):
+        with self.stats_lock:
+            snapshot = dict(self.stats)
+        snapshot['circuit_state'] = self.breaker.state
+        return snapshot
+
+    def geocode(self, address):
+        """``(lat, lng)`` of the first result, or ``(None, None)`` on no match or failure."""
+        if not self.breaker.allow():
+            self.count(short_circuited=1)
+            return None, None
+
+        response = None
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                self.count(retries=1)
+                time.sleep(self.backoff_delay(attempt))
+
+            started = time.monotonic()
+            try:
+                response = self.session.get(self.endpoint, params=self.params(address),
+                                            timeout=(self.connect_timeout, self.read_timeout))
+            except requests.RequestException:
+                response = None
+            finally:
+                self.observe(response, time.monotonic() - started)
+
+            if not self.failed(response):
+                break
+        return self.location(response)
+
+    def params(self, address):
+        return {"address": address, "key": self.api_key}
+
+    def backoff_delay(self, attempt):
+        return self.backoff * (2 ** (attempt - 1)) * random.uniform(0.5, 1.5)
+
+    @staticmethod
+    def failed(response):
+        return response is None or response.status_code in RETRYABLE_STATUS
+
+    def observe(self, response, elapsed):
+        self.count(requests=1, latency_seconds_total=elapsed)
+        metrics.observe_external('geocode', elapsed, failed=self.failed(response))
+
+    def location(self, response):
+        """Settle the breaker and stats on the final response and extract the coordinates."""
+        if self.failed(response):
+            self.count(failures=1)
+            self.breaker.record_failure()
+            return None, None
+
+        coordinates = None, None
+        if response.status_code == 200:
+            try:
+                results = response.json().get('results')
+                if results:
+                    location = results[0]['geometry']['location']
+                    coordinates = location['lat'], location['lng']
+            except (ValueError, KeyError, IndexError, TypeError, AttributeError):
+                # e.g. an HTML error page from a proxy in front of the API.
+                self.count(failures=1)
+                self.breaker.record_failure()
+                return None, None
+
+        self.count(successes=1)
+        self.breaker.record_success()
+        return coordinates
+
+
+class AsyncGeocodingClient(GeocodingClient):
+    """
+    ``GeocodingClient`` for async views: the same retries, breaker and stats
+    over a pooled ``httpx.AsyncClient``, so a slow Maps API holds a coroutine
+    rather than a worker thread. A pool belongs to one event loop, so each loop
+    gets its own, closed when that loop shuts down (e.g. under WSGI, where each
+    async view runs in a fresh loop).
+    """
+
+    def create_session(self):
+        # {loop: (client, closer)}; the closer is parked until the loop shuts down.
+        self.sessions = weakref.WeakKeyDictionary()
+        return None
+
+    async def http(self):
+        loop = asyncio.get_running_loop()
+        if loop not in self.sessions:
+            session = httpx.AsyncClient(
+                timeout=httpx.Timeout(self.read_timeout, connect=self.connect_timeout),
+                limits=httpx.Limits(max_connections=self.pool_size, max_keepalive_connections=self.pool_size),
+            )
+            closer = close_on_shutdown(session)
+            await closer.asend(None)
+            self.sessions[loop] = session, closer
+        return self.sessions[loop][0]
+
+    async def geocode(self, address):
+        if not self.breaker.allow():
+            self.count(short_circuited=1)
+            return None, None
+
+        response = None
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                self.count(retries=1)
+                await asyncio.sleep(self.backoff_delay(attempt))
+
+            started = time.monotonic()
+            try:
+                session = await self.http()
+                response = await session.get(self.endpoint, params=self.params(address))
+            except httpx.HTTPError:
+                response = None
+            finally:
+                self.observe(response, time.monotonic() - started)
+
+            if not self.failed(response):
+                break
+        return self.location(response)
+
+
+async def close_on_shutdown(session):
+    """
+    Close ``session`` when its event loop shuts down: ``asyncio.run`` (which
+    asgiref and uvicorn use) finalizes suspended async generators first.
+    """
+    try:
+        yield
+    finally:
+        await session.aclose()
+
+
+_clients = {}
+_client_lock = threading.Lock()
+
+
+def build_client(cls, **kwargs):
+    return cls(
+        endpoint=settings.GEOCODING_ENDPOINT,
+        api_key=settings.GOOGLE_MAPS_API_KEY,
+        connect_timeout=settings.GEOCODING_CONNECT_TIMEOUT,
+        read_timeout=settings.GEOCODING_READ_TIMEOUT,
+        max_retries=settings.GEOCODING_MAX_RETRIES,
+        breaker=CircuitBreaker(
+            failure_threshold=settings.GEOCODING_BREAKER_THRESHOLD,
+            reset_timeout=settings.GEOCODING_BREAKER_RESET_SECONDS,
+        ),
+        **kwargs,
+    )
+
+
+def get_client(cls, **kwargs):
+    if cls not in _clients:
+        with _client_lock:
+            if cls not in _clients:
+                _clients[cls] = build_client(cls, **kwargs)
+    return _clients[cls]
+
+
+def get_geocoding_client():
+    """Process-wide client configured from settings."""
+    return get_client(GeocodingClient)
+
+
+def get_async_geocoding_client():
+    """Process-wide async client configured from settings."""
+    return get_client(AsyncGeocodingClient, pool_size=settings.GEOCODING_ASYNC_MAX_CONNECTIONS)
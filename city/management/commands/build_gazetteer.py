@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from city.gazetteer import DEFAULT_SOURCE, DEFAULT_PATH, build
+
+
+class Command(BaseCommand):
+    help = 'Compiles the offline city gazetteer CSV into its binary lookup file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--source', default=str(DEFAULT_SOURCE))
+        parser.add_argument('--output', default=str(DEFAULT_PATH))
+
+    def handle(self, *args, **options):
+        count = build(options['source'], options['output'])
+        self.stdout.write(self.style.SUCCESS(f"Wrote {count} places to {options['output']}"))
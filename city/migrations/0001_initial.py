@@ -0,0 +1,40 @@
+# Generated by Django 4.2.20 on 2026-10-19 16:00
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='City',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+                ('latitude', models.FloatField(blank=True, null=True)),
+                ('longitude', models.FloatField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name_plural': 'cities',
+                'ordering': ['name'],
+            },
+        ),
+        migrations.CreateModel(
+            name='CityAlias',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+                ('city', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='aliases', to='city.city')),
+            ],
+            options={
+                'verbose_name_plural': 'city aliases',
+                'ordering': ['name'],
+            },
+        ),
+    ]
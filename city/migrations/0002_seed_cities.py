@@ -0,0 +1,109 @@
+from django.db import migrations
+
+# (canonical name, latitude, longitude, other spellings)
+CITIES = [
+    ("Mumbai", 19.0760, 72.8777, ["Bombay"]),
+    ("Delhi", 28.7041, 77.1025, []),
+    ("New Delhi", 28.6139, 77.2090, []),
+    ("Bengaluru", 12.9716, 77.5946, ["Bangalore", "Bengalore", "Banglore"]),
+    ("Kolkata", 22.5726, 88.3639, ["Calcutta"]),
+    ("Chennai", 13.0827, 80.2707, ["Madras"]),
+    ("Hyderabad", 17.3850, 78.4867, []),
+    ("Pune", 18.5204, 73.8567, ["Poona"]),
+    ("Ahmedabad", 23.0225, 72.5714, ["Amdavad"]),
+    ("Jaipur", 26.9124, 75.7873, []),
+    ("Surat", 21.1702, 72.8311, []),
+    ("Lucknow", 26.8467, 80.9462, []),
+    ("Kanpur", 26.4499, 80.3319, ["Cawnpore"]),
+    ("Nagpur", 21.1458, 79.0882, []),
+    ("Indore", 22.7196, 75.8577, []),
+    ("Thane", 19.2183, 72.9781, []),
+    ("Navi Mumbai", 19.0330, 73.0297, []),
+    ("Bhopal", 23.2599, 77.4126, []),
+    ("Visakhapatnam", 17.6868, 83.2185, ["Vizag", "Vishakhapatnam"]),
+    ("Patna", 25.5941, 85.1376, []),
+    ("Vadodara", 22.3072, 73.1812, ["Baroda"]),
+    ("Ghaziabad", 28.6692, 77.4538, []),
+    ("Ludhiana", 30.9010, 75.8573, []),
+    ("Agra", 27.1767, 78.0081, []),
+    ("Nashik", 19.9975, 73.7898, ["Nasik"]),
+    ("Faridabad", 28.4089, 77.3178, []),
+    ("Meerut", 28.9845, 77.7064, []),
+    ("Rajkot", 22.3039, 70.8022, []),
+    ("Varanasi", 25.3176, 82.9739, ["Benares", "Banaras", "Kashi"]),
+    ("Srinagar", 34.0837, 74.7973, []),
+    ("Aurangabad", 19.8762, 75.3433, ["Chhatrapati Sambhajinagar"]),
+    ("Dhanbad", 23.7957, 86.4304, []),
+    ("Amritsar", 31.6340, 74.8723, []),
+    ("Prayagraj", 25.4358, 81.8463, ["Allahabad"]),
+    ("Ranchi", 23.3441, 85.3096, []),
+    ("Howrah", 22.5958, 88.2636, []),
+    ("Coimbatore", 11.0168, 76.9558, ["Kovai"]),
+    ("Jabalpur", 23.1815, 79.9864, []),
+    ("Gwalior", 26.2183, 78.1828, []),
+    ("Vijayawada", 16.5062, 80.6480, ["Bezawada"]),
+    ("Jodhpur", 26.2389, 73.0243, []),
+    ("Madurai", 9.9252, 78.1198, []),
+    ("Raipur", 21.2514, 81.6296, []),
+    ("Kota", 25.2138, 75.8648, []),
+    ("Guwahati", 26.1445, 91.7362, ["Gauhati"]),
+    ("Chandigarh", 30.7333, 76.7794, []),
+    ("Thiruvananthapuram", 8.5241, 76.9366, ["Trivandrum"]),
+    ("Kochi", 9.9312, 76.2673, ["Cochin"]),
+    ("Mysuru", 12.2958, 76.6394, ["Mysore"]),
+    ("Gurugram", 28.4595, 77.0266, ["Gurgaon"]),
+    ("Noida", 28.5355, 77.3910, []),
+    ("Bhubaneswar", 20.2961, 85.8245, []),
+    ("Dehradun", 30.3165, 78.0322, []),
+    ("Mangaluru", 12.9141, 74.8560, ["Mangalore"]),
+    ("Puducherry", 11.9416, 79.8083, ["Pondicherry"]),
+    ("Kozhikode", 11.2588, 75.7804, ["Calicut"]),
+    ("Tiruchirappalli", 10.7905, 78.7047, ["Trichy"]),
+    ("Hubballi", 15.3647, 75.1240, ["Hubli"]),
+    ("Belagavi", 15.8497, 74.4977, ["Belgaum"]),
+    ("Panaji", 15.4909, 73.8278, ["Panjim"]),
+    ("Shimla", 31.1048, 77.1734, []),
+    ("Jammu", 32.7266, 74.8570, []),
+    ("Salem", 11.6643, 78.1460, []),
+    ("Warangal", 17.9689, 79.5941, []),
+    ("Udaipur", 24.5854, 73.7125, []),
+    ("Ajmer", 26.4499, 74.6399, []),
+    ("Jalandhar", 31.3260, 75.5762, []),
+    ("Gorakhpur", 26.7606, 83.3732, []),
+    ("Cuttack", 20.4625, 85.8830, []),
+    ("Jamshedpur", 22.8046, 86.2029, []),
+    ("Tirupati", 13.6288, 79.4192, []),
+    ("Thrissur", 10.5276, 76.2144, ["Trichur"]),
+    ("Solapur", 17.6599, 75.9064, ["Sholapur"]),
+    ("Kolhapur", 16.7050, 74.2433, []),
+    ("Imphal", 24.8170, 93.9368, []),
+    ("Shillong", 25.5788, 91.8933, []),
+    ("Agartala", 23.8315, 91.2868, []),
+    ("Gangtok", 27.3389, 88.6065, []),
+]
+
+
+def normalize(name):
+    return ' '.join(name.split()).casefold()
+
+
+def seed_cities(apps, schema_editor):
+    City = apps.get_model('city', 'City')
+    CityAlias = apps.get_model('city', 'CityAlias')
+    for name, latitude, longitude, aliases in CITIES:
+        city, _ = City.objects.get_or_create(
+            name=name, defaults={'latitude': latitude, 'longitude': longitude}
+        )
+        for alias in [name, *aliases]:
+            CityAlias.objects.get_or_create(name=normalize(alias), defaults={'city': city})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('city', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(seed_cities, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,47 @@
+from django.db import migrations
+
+MODELS = [
+    ('donor', 'Donor'),
+    ('hospital', 'Hospital'),
+    ('blood_request', 'BloodRequest'),
+]
+
+
+def normalize(name):
+    return ' '.join(name.split()).casefold()
+
+
+def backfill_canonical_cities(apps, schema_editor):
+    City = apps.get_model('city', 'City')
+    CityAlias = apps.get_model('city', 'CityAlias')
+    cities = {alias.name: alias.city for alias in CityAlias.objects.select_related('city')}
+
+    for app_label, model_name in MODELS:
+        Model = apps.get_model(app_label, model_name)
+        raw_names = Model.objects.filter(canonical_city__isnull=True).values_list('city', flat=True).distinct()
+        for raw in list(raw_names):
+            key = normalize(raw or '')
+            if not key:
+                continue
+            city = cities.get(key)
+            if city is None:
+                city, _ = City.objects.get_or_create(name=' '.join(raw.split()))
+                CityAlias.objects.get_or_create(name=key, defaults={'city': city})
+                cities[key] = city
+            Model.objects.filter(city=raw, canonical_city__isnull=True).update(
+                canonical_city=city, city=city.name
+            )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('city', '0002_seed_cities'),
+        ('donor', '0007_canonical_city'),
+        ('hospital', '0003_canonical_city'),
+        ('blood_request', '0008_canonical_city'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_canonical_cities, migrations.RunPython.noop),
+    ]
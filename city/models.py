@@ -0,0 +1,54 @@
+from django.db import models
+
+
+class City(models.Model):
+    name = models.CharField(max_length=100, unique=True)
+    latitude = models.FloatField(null=True, blank=True)
+    longitude = models.FloatField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['name']
+        verbose_name_plural = 'cities'
+
+    def __str__(self):
+        return self.name
+
+
+class CityAlias(models.Model):
+    """A normalized spelling (including the canonical one) that maps to a City."""
+
+    city = models.ForeignKey(City, on_delete=models.CASCADE, related_name='aliases')
+    name = models.CharField(max_length=100, unique=True)
+
+    class Meta:
+        ordering = ['name']
+        verbose_name_plural = 'city aliases'
+
+    def __str__(self):
+        return f"{self.name} -> {self.city.name}"
+
+
+class CanonicalCityModel(models.Model):
+    """
+    Abstract base for models with a free-text ``city``: on save the text is
+    resolved to a City, ``canonical_city`` is set and ``city`` is rewritten to
+    the canonical spelling.
+    """
+    canonical_city = models.ForeignKey(City, on_delete=models.PROTECT, null=True, blank=True,
+                                       related_name='+')
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        from .utils import resolve_city
+
+        update_fields = kwargs.get('update_fields')
+        if self.city and (update_fields is None or 'city' in update_fields):
+            canonical = resolve_city(self.city)
+            if canonical is not None:
+                self.canonical_city = canonical
+                self.city = canonical.name
+                if update_fields is not None:
+                    kwargs['update_fields'] = set(update_fields) | {'canonical_city'}
+        super().save(*args, **kwargs)
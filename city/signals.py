@@ -0,0 +1,14 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .models import City, CityAlias
+from .utils import forget_city, normalize_city_name
+
+
+@receiver(post_save, sender=City)
+def register_canonical_alias(sender, instance, created, **kwargs):
+    CityAlias.objects.get_or_create(name=normalize_city_name(instance.name), defaults={'city': instance})
+
+
+@receiver(post_delete, sender=City)
+def evict_deleted_city(sender, instance, **kwargs):
+    forget_city(instance.id)
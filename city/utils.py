@@ -0,0 +1,122 @@
+import logging
+import threading
+from difflib import get_close_matches
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from .models import City, CityAlias
+
+logger = logging.getLogger(__name__)
+
+_alias_map = None
+_alias_lock = threading.Lock()
+
+
+def normalize_city_name(name):
+    """Collapse whitespace and casefold, e.g. ``'  New  Delhi '`` -> ``'new delhi'``."""
+    return ' '.join(str(name).split()).casefold()
+
+
+def clean_city_name(name):
+    return ' '.join(str(name).split())
+
+
+def get_alias_map():
+    """Process-wide ``{normalized alias: City}`` map, loaded on first use."""
+    global _alias_map
+    if _alias_map is None:
+        with _alias_lock:
+            if _alias_map is None:
+                aliases = CityAlias.objects.select_related('city')
+                _alias_map = {alias.name: alias.city for alias in aliases}
+    return _alias_map
+
+
+def remember_alias(name, city):
+    with _alias_lock:
+        if _alias_map is not None:
+            _alias_map[name] = city
+
+
+def forget_city(city_id):
+    with _alias_lock:
+        if _alias_map is not None:
+            for name in [name for name, city in list(_alias_map.items()) if city.id == city_id]:
+                _alias_map.pop(name, None)
+
+
+def clear_city_cache():
+    global _alias_map
+    with _alias_lock:
+        _alias_map = None
+
+
+def find_similar_city(key):
+    """Closest known City by fuzzy match against the alias map, or None."""
+    if len(key) < settings.CITY_FUZZY_MIN_LENGTH:
+        return None
+    alias_map = get_alias_map()
+    # difflib's ratio is at most 2 * min(len) / (len + len), so aliases whose
+    # length is too far from the key's can never reach the cutoff.
+    cutoff = settings.CITY_FUZZY_THRESHOLD
+    shortest, longest = len(key) * cutoff / (2 - cutoff), len(key) * (2 - cutoff) / cutoff
+    candidates = [name for name in list(alias_map) if shortest <= len(name) <= longest]
+    matches = get_close_matches(key, candidates, n=1, cutoff=cutoff)
+    return alias_map[matches[0]] if matches else None
+
+
+def resolve_city(name, create=True):
+    """
+    Map free-text city input to a canonical City.
+
+    Lookup order: in-memory alias map, alias table, fuzzy match against the
+    known aliases (stored as a new alias when ``create`` is set), and finally a
+    new City when ``create`` is set and ``may_create_city`` allows it.
+    Returns None for blank input or when nothing matches and no City is created.
+    """
+    key = normalize_city_name(name or '')
+    if not key:
+        return None
+
+    city = get_alias_map().get(key)
+    if city is not None:
+        return city
+
+    alias = CityAlias.objects.select_related('city').filter(name=key).first()
+    if alias is not None:
+        transaction.on_commit(lambda: remember_alias(key, alias.city))
+        return alias.city
+
+    city = find_similar_city(key)
+    if not create or (city is None and not may_create_city(name)):
+        return city
+
+    try:
+        with transaction.atomic():
+            if city is None:
+                # The City post_save signal registers its own normalized name.
+                city = City.objects.create(name=clean_city_name(name))
+            else:
+                CityAlias.objects.create(city=city, name=key)
+    except IntegrityError:
+        # Another writer registered the same spelling concurrently.
+        alias = CityAlias.objects.select_related('city').filter(name=key).first()
+        return alias.city if alias else City.objects.filter(name__iexact=clean_city_name(name)).first()
+
+    transaction.on_commit(lambda: remember_alias(key, city))
+    return city
+
+
+def may_create_city(name):
+    """
+    Free text adds a new City only while the table is below ``CITY_CREATE_LIMIT``
+    rows, so arbitrary input can't grow it without bound; places the gazetteer
+    knows are always accepted.
+    """
+    from . import gazetteer
+
+    if gazetteer.lookup(clean_city_name(name)) is not None:
+        return True
+    if City.objects.count() < settings.CITY_CREATE_LIMIT:
+        return True
+    logger.warning("Not creating city %r: CITY_CREATE_LIMIT (%d) reached.", name, settings.CITY_CREATE_LIMIT)
+    return False
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class DonorConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "donor"
+
+    def ready(self):
+        from . import signals  # noqa: F401
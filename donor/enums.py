@@ -9,3 +9,16 @@ class BloodGroupEnum(str, Enum):
     O_NEG = "O-"
     AB_POS = "AB+"
     AB_NEG = "AB-"
+
+
+# Recipient blood group -> donor blood groups that can safely give to it.
+COMPATIBLE_DONOR_GROUPS = {
+    BloodGroupEnum.O_NEG.value: ("O-",),
+    BloodGroupEnum.O_POS.value: ("O-", "O+"),
+    BloodGroupEnum.A_NEG.value: ("O-", "A-"),
+    BloodGroupEnum.A_POS.value: ("O-", "O+", "A-", "A+"),
+    BloodGroupEnum.B_NEG.value: ("O-", "B-"),
+    BloodGroupEnum.B_POS.value: ("O-", "O+", "B-", "B+"),
+    BloodGroupEnum.AB_NEG.value: ("O-", "A-", "B-", "AB-"),
+    BloodGroupEnum.AB_POS.value: ("O-", "O+", "A-", "A+", "B-", "B+", "AB-", "AB+"),
+}
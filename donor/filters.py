@@ -0,0 +1,17 @@
+import django_filters
+from city.utils import resolve_city
+from .models import Donor
+
+
+class DonorFilter(django_filters.FilterSet):
+    city = django_filters.CharFilter(method='filter_city')
+
+    class Meta:
+        model = Donor
+        fields = ['blood_group', 'city', 'is_available']
+
+    def filter_city(self, queryset, name, value):
+        city = resolve_city(value, create=False)
+        if city is None:
+            return queryset.none()
+        return queryset.filter(canonical_city=city)
@@ -0,0 +1,8 @@
+from django.conf import settings
+from raktseva.scheduler import job
+from .notifications import flush_digests
+
+
+@job(interval=settings.DONOR_DIGEST_INTERVAL)
+def flush_donor_digests():
+    flush_digests()
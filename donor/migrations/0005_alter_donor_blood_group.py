@@ -0,0 +1,18 @@
+# Generated by Django 4.2.20 on 2026-10-19 15:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('donor', '0004_alter_donor_options_alter_donorinterest_options'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='donor',
+            name='blood_group',
+            field=models.CharField(choices=[('A+', 'A+'), ('A-', 'A-'), ('B+', 'B+'), ('B-', 'B-'), ('O+', 'O+'), ('O-', 'O-'), ('AB+', 'AB+'), ('AB-', 'AB-')], help_text="Required blood group (e.g. 'O+').", max_length=3),
+        ),
+    ]
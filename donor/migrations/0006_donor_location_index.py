@@ -0,0 +1,17 @@
+# Generated by Django 4.2.20 on 2026-10-19 15:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('donor', '0005_alter_donor_blood_group'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='donor',
+            index=models.Index(fields=['latitude', 'longitude'], name='donor_location'),
+        ),
+    ]
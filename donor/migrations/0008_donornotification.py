@@ -0,0 +1,27 @@
+# Generated by Django 4.2.20 on 2026-10-19 16:19
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('donor', '0007_canonical_city'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DonorNotification',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('message', models.TextField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('donor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pending_notifications', to='donor.donor')),
+            ],
+            options={
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['donor', 'created_at'], name='notification_donor_created')],
+            },
+        ),
+    ]
@@ -2,8 +2,9 @@ from django.db import models
 from django.conf import settings
 from blood_request.models import BloodRequest
 from .enums import BloodGroupEnum
+from city.models import CanonicalCityModel
 
-class Donor(models.Model):
+class Donor(CanonicalCityModel):
 
     user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     blood_group = models.CharField(max_length=3,
@@ -18,6 +19,9 @@ class Donor(models.Model):
 
     class Meta:
         ordering =  ['id']
+        indexes = [
+            models.Index(fields=['latitude', 'longitude'], name='donor_location'),
+        ]
 
     def __str__(self):
         return f"{self.user.name} ({self.blood_group})"
@@ -33,4 +37,22 @@ class DonorInterest(models.Model):
         ordering = ['id']
 
     def __str__(self):
-        return f"{self.donor.user.email} interested in {self.blood_request.blood_group}"
\ No newline at end of file
+        return f"{self.donor.user.email} interested in {self.blood_request.blood_group}"
+
+class DonorNotification(models.Model):
+    """
+    A message waiting to go out in the donor's next digest email. Rows are
+    deleted once the digest carrying them is sent.
+    """
+    donor = models.ForeignKey(Donor, on_delete=models.CASCADE, related_name='pending_notifications')
+    message = models.TextField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['donor', 'created_at'], name='notification_donor_created'),
+        ]
+
+    def __str__(self):
+        return f"Notification for donor {self.donor_id}"
@@ -0,0 +1,93 @@
+"""
+Buffered donor notifications.
+
+Messages for a donor are queued as ``DonorNotification`` rows and sent as one
+digest email once the oldest of them has waited ``DONOR_DIGEST_WINDOW_MINUTES``,
+so a donor hearing from many hospitals gets one email per window instead of
+one per message. ``flush_digests`` is run by the scheduler.
+"""
+import logging
+from datetime import timedelta
+from itertools import groupby
+from operator import itemgetter
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.db.models import Min
+from django.utils import timezone
+from raktseva.metrics import external_call
+from .models import DonorNotification
+
+logger = logging.getLogger(__name__)
+
+
+def enqueue_notifications(donor_ids, message):
+    """Queue ``message`` for each donor. Returns the number queued."""
+    return len(DonorNotification.objects.bulk_create(
+        DonorNotification(donor_id=donor_id, message=message) for donor_id in donor_ids
+    ))
+
+
+async def aenqueue_notifications(donor_ids, message):
+    """Async ``enqueue_notifications``."""
+    return len(await DonorNotification.objects.abulk_create(
+        [DonorNotification(donor_id=donor_id, message=message) for donor_id in donor_ids]
+    ))
+
+
+def due_donor_ids(window_minutes):
+    cutoff = timezone.now() - timedelta(minutes=window_minutes)
+    return list(
+        DonorNotification.objects.values('donor_id')
+        .annotate(oldest=Min('created_at'))
+        .filter(oldest__lte=cutoff)
+        .order_by('donor_id')
+        .values_list('donor_id', flat=True)
+    )
+
+
+def build_digest(rows, connection):
+    count = len(rows)
+    subject = "Blood Donation Request" if count == 1 else f"Blood Donation Requests ({count} new messages)"
+    body = "\n\n---\n\n".join(row['message'] for row in rows)
+    return EmailMessage(subject, body, settings.EMAIL_HOST_USER, [rows[0]['donor__user__email']],
+                        connection=connection)
+
+
+def flush_digests(window_minutes=None, chunk_size=500):
+    """
+    Send one digest per donor whose oldest queued message is older than the
+    window, over a single SMTP connection. Each donor's rows are deleted in
+    the same transaction as the send, so a failed send leaves them queued for
+    the next run; it is logged and the remaining donors are still sent.
+    Returns ``(digests, messages)`` sent.
+    """
+    if window_minutes is None:
+        window_minutes = settings.DONOR_DIGEST_WINDOW_MINUTES
+    donor_ids = due_donor_ids(window_minutes)
+    digests = messages = 0
+    with get_connection() as connection:
+        for start in range(0, len(donor_ids), chunk_size):
+            rows = (
+                DonorNotification.objects.filter(donor_id__in=donor_ids[start:start + chunk_size])
+                .order_by('donor_id', 'id')
+                .values('id', 'donor_id', 'donor__user__email', 'message')
+            )
+            for _, group in groupby(rows, key=itemgetter('donor_id')):
+                group = list(group)
+                try:
+                    with transaction.atomic():
+                        # A concurrent flush that got here first leaves nothing to delete.
+                        deleted, _ = DonorNotification.objects.filter(id__in=[row['id'] for row in group]).delete()
+                        if not deleted:
+                            continue
+                        with external_call('smtp'):
+                            build_digest(group, connection).send()
+                except Exception:
+                    logger.exception("Digest for donor %s failed; leaving it queued.", group[0]['donor_id'])
+                    # The SMTP session may be broken; the next send reopens it.
+                    connection.close()
+                    continue
+                digests += 1
+                messages += len(group)
+    return digests, messages
@@ -18,12 +18,12 @@ class DonorSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at']
 
     def create(self, validated_data):
-        city = validated_data.get('city')
-        latitude, longitude = get_coordinates_from_city(city)
+        # Async views geocode up front and pass the coordinates to save().
+        if 'latitude' not in validated_data:
+            city = validated_data.get('city')
+            validated_data['latitude'], validated_data['longitude'] = get_coordinates_from_city(city)
         donor = Donor.objects.create(
             user=self.context['request'].user,
-            latitude=latitude,
-            longitude=longitude,
             **validated_data
         )
         return donor
@@ -46,5 +46,21 @@ class DonorPublicSerializer(serializers.ModelSerializer):
         fields = ['id', 'blood_group', 'city', 'is_available']
 
 
+class NearbyDonorSerializer(DonorPublicSerializer):
+    """
+        Donor schema with the distance from the requesting hospital.
+
+        Fields:
+        - id (int, read-only)
+        - blood_group (string)
+        - city (string)
+        - is_available (bool)
+        - distance_km (float, read-only)
+    """
+    distance_km = serializers.SerializerMethodField()
 
+    class Meta(DonorPublicSerializer.Meta):
+        fields = DonorPublicSerializer.Meta.fields + ['distance_km']
 
+    def get_distance_km(self, obj):
+        return round(obj.distance, 2)
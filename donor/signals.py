@@ -0,0 +1,29 @@
+from django.db.models import F
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from blood_request.models import BloodRequest
+from blood_request.matching import schedule, refresh_donor_candidates
+from .models import Donor, DonorInterest
+
+MATCHING_FIELDS = {'blood_group', 'is_available', 'latitude', 'longitude'}
+
+
+@receiver(post_save, sender=DonorInterest)
+def increment_interest_count(sender, instance, created, **kwargs):
+    if created:
+        BloodRequest.objects.filter(pk=instance.blood_request_id).update(
+            interest_count=F('interest_count') + 1
+        )
+
+
+@receiver(post_delete, sender=DonorInterest)
+def decrement_interest_count(sender, instance, **kwargs):
+    BloodRequest.objects.filter(pk=instance.blood_request_id, interest_count__gt=0).update(
+        interest_count=F('interest_count') - 1
+    )
+
+
+@receiver(post_save, sender=Donor)
+def match_donor_candidates(sender, instance, created, update_fields=None, **kwargs):
+    if update_fields is None or MATCHING_FIELDS & set(update_fields):
+        schedule(refresh_donor_candidates, instance.pk)
@@ -1,14 +1,18 @@
 # coding=utf-8
+from adrf import generics as async_generics
 from rest_framework import generics, permissions, exceptions
 from rest_framework.views import APIView
 from .models import Donor, DonorInterest
 from .serializers import DonorSerializer, DonorPublicSerializer
 from users.permissions import IsDonorUser, IsHospitalOrAdmin, IsActiveDonor
+from users.utils import asave_with_coordinates
+from raktseva.replicas import ReplicaReadMixin
 from django_filters.rest_framework import DjangoFilterBackend
+from .filters import DonorFilter
 from blood_request.serializers import BloodRequestSerializer
 from blood_request.models import BloodRequest
 
-class DonorCreateView(generics.CreateAPIView):
+class DonorCreateView(async_generics.CreateAPIView):
     """
         Create the authenticated donor’s profile.
 
@@ -30,10 +34,10 @@ class DonorCreateView(generics.CreateAPIView):
     serializer_class = DonorSerializer
     permission_classes = [permissions.IsAuthenticated, IsDonorUser]
 
-    def perform_create(self, serializer):
-        if hasattr(self.request.user, 'donor'):
-           raise exceptions.PermissionDenied("Donor Profile already exists.")
-        serializer.save()
+    async def perform_acreate(self, serializer):
+        if await Donor.objects.filter(user=self.request.user).aexists():
+            raise exceptions.PermissionDenied("Donor Profile already exists.")
+        await asave_with_coordinates(serializer)
 
 
 class DonorProfileView(generics.RetrieveUpdateAPIView):
@@ -59,7 +63,7 @@ class DonorProfileView(generics.RetrieveUpdateAPIView):
     def get_object(self):
         return self.request.user.donor
 
-class DonorListView(generics.ListAPIView):
+class DonorListView(ReplicaReadMixin, generics.ListAPIView):
     """
         List all available donors (hospital-only).
 
@@ -79,7 +83,7 @@ class DonorListView(generics.ListAPIView):
     serializer_class = DonorPublicSerializer
     permission_classes = [permissions.IsAuthenticated,  IsHospitalOrAdmin]
     filter_backends = [DjangoFilterBackend]
-    filterset_fields = ['blood_group', 'city', 'is_available']
+    filterset_class = DonorFilter
 
 class DonorDetailView(generics.RetrieveAPIView):
     """
@@ -99,7 +103,7 @@ class DonorDetailView(generics.RetrieveAPIView):
     permission_classes = [permissions.IsAuthenticated, IsHospitalOrAdmin]
     lookup_field = 'id'
 
-class MyDonorInterestsView(generics.ListAPIView):
+class MyDonorInterestsView(ReplicaReadMixin, generics.ListAPIView):
     """
        List blood requests you’ve expressed interest in.
 
@@ -0,0 +1,20 @@
+# Generated by Django 4.2.20 on 2026-10-19 16:01
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('city', '0002_seed_cities'),
+        ('hospital', '0002_hospital_latitude_hospital_longitude'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='hospital',
+            name='canonical_city',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='city.city'),
+        ),
+    ]
@@ -1,7 +1,8 @@
 from django.db import models
 from django.conf import settings
+from city.models import CanonicalCityModel
 
-class Hospital(models.Model):
+class Hospital(CanonicalCityModel):
     user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     name = models.CharField(max_length=255, null=False, blank=False)
     city = models.CharField(max_length=100)
@@ -17,28 +17,26 @@ class HospitalSerializer(serializers.ModelSerializer):
     """
     class Meta:
         model = Hospital
-        exclude = ['user', 'latitude', 'longitude']
+        exclude = ['user', 'latitude', 'longitude', 'canonical_city']
         read_only_fields = ['id', 'created_at']
 
 
     def create(self, validated_data):
-        city = validated_data.get('city')
-        latitude, longitude = get_coordinates_from_city(city)
+        # Async views geocode up front and pass the coordinates to save().
+        if 'latitude' not in validated_data:
+            city = validated_data.get('city')
+            validated_data['latitude'], validated_data['longitude'] = get_coordinates_from_city(city)
 
         hospital = Hospital.objects.create(
             user=self.context['request'].user,
-            latitude=latitude,
-            longitude=longitude,
             **validated_data
         )
         return hospital
 
     def update(self, instance, validated_data):
-        if 'city' in validated_data:
+        if 'city' in validated_data and 'latitude' not in validated_data:
             city = validated_data.get('city')
-            latitude, longitude = get_coordinates_from_city(city)
-            instance.latitude = latitude
-            instance.longitude = longitude
+            validated_data['latitude'], validated_data['longitude'] = get_coordinates_from_city(city)
 
         return super().update(instance, validated_data)
 
@@ -1,7 +1,8 @@
 from django.urls import path
-from .views import HospitalCreateView , HospitalProfileView
+from .views import HospitalCreateView , HospitalProfileView, HospitalDashboardView
 
 urlpatterns = [
     path('create/', HospitalCreateView.as_view(), name='hospital-create'),
     path('me/', HospitalProfileView.as_view(), name='hospital-profile'),
+    path('me/dashboard/', HospitalDashboardView.as_view(), name='hospital-dashboard'),
 ]
\ No newline at end of file
@@ -1,11 +1,24 @@
 # coding=utf-8
+from adrf import generics as async_generics
+from asgiref.sync import sync_to_async
 from rest_framework import generics, permissions, exceptions
+from rest_framework.response import Response
+from rest_framework.views import APIView
 from .models import Hospital
 from .serializers import HospitalSerializer
-from users.permissions import IsHospitalUser
-from django.core.exceptions import ObjectDoesNotExist
+from users.permissions import IsHospitalUser, IsActiveHospital
+from users.utils import asave_with_coordinates
+from django.conf import settings
+from django.db.models import Count, Q
+from django.utils import timezone
+from datetime import timedelta
+from blood_request.models import BloodRequest
+from blood_request.serializers import BloodRequestSummarySerializer
+from blood_request.utils import REQUEST_LIFETIME
 
-class HospitalCreateView(generics.CreateAPIView):
+SUMMARY_FIELDS = BloodRequestSummarySerializer.Meta.fields
+
+class HospitalCreateView(async_generics.CreateAPIView):
     """
         Create the authenticated hospital’s profile.
 
@@ -28,14 +41,12 @@ class HospitalCreateView(generics.CreateAPIView):
     serializer_class = HospitalSerializer
     permission_classes = [permissions.IsAuthenticated , IsHospitalUser]
 
-    def perform_create(self, serializer):
-        try:
-            self.request.user.hospital
+    async def perform_acreate(self, serializer):
+        if await Hospital.objects.filter(user=self.request.user).aexists():
             raise exceptions.PermissionDenied("Hospital profile already exists.")
-        except ObjectDoesNotExist:
-            serializer.save()
+        await asave_with_coordinates(serializer)
 
-class HospitalProfileView(generics.RetrieveUpdateAPIView):
+class HospitalProfileView(async_generics.RetrieveUpdateAPIView):
     """
         View or update your hospital profile.
 
@@ -57,3 +68,47 @@ class HospitalProfileView(generics.RetrieveUpdateAPIView):
 
     def get_object(self):
         return self.request.user.hospital
+
+    async def aget_object(self):
+        return await sync_to_async(self.get_object)()
+
+    async def perform_aupdate(self, serializer):
+        await asave_with_coordinates(serializer)
+
+
+class HospitalDashboardView(APIView):
+    """
+        Summary of your hospital’s blood requests.
+
+        **GET** `/api/hospitals/me/dashboard/`
+
+        Headers:
+          - Authorization: Bearer `<access_token>`
+
+        Responses:
+          - 200 OK: `{ open, expiring_soon, fulfilled, requests: [...] }`
+            where `requests` lists open requests with their interest_count
+          - 403 Forbidden: wrong role
+    """
+    permission_classes = [permissions.IsAuthenticated, IsActiveHospital]
+
+    def get(self, request):
+        hospital = request.user.hospital
+        now = timezone.now()
+        expiry_time = now - REQUEST_LIFETIME
+        expiring_soon_time = expiry_time + timedelta(hours=settings.BLOOD_REQUEST_EXPIRING_SOON_HOURS)
+
+        open_filter = Q(is_fulfilled=False, created_at__gte=expiry_time)
+
+        hospital_requests = BloodRequest.objects.filter(hospital=hospital)
+        summary = hospital_requests.aggregate(
+            open=Count('id', filter=open_filter),
+            expiring_soon=Count('id', filter=open_filter & Q(created_at__lt=expiring_soon_time)),
+            fulfilled=Count('id', filter=Q(is_fulfilled=True)),
+        )
+        open_requests = hospital_requests.filter(open_filter).order_by('created_at').values(*SUMMARY_FIELDS)
+
+        return Response({
+            **summary,
+            "requests": BloodRequestSummarySerializer(open_requests, many=True).data,
+        })
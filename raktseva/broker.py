@@ -0,0 +1,172 @@
+"""
+In-process fan-out of Postgres ``NOTIFY`` events to open event streams.
+
+Writers publish with ``notify()`` (or ``pg_notify`` inside their own SQL) on
+the normal Django connection, so an event goes out only if the writing
+transaction commits. Each process runs one ``Broker`` per channel: a single
+``LISTEN`` connection watched by the event loop with ``add_reader``, which
+hands every payload to the subscriptions indexed under the keys ``route``
+returns for it (and, if a subscription has one, its ``accept`` check). Routing
+is a dict lookup per key, so fanning out an event costs one queue put per
+interested subscriber no matter how many streams are open.
+
+Brokers need a long-lived event loop, i.e. the ASGI deployment profile
+(``APP_SERVER=asgi``). The listener is started by the first subscriber and
+reconnects on its own after a database restart; events published while it is
+down are lost, which is why streams support ``Last-Event-ID`` replay.
+"""
+import asyncio
+import json
+import logging
+from collections import defaultdict
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections
+from psycopg2 import sql
+from prometheus_client import Gauge
+
+logger = logging.getLogger(__name__)
+
+SUBSCRIBERS = Gauge('raktseva_stream_subscribers', 'Open event stream subscriptions.', ['channel'],
+                    multiprocess_mode='livesum')
+
+RECONNECT_DELAY = 5.0
+
+
+def notify(channel, payload, using='default'):
+    """Publish ``payload`` (JSON-encoded) on ``channel`` when the current transaction commits."""
+    with connections[using].cursor() as cursor:
+        cursor.execute('SELECT pg_notify(%s, %s)', [channel, json.dumps(payload, cls=DjangoJSONEncoder)])
+
+
+class Subscription:
+    """One stream's queue of events. A subscriber that falls ``maxsize`` events behind is cut off."""
+
+    def __init__(self, keys, maxsize, accept=None):
+        self.keys = keys
+        self.accept = accept
+        self.queue = asyncio.Queue(maxsize)
+        self.overflowed = False
+
+    def push(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+    async def get(self, timeout):
+        """The next event, or None if none arrives within ``timeout`` seconds."""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class Broker:
+    def __init__(self, channel, route, using='default'):
+        self.channel = channel
+        self.route = route
+        self.using = using
+        self.index = defaultdict(set)
+        self.loop = None
+        self.connection = None
+        self.connecting = None
+
+    async def subscribe(self, keys, maxsize=100, accept=None):
+        """
+        Receive events routed to any of ``keys`` (and passing ``accept``, if
+        given) until ``unsubscribe``. Starts this process's listener if needed.
+        """
+        await self.start()
+        return self.add(Subscription(keys, maxsize, accept))
+
+    def add(self, subscription):
+        for key in subscription.keys:
+            self.index[key].add(subscription)
+        SUBSCRIBERS.labels(self.channel).inc()
+        return subscription
+
+    def unsubscribe(self, subscription):
+        for key in subscription.keys:
+            subscribers = self.index.get(key)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self.index[key]
+        SUBSCRIBERS.labels(self.channel).dec()
+
+    def publish(self, event):
+        """Hand ``event`` to its subscribers in this process. Returns how many got it."""
+        matched = set()
+        for key in self.route(event):
+            matched.update(self.index.get(key, ()))
+        delivered = 0
+        for subscription in matched:
+            if subscription.accept is None or subscription.accept(event):
+                subscription.push(event)
+                delivered += 1
+        return delivered
+
+    async def start(self):
+        loop = asyncio.get_running_loop()
+        if self.loop is not loop:
+            # A new loop (another worker thread, or a fresh loop in tests) can't use the old reader.
+            self.stop()
+            self.loop = loop
+            self.index.clear()
+        if self.connection is None:
+            if self.connecting is None:
+                self.connecting = loop.create_task(self.connect())
+            await asyncio.shield(self.connecting)
+
+    async def connect(self):
+        try:
+            self.connection = await self.loop.run_in_executor(None, self.listen)
+            self.loop.add_reader(self.connection.fileno(), self.on_readable)
+        finally:
+            self.connecting = None
+
+    def listen(self):
+        wrapper = connections[self.using]
+        connection = wrapper.get_new_connection(wrapper.get_connection_params())
+        connection.autocommit = True
+        with connection.cursor() as cursor:
+            cursor.execute(sql.SQL('LISTEN {}').format(sql.Identifier(self.channel)))
+        return connection
+
+    def stop(self):
+        if self.connection is None:
+            return
+        try:
+            self.loop.remove_reader(self.connection.fileno())
+            self.connection.close()
+        except Exception:
+            pass
+        self.connection = None
+
+    def on_readable(self):
+        try:
+            self.connection.poll()
+        except Exception:
+            logger.warning("Lost the LISTEN connection for %s; reconnecting in %ss.", self.channel,
+                           RECONNECT_DELAY, exc_info=True)
+            self.stop()
+            self.loop.call_later(RECONNECT_DELAY, self.reconnect)
+            return
+        while self.connection.notifies:
+            notification = self.connection.notifies.pop(0)
+            try:
+                event = json.loads(notification.payload)
+            except ValueError:
+                logger.warning("Ignoring malformed %s payload: %r", self.channel, notification.payload)
+                continue
+            self.publish(event)
+
+    def reconnect(self):
+        if self.connection is None and self.connecting is None:
+            self.connecting = self.loop.create_task(self.connect())
+            self.connecting.add_done_callback(self.reconnect_failed)
+
+    def reconnect_failed(self, task):
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning("Reconnecting the %s listener failed; retrying in %ss.", self.channel, RECONNECT_DELAY)
+            self.loop.call_later(RECONNECT_DELAY, self.reconnect)
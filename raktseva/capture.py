@@ -0,0 +1,212 @@
+"""
+Sampled traffic capture for ``manage.py replay``.
+
+``TrafficCaptureMiddleware`` records the shape of ``CAPTURE_SAMPLE_RATE`` of
+API requests: method, URL name and kwargs, query params, the JSON body with
+personal values replaced by placeholders, the caller's role, status and
+duration. Records are handed to a ``CaptureWriter``, which queues them and
+appends them as NDJSON from a background thread, so a request never waits on
+disk; when the queue is full the record is dropped and counted.
+
+Each process writes its own file (``{pid}`` in ``CAPTURE_PATH``), so uWSGI
+workers never interleave lines.
+"""
+import atexit
+import json
+import logging
+import os
+import queue
+import random
+import re
+import threading
+import time
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+logger = logging.getLogger(__name__)
+
+# Body and query values under these keys are replaced by ``<key>``.
+ANONYMIZED_FIELDS = {
+    'email', 'password', 'name', 'code', 'contact_number', 'address', 'registration_number', 'message',
+    'refresh', 'access', 'token',
+}
+# Coordinates under these keys are rounded to about a kilometre.
+COORDINATE_FIELDS = {'latitude', 'longitude'}
+COORDINATE_PLACES = 2
+# A JWT under any other key is still replaced, by ``<jwt>``.
+JWT_PATTERN = re.compile(r'^eyJ[\w-]*\.[\w-]+\.[\w-]*$')
+
+
+def anonymize(value, key=None):
+    """
+    Strip personal data from a decoded JSON value: strings under
+    ``ANONYMIZED_FIELDS`` become ``<key>``, any other JWT becomes ``<jwt>``,
+    coordinates are rounded and id lists become ``<ids:N>``; everything else
+    (blood groups, cities, quantities, flags) is kept.
+    """
+    if isinstance(value, dict):
+        return {k: anonymize(v, k) for k, v in value.items()}
+    if isinstance(value, list):
+        if key and key.endswith('_ids'):
+            return f"<ids:{len(value)}>"
+        return [anonymize(item, key) for item in value]
+    if key in ANONYMIZED_FIELDS and value not in (None, ''):
+        return f"<{key}>"
+    if isinstance(value, str) and JWT_PATTERN.match(value):
+        return "<jwt>"
+    if key in COORDINATE_FIELDS:
+        try:
+            return round(float(value), COORDINATE_PLACES)
+        except (TypeError, ValueError):
+            return value
+    return value
+
+
+def caller_role(user):
+    if user is None or not user.is_authenticated:
+        return 'anonymous'
+    return 'admin' if user.is_staff else user.role
+
+
+class CaptureWriter:
+    """Append records as NDJSON from a background thread, batching writes."""
+
+    def __init__(self, path, max_queue=10000, flush_interval=1.0):
+        self.path_template = path
+        self.max_queue = max_queue
+        self.flush_interval = flush_interval
+        self.dropped = 0
+        self.pid = None
+        self.lock = threading.Lock()
+
+    def write(self, record):
+        if self.pid != os.getpid():
+            self.start()
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def start(self):
+        # Also runs after a fork: the parent's thread and queue don't survive into the child.
+        with self.lock:
+            if self.pid == os.getpid():
+                return
+            self.pid = os.getpid()
+            self.path = self.path_template.format(pid=self.pid)
+            self.queue = queue.Queue(maxsize=self.max_queue)
+            self.thread = threading.Thread(target=self.run, name='capture-writer', daemon=True)
+            self.thread.start()
+            atexit.register(self.close)
+
+    def run(self):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        with open(self.path, 'a', encoding='utf-8') as fh:
+            while True:
+                try:
+                    batch = [self.queue.get(timeout=self.flush_interval)]
+                except queue.Empty:
+                    continue
+                while True:
+                    try:
+                        batch.append(self.queue.get_nowait())
+                    except queue.Empty:
+                        break
+                stop = batch[-1] is None
+                lines = [json.dumps(record, default=str) for record in batch if record is not None]
+                if lines:
+                    fh.write('\n'.join(lines) + '\n')
+                    fh.flush()
+                for _ in batch:
+                    self.queue.task_done()
+                if stop:
+                    return
+
+    def flush(self):
+        """Block until everything queued so far is on disk."""
+        if self.pid == os.getpid():
+            self.queue.join()
+
+    def close(self):
+        if self.pid != os.getpid() or not self.thread.is_alive():
+            return
+        self.queue.put(None)
+        self.thread.join(timeout=5)
+        if self.dropped:
+            logger.warning("Traffic capture dropped %d records (queue full).", self.dropped)
+
+
+_writer = None
+
+
+def get_writer():
+    global _writer
+    if _writer is None:
+        _writer = CaptureWriter(settings.CAPTURE_PATH, settings.CAPTURE_QUEUE_SIZE)
+    return _writer
+
+
+class TrafficCaptureMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.CAPTURE_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        if not self.sampled(request):
+            return self.get_response(request)
+
+        body = self.read_body(request)
+        started = time.perf_counter()
+        response = self.get_response(request)
+        self.write(request, response, body, time.perf_counter() - started)
+        return response
+
+    async def __acall__(self, request):
+        if not self.sampled(request):
+            return await self.get_response(request)
+
+        # Reading the body of an ASGI request can block on the client.
+        body = await sync_to_async(self.read_body)(request)
+        started = time.perf_counter()
+        response = await self.get_response(request)
+        self.write(request, response, body, time.perf_counter() - started)
+        return response
+
+    def sampled(self, request):
+        return request.path.startswith('/api/') and random.random() < settings.CAPTURE_SAMPLE_RATE
+
+    def write(self, request, response, body, elapsed):
+        match = request.resolver_match
+        if match is None or not match.url_name:
+            return
+        get_writer().write({
+            'ts': round(time.time(), 3),
+            'method': request.method,
+            'route': match.url_name,
+            'kwargs': match.kwargs,
+            'query': anonymize({key: request.GET.get(key) for key in request.GET}),
+            'body': body,
+            'role': caller_role(getattr(request, 'user', None)),
+            'status': response.status_code,
+            'duration_ms': round(elapsed * 1000, 2),
+        })
+
+    def read_body(self, request):
+        if request.method in ('GET', 'HEAD', 'OPTIONS') or request.content_type != 'application/json':
+            return None
+        if int(request.META.get('CONTENT_LENGTH') or 0) > settings.CAPTURE_MAX_BODY_BYTES:
+            return None
+        try:
+            return anonymize(json.loads(request.body or 'null'))
+        except ValueError:
+            return None
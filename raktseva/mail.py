@@ -0,0 +1,44 @@
+"""
+Email from async views.
+
+``asend`` delivers Django ``EmailMessage`` objects over ``aiosmtplib`` when the
+configured backend is Django's SMTP backend, using the same ``EMAIL_*``
+settings, so an SMTP round trip holds a coroutine instead of a worker thread.
+Any other backend (locmem in tests, console in development) is called through
+``sync_to_async``.
+"""
+import aiosmtplib
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+
+SMTP_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
+
+
+async def asend(messages):
+    """Send ``messages`` over one connection. Returns the number sent."""
+    if not messages:
+        return 0
+    if settings.EMAIL_BACKEND != SMTP_BACKEND:
+        return await sync_to_async(get_connection().send_messages)(messages)
+
+    sent = 0
+    smtp = aiosmtplib.SMTP(
+        hostname=settings.EMAIL_HOST,
+        port=settings.EMAIL_PORT,
+        username=settings.EMAIL_HOST_USER or None,
+        password=settings.EMAIL_HOST_PASSWORD or None,
+        use_tls=getattr(settings, 'EMAIL_USE_SSL', False),
+        start_tls=settings.EMAIL_USE_TLS,
+        timeout=settings.EMAIL_TIMEOUT,
+    )
+    async with smtp:
+        for message in messages:
+            await smtp.send_message(message.message(), sender=message.from_email, recipients=message.recipients())
+            sent += 1
+    return sent
+
+
+async def asend_mail(subject, message, from_email, recipient_list):
+    """Async ``django.core.mail.send_mail``."""
+    return await asend([EmailMessage(subject, message, from_email, recipient_list)])
@@ -0,0 +1,145 @@
+"""
+Prometheus metrics.
+
+``MetricsMiddleware`` records request counts and latency per URL name, plus
+SQL usage when ``REQUEST_TIMING_ENABLED`` has the queries timed; ``external_call()`` times calls to geocoding and SMTP; ``cache_lookup()``
+counts cache hits and misses; ``raktseva.scheduler`` times its jobs.
+``metrics_view`` serves them at ``/metrics``, and ``run_scheduler`` on
+``SCHEDULER_METRICS_PORT``.
+
+Under uWSGI, ``scripts/run.sh`` points ``PROMETHEUS_MULTIPROC_DIR`` at an empty
+directory so every worker writes its samples to shared mmap files, and the
+view aggregates them with ``MultiProcessCollector``.
+"""
+import os
+import time
+from contextlib import contextmanager, nullcontext
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed, PermissionDenied
+from django.http import HttpResponse
+from django.utils.crypto import constant_time_compare
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Histogram, generate_latest, multiprocess,
+)
+from . import timing
+
+REQUESTS = Counter(
+    'raktseva_http_requests_total', 'HTTP requests by URL name, method and status.',
+    ['view', 'method', 'status'],
+)
+REQUEST_LATENCY = Histogram(
+    'raktseva_http_request_duration_seconds', 'HTTP request latency by URL name.',
+    ['view', 'method'],
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+DB_QUERIES = Counter('raktseva_db_queries_total', 'SQL queries run while serving requests.', ['view'])
+DB_SECONDS = Counter('raktseva_db_query_seconds_total', 'Time spent in SQL while serving requests.', ['view'])
+EXTERNAL_LATENCY = Histogram(
+    'raktseva_external_call_duration_seconds', 'Calls to external services such as geocoding and SMTP.',
+    ['service'],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+EXTERNAL_FAILURES = Counter('raktseva_external_call_failures_total', 'Failed external calls.', ['service'])
+CACHE_LOOKUPS = Counter('raktseva_cache_lookups_total', 'Cache lookups by cache and result.', ['cache', 'result'])
+JOB_DURATION = Histogram(
+    'raktseva_scheduler_job_duration_seconds', 'Scheduled job runs by job name.',
+    ['job'],
+    buckets=(0.1, 0.5, 1, 5, 10, 30, 60, 300, 900),
+)
+JOB_FAILURES = Counter('raktseva_scheduler_job_failures_total', 'Scheduled job runs that raised.', ['job'])
+
+
+def observe_external(service, seconds, failed=False):
+    EXTERNAL_LATENCY.labels(service).observe(seconds)
+    if failed:
+        EXTERNAL_FAILURES.labels(service).inc()
+    timing.record(service, seconds)
+
+
+@contextmanager
+def external_call(service):
+    """Time the block as a call to ``service``; an exception counts as a failure."""
+    started = time.perf_counter()
+    failed = True
+    try:
+        yield
+        failed = False
+    finally:
+        observe_external(service, time.perf_counter() - started, failed)
+
+
+def cache_lookup(cache, value):
+    """Count a lookup in ``cache`` as a hit unless ``value`` is None. Returns ``value``."""
+    CACHE_LOOKUPS.labels(cache, 'miss' if value is None else 'hit').inc()
+    return value
+
+
+class MetricsMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        started = time.perf_counter()
+        with self.collect() as timings:
+            response = self.get_response(request)
+        self.observe(request, response, timings, time.perf_counter() - started)
+        return response
+
+    async def __acall__(self, request):
+        started = time.perf_counter()
+        with self.collect() as timings:
+            response = await self.get_response(request)
+        self.observe(request, response, timings, time.perf_counter() - started)
+        return response
+
+    def collect(self):
+        # The per-query execute_wrapper is only worth its cost when timing is on.
+        return timing.collect() if settings.REQUEST_TIMING_ENABLED else nullcontext()
+
+    def observe(self, request, response, timings, elapsed):
+        match = request.resolver_match
+        view = match.url_name or match.view_name if match else 'unmatched'
+        REQUESTS.labels(view, request.method, str(response.status_code)).inc()
+        REQUEST_LATENCY.labels(view, request.method).observe(elapsed)
+        queries, seconds = timings.spans.get('db', (0, 0.0)) if timings else (0, 0.0)
+        if queries:
+            DB_QUERIES.labels(view).inc(queries)
+            DB_SECONDS.labels(view).inc(seconds)
+
+
+def metrics_view(request):
+    """
+        Prometheus scrape endpoint.
+
+        **GET** `/metrics`
+
+        Headers:
+          - Authorization: Bearer `<METRICS_TOKEN>` (optional only when DEBUG is on and no token is set)
+
+        Responses:
+          - 200 OK: metrics in the Prometheus text format
+          - 403 Forbidden: missing or wrong token, or no METRICS_TOKEN configured outside DEBUG
+    """
+    if settings.METRICS_TOKEN:
+        supplied = request.headers.get('Authorization', '').removeprefix('Bearer ')
+        if not constant_time_compare(supplied, settings.METRICS_TOKEN):
+            raise PermissionDenied
+    elif not settings.DEBUG:
+        raise PermissionDenied("Set METRICS_TOKEN to expose metrics outside DEBUG.")
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return HttpResponse(generate_latest(registry), content_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,234 @@
+"""
+On-demand request profiling for staff.
+
+A request carrying a staff JWT and either the ``X-Profile: 1`` header or the
+``?_profile=1`` query flag runs under ``cProfile`` with its SQL captured. The
+slowest distinct SELECTs are then run through ``EXPLAIN`` (without ANALYZE).
+The result is kept in the default cache in a ring buffer of the last
+``PROFILING_BUFFER_SIZE`` profiles, and its id is returned in the
+``X-Profile-Id`` header. The staff-only views below list, show and download
+stored profiles (the download is a pstats file for snakeviz and friends).
+Query params (emails, phone numbers, OTP lookups) are only used for EXPLAIN
+and are dropped before a profile is stored. Off unless ``PROFILING_ENABLED``.
+"""
+import cProfile
+import io
+import marshal
+import pstats
+import time
+import uuid
+from contextlib import ExitStack
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.http import HttpResponse
+from django.utils import timezone
+from rest_framework import permissions
+from rest_framework.exceptions import NotFound
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, AuthenticationFailed
+
+INDEX_KEY = 'profile:index'
+EXPLAIN_LIMIT = 10
+STATS_LINES = 60
+
+
+def profile_key(profile_id):
+    return f"profile:{profile_id}"
+
+
+def store_profile(profile):
+    """Add ``profile`` to the ring buffer, evicting the oldest beyond PROFILING_BUFFER_SIZE."""
+    ttl = settings.PROFILING_TTL
+    index = [pid for pid in cache.get(INDEX_KEY, []) if pid != profile['id']]
+    index.append(profile['id'])
+    evicted, index = index[:-settings.PROFILING_BUFFER_SIZE], index[-settings.PROFILING_BUFFER_SIZE:]
+    cache.set(profile_key(profile['id']), profile, ttl)
+    cache.set(INDEX_KEY, index, ttl)
+    cache.delete_many([profile_key(pid) for pid in evicted])
+
+
+def list_profiles():
+    profiles = cache.get_many([profile_key(pid) for pid in cache.get(INDEX_KEY, [])])
+    return sorted(profiles.values(), key=lambda p: p['created_at'], reverse=True)
+
+
+def get_profile(profile_id):
+    return cache.get(profile_key(profile_id))
+
+
+class QueryCapture:
+    """``execute_wrapper`` that records each query's SQL, params (for EXPLAIN only) and duration."""
+
+    def __init__(self, alias, queries, limit):
+        self.alias = alias
+        self.queries = queries
+        self.limit = limit
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            if len(self.queries) < self.limit:
+                self.queries.append({
+                    'alias': self.alias,
+                    'sql': sql,
+                    'params': None if many else params,
+                    'ms': round((time.perf_counter() - started) * 1000, 3),
+                })
+
+
+def explain(queries):
+    """Attach EXPLAIN plans to the slowest distinct SELECT statements."""
+    seen = set()
+    for query in sorted(queries, key=lambda q: q['ms'], reverse=True):
+        if len(seen) >= EXPLAIN_LIMIT:
+            break
+        if not query['sql'].lstrip().upper().startswith('SELECT') or query['sql'] in seen:
+            continue
+        seen.add(query['sql'])
+        try:
+            with connections[query['alias']].cursor() as cursor:
+                cursor.execute(f"EXPLAIN {query['sql']}", query['params'])
+                query['explain'] = "\n".join(row[0] for row in cursor.fetchall())
+        except Exception as exc:
+            query['explain'] = f"EXPLAIN failed: {exc!r}"
+
+
+class ProfilingMiddleware:
+    def __init__(self, get_response):
+        if not settings.PROFILING_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not self.requested(request) or not self.is_staff(request):
+            return self.get_response(request)
+
+        queries = []
+        profiler = cProfile.Profile()
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(
+                    QueryCapture(connection.alias, queries, settings.PROFILING_MAX_QUERIES)
+                ))
+            profiler.enable()
+            try:
+                response = self.get_response(request)
+            finally:
+                profiler.disable()
+        total = time.perf_counter() - started
+
+        explain(queries)
+        for query in queries:
+            # Params carry user data; keep them out of the shared cache.
+            del query['params']
+        stats_text = io.StringIO()
+        pstats.Stats(profiler, stream=stats_text).sort_stats('cumulative').print_stats(STATS_LINES)
+        profiler.create_stats()
+        profile = {
+            'id': uuid.uuid4().hex,
+            'created_at': timezone.now().isoformat(),
+            'method': request.method,
+            'path': request.get_full_path(),
+            'status': response.status_code,
+            'user': request.profiling_user.email,
+            'total_ms': round(total * 1000, 2),
+            'sql_count': len(queries),
+            'sql_ms': round(sum(q['ms'] for q in queries), 2),
+            'queries': queries,
+            'stats': stats_text.getvalue(),
+            'pstats': marshal.dumps(profiler.stats),
+        }
+        store_profile(profile)
+        response['X-Profile-Id'] = profile['id']
+        return response
+
+    def requested(self, request):
+        return request.headers.get('X-Profile') == '1' or request.GET.get('_profile') == '1'
+
+    def is_staff(self, request):
+        try:
+            result = JWTAuthentication().authenticate(request)
+        except (InvalidToken, AuthenticationFailed):
+            return False
+        if result is None or not result[0].is_staff:
+            return False
+        request.profiling_user = result[0]
+        return True
+
+
+def summary(profile):
+    return {key: value for key, value in profile.items() if key not in ('queries', 'stats', 'pstats')}
+
+
+class ProfileListView(APIView):
+    """
+        List stored request profiles (staff only), newest first.
+
+        **GET** `/api/profiles/`
+
+        Headers:
+          - Authorization: Bearer `<access_token>`
+
+        Responses:
+          - 200 OK: list of `{ id, created_at, method, path, status, user, total_ms, sql_count, sql_ms }`
+          - 403 Forbidden: not staff
+    """
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        return Response([summary(profile) for profile in list_profiles()])
+
+
+class ProfileDetailView(APIView):
+    """
+        Show one stored profile: cProfile stats and captured SQL with EXPLAIN plans.
+
+        **GET** `/api/profiles/<id>/`
+
+        Headers:
+          - Authorization: Bearer `<access_token>`
+
+        Responses:
+          - 200 OK: the profile summary plus `stats` (text) and `queries`
+          - 403 Forbidden: not staff
+          - 404 Not Found: unknown or evicted profile
+    """
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request, profile_id):
+        profile = get_profile(profile_id)
+        if profile is None:
+            raise NotFound("Profile not found.")
+        return Response({**summary(profile), 'stats': profile['stats'], 'queries': profile['queries']})
+
+
+class ProfileDownloadView(APIView):
+    """
+        Download a stored profile as a pstats file (open with `pstats` or snakeviz).
+
+        **GET** `/api/profiles/<id>/download/`
+
+        Headers:
+          - Authorization: Bearer `<access_token>`
+
+        Responses:
+          - 200 OK: `application/octet-stream` pstats dump
+          - 403 Forbidden: not staff
+          - 404 Not Found: unknown or evicted profile
+    """
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request, profile_id):
+        profile = get_profile(profile_id)
+        if profile is None:
+            raise NotFound("Profile not found.")
+        response = HttpResponse(profile['pstats'], content_type='application/octet-stream')
+        response['Content-Disposition'] = f'attachment; filename="profile-{profile_id}.prof"'
+        return response
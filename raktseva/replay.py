@@ -0,0 +1,207 @@
+"""
+Replays traffic recorded by ``raktseva.capture`` against a running instance
+seeded with ``manage.py seed``.
+
+Captured records carry shapes, not identities, so each one is re-targeted at
+the seeded data: it runs as a random seeded user of the captured role, ``pk``
+kwargs point at one of that hospital's requests (or any open request for a
+donor), ``id`` kwargs at a seeded donor, and ``<field>`` placeholders in the
+body are filled with synthetic values (logins use a seeded account, so they
+pay for the real password check). Records are sent at their captured
+offsets divided by ``speed`` (0 sends them as fast as the workers allow),
+from ``concurrency`` worker threads.
+"""
+import json
+import random
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from itertools import count
+from urllib.parse import urlencode
+import requests
+from django.urls import NoReverseMatch, reverse
+from rest_framework_simplejwt.tokens import RefreshToken
+from blood_request.models import BloodRequest
+from donor.models import Donor
+from users.models import User
+from .seeding import PASSWORD, SEED_EMAIL_DOMAIN
+
+ACTORS_PER_ROLE = 200
+
+
+def load_records(paths, limit=None):
+    """Captured records from NDJSON ``paths``, oldest first."""
+    records = []
+    for path in paths:
+        with open(path, encoding='utf-8') as fh:
+            records.extend(json.loads(line) for line in fh if line.strip())
+    records.sort(key=lambda record: record['ts'])
+    return records[:limit] if limit else records
+
+
+def percentile(samples, pct):
+    return samples[min(len(samples) - 1, int(len(samples) * pct / 100))]
+
+
+class ReplayActors:
+    """Seeded users to act as, and the ids captured kwargs are mapped onto."""
+
+    def __init__(self, seed=42):
+        self.random = random.Random(seed)
+        self.sequence = count()
+        seeded = User.objects.filter(email__endswith=f"@{SEED_EMAIL_DOMAIN}", is_active=True, is_verified=True)
+        self.users = {
+            role: list(seeded.filter(role=role, is_staff=False).order_by('id')[:ACTORS_PER_ROLE])
+            for role in ('donor', 'hospital')
+        }
+        self.users['admin'] = list(User.objects.filter(is_staff=True, is_active=True).order_by('id')[:ACTORS_PER_ROLE])
+        if not self.users['donor'] or not self.users['hospital']:
+            raise ValueError("No seeded donors or hospitals; run manage.py seed first.")
+
+        self.requests_by_user = defaultdict(list)
+        hospital_users = [user.pk for user in self.users['hospital']]
+        for request_id, user_id in (BloodRequest.objects.filter(hospital__user_id__in=hospital_users)
+                                    .values_list('id', 'hospital__user_id')):
+            self.requests_by_user[user_id].append(request_id)
+        self.open_requests = list(
+            BloodRequest.objects.filter(is_fulfilled=False, is_expired=False).values_list('id', flat=True)[:5000]
+        )
+        self.donor_ids = list(
+            Donor.objects.filter(user__email__endswith=f"@{SEED_EMAIL_DOMAIN}").values_list('id', flat=True)[:5000]
+        )
+        self.tokens = {}
+
+    def pick_user(self, role):
+        users = self.users.get(role)
+        return self.random.choice(users) if users else None
+
+    def token(self, user):
+        if user.pk not in self.tokens:
+            self.tokens[user.pk] = str(RefreshToken.for_user(user).access_token)
+        return self.tokens[user.pk]
+
+    def kwarg(self, name, value, user):
+        if name == 'pk':
+            owned = self.requests_by_user.get(user.pk) if user and user.role == 'hospital' else None
+            return self.random.choice(owned or self.open_requests or [value])
+        if name == 'id':
+            return self.random.choice(self.donor_ids or [value])
+        return value
+
+    def fill(self, value, key=None):
+        """Replace the capture placeholders in ``value`` with synthetic data."""
+        if isinstance(value, dict):
+            return {k: self.fill(v, k) for k, v in value.items()}
+        if isinstance(value, list):
+            return [self.fill(item, key) for item in value]
+        if not isinstance(value, str) or not value.startswith('<') or not value.endswith('>'):
+            return value
+        if value.startswith('<ids:'):
+            wanted = int(value[5:-1])
+            return self.random.sample(self.donor_ids, min(wanted, len(self.donor_ids)))
+        number = next(self.sequence)
+        return {
+            '<email>': f"replay{number}@{SEED_EMAIL_DOMAIN}",
+            '<password>': PASSWORD,
+            '<code>': f"{self.random.randint(100000, 999999)}",
+            '<contact_number>': f"+9198{number % 10 ** 8:08d}",
+            '<registration_number>': f"REPLAY-{number:08d}",
+        }.get(value, f"Replay {key or 'value'} {number}")
+
+
+class Replayer:
+    def __init__(self, base_url, actors, speed=1.0, concurrency=8, timeout=30):
+        self.base_url = base_url.rstrip('/')
+        self.actors = actors
+        self.speed = speed
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.results = defaultdict(list)
+        self.max_lag = 0.0
+
+    def prepare(self, record):
+        """Turn a captured record into ``(route, method, url, body, headers)``, or None if it can't be mapped."""
+        user = self.actors.pick_user(record['role']) if record['role'] != 'anonymous' else None
+        if record['role'] != 'anonymous' and user is None:
+            return None
+        kwargs = {name: self.actors.kwarg(name, value, user) for name, value in record['kwargs'].items()}
+        try:
+            url = self.base_url + reverse(record['route'], kwargs=kwargs)
+        except NoReverseMatch:
+            return None
+        headers = {'Authorization': f"Bearer {self.actors.token(user)}"} if user else {}
+        query = {key: value for key, value in self.actors.fill(record['query']).items() if value is not None}
+        if query:
+            url += '?' + urlencode(query)
+        body = self.actors.fill(record['body']) if record['body'] is not None else None
+        if record['route'] == 'token_obtain_pair' and body is not None:
+            login = self.actors.pick_user(self.actors.random.choice(['donor', 'hospital']))
+            body = {'email': login.email, 'password': PASSWORD}
+        if record['route'] == 'token_refresh' and body is not None:
+            login = self.actors.pick_user(self.actors.random.choice(['donor', 'hospital']))
+            body = {'refresh': str(RefreshToken.for_user(login))}
+        return record['route'], record['method'], url, body, headers
+
+    def send(self, due, route, method, url, body, headers):
+        session = getattr(self.local, 'session', None)
+        if session is None:
+            session = self.local.session = requests.Session()
+        started = time.perf_counter()
+        # How far behind the captured schedule this call went out, e.g. with every worker busy.
+        lag = started - due if due is not None else 0.0
+        try:
+            status = session.request(method, url, json=body, headers=headers, timeout=self.timeout).status_code
+        except requests.RequestException:
+            status = None
+        elapsed = time.perf_counter() - started
+        with self.lock:
+            self.results[route].append((elapsed, status))
+            self.max_lag = max(self.max_lag, lag)
+
+    def run(self, records):
+        prepared = [(record['ts'], self.prepare(record)) for record in records]
+        calls = [(ts, call) for ts, call in prepared if call is not None]
+        skipped = len(prepared) - len(calls)
+        if not calls:
+            return self.summary(0.0, skipped)
+
+        first = calls[0][0]
+        started = time.perf_counter()
+        with ThreadPoolExecutor(self.concurrency) as pool:
+            for ts, call in calls:
+                due = None
+                if self.speed:
+                    due = started + (ts - first) / self.speed
+                    delay = due - time.perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
+                pool.submit(self.send, due, *call)
+        return self.summary(time.perf_counter() - started, skipped)
+
+    def summary(self, elapsed, skipped):
+        routes = {}
+        for route, results in sorted(self.results.items()):
+            latencies = sorted(seconds * 1000 for seconds, _ in results)
+            statuses = defaultdict(int)
+            for _, status in results:
+                statuses[str(status)] += 1
+            routes[route] = {
+                'n': len(results),
+                'p50_ms': round(percentile(latencies, 50), 2),
+                'p95_ms': round(percentile(latencies, 95), 2),
+                'p99_ms': round(percentile(latencies, 99), 2),
+                'errors': sum(status is None or status >= 500 for _, status in results),
+                'statuses': dict(statuses),
+            }
+        sent = sum(route['n'] for route in routes.values())
+        return {
+            'sent': sent,
+            'skipped': skipped,
+            'elapsed_s': round(elapsed, 2),
+            'rps': round(sent / elapsed, 1) if elapsed else 0.0,
+            'max_lag_s': round(self.max_lag, 3),
+            'routes': routes,
+        }
@@ -0,0 +1,179 @@
+"""
+Read-replica routing.
+
+Views with ``ReplicaReadMixin`` (the list and search endpoints) run the
+queries of a safe request on the ``replica`` database alias, once the caller
+is authenticated and permitted; every other query, and every write, goes to
+``default``. A request stays on the primary when:
+
+  - ``REPLICA_ENABLED`` is off;
+  - the caller wrote something in the last ``REPLICA_STICKY_SECONDS``, so
+    they always see their own writes. ``ReplicaStickinessMiddleware`` notes
+    each successful unsafe request in the cache;
+  - the replica failed its last health check: it was unreachable or more
+    than ``REPLICA_MAX_LAG_SECONDS`` behind. Each process probes it at most
+    every ``REPLICA_HEALTH_CHECK_SECONDS``.
+
+Without ``DB_REPLICA_HOST`` the alias is a second connection to the primary,
+a stand-in that exercises the routing; in tests it mirrors ``default``.
+"""
+import logging
+import threading
+import time
+from contextvars import ContextVar
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DatabaseError, connections
+from prometheus_client import Gauge
+from rest_framework.permissions import SAFE_METHODS
+
+logger = logging.getLogger(__name__)
+
+REPLICA = 'replica'
+# Models that must always be read from the primary, e.g. the database cache table.
+PRIMARY_ONLY_APPS = {'django_cache'}
+
+REPLICA_HEALTHY = Gauge('raktseva_db_replica_healthy', 'Whether the last replica health check passed.',
+                        multiprocess_mode='liveall')
+
+# Seconds the replica is behind the primary; NULL when it isn't a standby (the stand-in).
+LAG_SQL = """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN NULL
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+    END
+"""
+
+_read_alias = ContextVar('read_alias', default=None)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        alias = _read_alias.get()
+        if alias is None or model._meta.app_label in PRIMARY_ONLY_APPS:
+            return None
+        return alias
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases hold the same data.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return False if db == REPLICA else None
+
+
+class ReplicaHealth:
+    """Cached per-process verdict on whether the replica can serve reads."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.checked_at = None
+        self.healthy = False
+
+    def __call__(self):
+        now = time.monotonic()
+        with self.lock:
+            if self.checked_at is not None and now - self.checked_at < settings.REPLICA_HEALTH_CHECK_SECONDS:
+                return self.healthy
+            # Claim the check so concurrent requests use the previous verdict meanwhile.
+            self.checked_at = now
+
+        try:
+            lag = self.probe()
+            healthy = lag is None or lag <= settings.REPLICA_MAX_LAG_SECONDS
+            if not healthy:
+                logger.warning("Replica is %.1fs behind; reading from the primary.", lag)
+        except DatabaseError:
+            logger.warning("Replica health check failed; reading from the primary.", exc_info=True)
+            connections[REPLICA].close()
+            healthy = False
+        self.healthy = healthy
+        REPLICA_HEALTHY.set(int(healthy))
+        return healthy
+
+    def probe(self):
+        with connections[REPLICA].cursor() as cursor:
+            cursor.execute(LAG_SQL)
+            return cursor.fetchone()[0]
+
+
+replica_health = ReplicaHealth()
+
+
+def sticky_key(user_id):
+    return f"replica-sticky:{user_id}"
+
+
+def read_alias_for(request):
+    """``REPLICA`` if ``request``'s reads may go to the replica, else None."""
+    if not settings.REPLICA_ENABLED or request.method not in SAFE_METHODS:
+        return None
+    if request.user.is_authenticated and cache.get(sticky_key(request.user.pk)):
+        return None
+    return REPLICA if replica_health() else None
+
+
+class ReplicaReadMixin:
+    """Serve the view's safe requests from the replica (see the module docstring)."""
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        alias = read_alias_for(request)
+        if alias is not None:
+            self.replica_token = _read_alias.set(alias)
+
+    def handle_exception(self, exc):
+        # Uncaught exceptions are re-raised before finalize_response runs.
+        self.release_replica()
+        return super().handle_exception(exc)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        self.release_replica()
+        return super().finalize_response(request, response, *args, **kwargs)
+
+    def release_replica(self):
+        token = self.__dict__.pop('replica_token', None)
+        if token is not None:
+            _read_alias.reset(token)
+
+
+class ReplicaStickinessMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.REPLICA_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        response = self.get_response(request)
+        if request.method not in SAFE_METHODS:
+            self.remember(request, response)
+        return response
+
+    async def __acall__(self, request):
+        response = await self.get_response(request)
+        if request.method not in SAFE_METHODS:
+            # request.user may still be Django's lazy session user, which queries the database.
+            await sync_to_async(self.remember)(request, response)
+        return response
+
+    def remember(self, request, response):
+        user = getattr(request, 'user', None)
+        if response.status_code < 400 and user is not None and user.is_authenticated:
+            cache.set(sticky_key(user.pk), True, settings.REPLICA_STICKY_SECONDS)
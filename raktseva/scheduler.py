@@ -0,0 +1,200 @@
+"""
+Lightweight in-process scheduler for periodic maintenance jobs.
+
+Apps declare jobs in a ``jobs.py`` module with the ``@job`` decorator; they are
+picked up by ``autodiscover()`` and run by ``manage.py run_scheduler``. Each
+job has a Postgres advisory lock named after it. The scheduler loop keeps the
+lock once it has it, which makes that process the job's leader: any number of
+scheduler processes can run across nodes and the job still runs once per
+interval, on the leader, while the others skip it until the leader's session
+ends. Intervals are jittered so replicas drift apart instead of contending on
+the same second.
+"""
+import logging
+import random
+import threading
+import time
+import zlib
+from dataclasses import dataclass, field
+from django.conf import settings
+from django.db import DatabaseError, connection
+from django.utils.module_loading import autodiscover_modules
+from .metrics import JOB_DURATION, JOB_FAILURES
+
+logger = logging.getLogger(__name__)
+
+# High 32 bits of every lock key, keeping our locks apart from other advisory lock users.
+LOCK_NAMESPACE = 0x524B5356  # "RKSV"
+
+
+@dataclass
+class JobStats:
+    runs: int = 0
+    failures: int = 0
+    skipped: int = 0
+    total_seconds: float = 0.0
+    max_seconds: float = 0.0
+    last_seconds: float = None
+    last_started_at: float = None
+    last_error: str = None
+
+    def as_dict(self):
+        return {
+            'runs': self.runs,
+            'failures': self.failures,
+            'skipped': self.skipped,
+            'avg_seconds': self.total_seconds / self.runs if self.runs else None,
+            'max_seconds': self.max_seconds,
+            'last_seconds': self.last_seconds,
+            'last_started_at': self.last_started_at,
+            'last_error': self.last_error,
+        }
+
+
+@dataclass
+class Job:
+    name: str
+    func: callable
+    interval: float
+    jitter: float = None
+    stats: JobStats = field(default_factory=JobStats)
+    # The database session holding this job's lock, while this process leads the job.
+    lock_session: object = field(default=None, repr=False)
+
+    @property
+    def lock_key(self):
+        return LOCK_NAMESPACE << 32 | zlib.crc32(self.name.encode())
+
+    def holds_lock(self):
+        # A reconnect starts a new session, and the old one took the lock with it.
+        return self.lock_session is not None and self.lock_session is connection.connection
+
+    def jitter_fraction(self):
+        return settings.SCHEDULER_JITTER if self.jitter is None else self.jitter
+
+    def next_delay(self):
+        jitter = self.jitter_fraction()
+        return self.interval * (1 + random.uniform(-jitter, jitter))
+
+
+registry = {}
+
+
+def job(interval, name=None, jitter=None):
+    """
+    Register the decorated function as a periodic job running every
+    ``interval`` seconds. ``jitter`` is a fraction of the interval and
+    defaults to ``SCHEDULER_JITTER``.
+    """
+    def decorator(func):
+        job_name = name or f"{func.__module__}.{func.__name__}"
+        registry[job_name] = Job(job_name, func, interval, jitter)
+        return func
+    return decorator
+
+
+def autodiscover():
+    autodiscover_modules('jobs')
+    return registry
+
+
+def run_job(job, hold=False):
+    """
+    Run ``job`` once if no other process holds its lock. With ``hold`` the lock
+    is kept after the run, so this process stays the job's leader. Returns True
+    if it ran (successfully or not), False if it was skipped.
+    """
+    acquired = job.holds_lock()
+    if not acquired:
+        job.lock_session = None
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT pg_try_advisory_lock(%s)", [job.lock_key])
+                acquired = cursor.fetchone()[0]
+        except DatabaseError:
+            # The scheduler holds one long-lived connection; drop it so the next run reconnects.
+            logger.exception("scheduler job=%s could not take its lock", job.name)
+            connection.close()
+            acquired = False
+        if acquired and hold:
+            job.lock_session = connection.connection
+            logger.info("scheduler job=%s is led by this process", job.name)
+    if not acquired:
+        job.stats.skipped += 1
+        logger.info("scheduler job=%s skipped", job.name)
+        return False
+
+    stats = job.stats
+    stats.last_started_at = time.time()
+    started = time.perf_counter()
+    try:
+        job.func()
+    except Exception as exc:
+        stats.failures += 1
+        stats.last_error = repr(exc)
+        JOB_FAILURES.labels(job.name).inc()
+        logger.exception("scheduler job=%s failed", job.name)
+    else:
+        stats.last_error = None
+    finally:
+        elapsed = time.perf_counter() - started
+        stats.runs += 1
+        stats.total_seconds += elapsed
+        stats.max_seconds = max(stats.max_seconds, elapsed)
+        stats.last_seconds = elapsed
+        JOB_DURATION.labels(job.name).observe(elapsed)
+        if not hold:
+            release_lock(job)
+        logger.info("scheduler job=%s duration=%.3fs failures=%d", job.name, elapsed, stats.failures)
+    return True
+
+
+def release_lock(job):
+    job.lock_session = None
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_advisory_unlock(%s)", [job.lock_key])
+    except DatabaseError:
+        # A dead session has already released its locks.
+        connection.close()
+
+
+class Scheduler:
+    """Runs ``jobs`` on their intervals until ``stop()`` is called."""
+
+    def __init__(self, jobs):
+        self.jobs = list(jobs)
+        self._stop = threading.Event()
+        # First runs are spread over one jitter window so a restart doesn't fire everything at once.
+        now = time.monotonic()
+        self.next_run = {
+            job.name: now + random.uniform(0, job.interval * job.jitter_fraction())
+            for job in self.jobs
+        }
+
+    def stop(self):
+        self._stop.set()
+
+    def run_pending(self):
+        """Run every job that is due. Returns the seconds until the next one is."""
+        for job in self.jobs:
+            if time.monotonic() >= self.next_run[job.name]:
+                run_job(job, hold=True)
+                self.next_run[job.name] = time.monotonic() + job.next_delay()
+        return max(0.0, min(self.next_run.values()) - time.monotonic())
+
+    def run_forever(self):
+        try:
+            while not self._stop.is_set():
+                self._stop.wait(self.run_pending())
+        finally:
+            self.release_locks()
+
+    def release_locks(self):
+        """Give up leadership of every job, so another process takes them over at once."""
+        for job in self.jobs:
+            if job.holds_lock():
+                release_lock(job)
+
+    def metrics(self):
+        return {job.name: job.stats.as_dict() for job in self.jobs}
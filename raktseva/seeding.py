@@ -0,0 +1,279 @@
+"""
+Deterministic bulk dataset generator behind ``manage.py seed``.
+
+Produces the same users, hospitals, donors, blood requests and donor interests
+as ``raktseva.factories`` (every account's password is ``testpass123``), but
+at volume: rows are streamed into Postgres with ``COPY`` in batches, ids are
+reserved from the sequences up front, and the password is hashed once.
+
+Distributions:
+  - cities: the canonical City rows, weighted by a Zipf curve over their seeded
+    order (largest first), with locations jittered around the city centre;
+  - blood groups: Indian donor population frequencies;
+  - requests: a few per hospital, created over the last three days, some fulfilled;
+  - interests: a geometric number of donors per request from the same city.
+
+``COPY`` bypasses ``save()`` and signals, so everything they would derive
+(canonical city, request cell and location, ``interest_count``) is written
+directly. Request candidates are not built.
+"""
+import csv
+import io
+import math
+import random
+from itertools import accumulate
+from datetime import timedelta
+from django.contrib.auth.hashers import make_password
+from django.db import connection, transaction
+from django.utils import timezone
+from faker import Faker
+from blood_request.models import BloodRequest
+from blood_request.utils import cell_key
+from city.models import City
+from donor.models import Donor, DonorInterest
+from hospital.models import Hospital
+from users.models import User
+
+SEED_EMAIL_DOMAIN = 'seed.raktseva.test'
+PASSWORD = 'testpass123'
+
+BLOOD_GROUP_FREQUENCIES = {
+    'O+': 0.361, 'B+': 0.323, 'A+': 0.221, 'AB+': 0.075,
+    'O-': 0.014, 'B-': 0.012, 'A-': 0.008, 'AB-': 0.006,
+}
+LOCATION_JITTER_DEG = 0.05
+FULFILLED_RATIO = 0.2
+REQUEST_MAX_AGE = timedelta(hours=72)
+
+
+class DatasetGenerator:
+    USER_COLUMNS = ['id', 'password', 'is_superuser', 'email', 'name', 'is_active', 'is_staff', 'is_verified', 'role']
+
+    def __init__(self, seed=42, batch_size=10000, stdout=None):
+        self.random = random.Random(seed)
+        self.faker = Faker('en_IN')
+        self.faker.seed_instance(seed)
+        self.batch_size = batch_size
+        self.stdout = stdout
+        self.now = timezone.now()
+        self.password = make_password(PASSWORD, salt=f"seed{seed}")
+        self.first_names = [self.faker.first_name() for _ in range(500)]
+        self.last_names = [self.faker.last_name() for _ in range(500)]
+        self.streets = [self.faker.street_name() for _ in range(200)]
+
+        self.cities = list(City.objects.filter(latitude__isnull=False).order_by('id'))
+        if not self.cities:
+            raise ValueError("No cities with coordinates; run the city migrations first.")
+        self.city_weights = list(accumulate(1 / rank for rank in range(1, len(self.cities) + 1)))
+        self.blood_groups = list(BLOOD_GROUP_FREQUENCIES)
+        self.blood_group_weights = list(accumulate(BLOOD_GROUP_FREQUENCIES.values()))
+
+    def log(self, message):
+        if self.stdout is not None:
+            self.stdout.write(message)
+
+    def run(self, donors, hospitals, requests_per_hospital, interests_per_request):
+        with transaction.atomic():
+            hospital_rows = self.create_hospitals(hospitals)
+            donors_by_city = self.create_donors(donors)
+            request_count, interest_count = self.create_requests(
+                hospital_rows, donors_by_city, requests_per_hospital, interests_per_request
+            )
+        with connection.cursor() as cursor:
+            for model in (User, Hospital, Donor, BloodRequest, DonorInterest):
+                cursor.execute(f"ANALYZE {model._meta.db_table}")
+        return {'hospitals': hospitals, 'donors': donors, 'requests': request_count, 'interests': interest_count}
+
+    # -- helpers -----------------------------------------------------------
+
+    def reserve_ids(self, model, count):
+        """Claim ``count`` consecutive ids from the model's sequence."""
+        if not count:
+            return range(0)
+        table = model._meta.db_table
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT setval(pg_get_serial_sequence(%s, 'id'), nextval(pg_get_serial_sequence(%s, 'id')) + %s - 1)",
+                [table, table, count],
+            )
+            last = cursor.fetchone()[0]
+        return range(last - count + 1, last + 1)
+
+    def copy(self, model, columns, rows):
+        """Stream ``rows`` into ``model``'s table with COPY, ``batch_size`` rows at a time."""
+        statement = f"COPY {model._meta.db_table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)"
+        total = 0
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        with connection.cursor() as cursor:
+            for row in rows:
+                writer.writerow([self.csv_value(value) for value in row])
+                total += 1
+                if total % self.batch_size == 0:
+                    buffer.seek(0)
+                    cursor.copy_expert(statement, buffer)
+                    buffer.seek(0)
+                    buffer.truncate()
+            if buffer.tell():
+                buffer.seek(0)
+                cursor.copy_expert(statement, buffer)
+        self.log(f"  {model._meta.db_table}: {total} rows")
+        return total
+
+    @staticmethod
+    def csv_value(value):
+        if value is None:
+            return ''
+        if isinstance(value, bool):
+            return 't' if value else 'f'
+        if hasattr(value, 'isoformat'):
+            return value.isoformat()
+        return value
+
+    def blood_group(self):
+        return self.random.choices(self.blood_groups, cum_weights=self.blood_group_weights)[0]
+
+    def pick_city(self):
+        return self.random.choices(self.cities, cum_weights=self.city_weights)[0]
+
+    def jitter(self, city):
+        return (
+            round(city.latitude + self.random.gauss(0, LOCATION_JITTER_DEG), 6),
+            round(city.longitude + self.random.gauss(0, LOCATION_JITTER_DEG), 6),
+        )
+
+    def name(self):
+        return f"{self.random.choice(self.first_names)} {self.random.choice(self.last_names)}"
+
+    def phone(self):
+        return f"+91{self.random.randint(6, 9)}{self.random.randint(0, 999999999):09d}"
+
+    def user_rows(self, ids, role, names):
+        for user_id, name in zip(ids, names):
+            yield (user_id, self.password, False, f"{role}{user_id}@{SEED_EMAIL_DOMAIN}", name,
+                   True, False, True, role)
+
+    # -- entities ----------------------------------------------------------
+
+    def create_hospitals(self, count):
+        user_ids = self.reserve_ids(User, count)
+        hospital_ids = self.reserve_ids(Hospital, count)
+        hospitals = []
+        for hospital_id in hospital_ids:
+            city = self.pick_city()
+            latitude, longitude = self.jitter(city)
+            hospitals.append((hospital_id, city, latitude, longitude))
+
+        names = [f"{city.name} {self.random.choice(['City', 'General', 'Care', 'Life', 'Sunrise'])} Hospital"
+                 for _, city, _, _ in hospitals]
+        self.copy(User, self.USER_COLUMNS, self.user_rows(user_ids, 'hospital', names))
+        self.copy(
+            Hospital,
+            ['id', 'canonical_city_id', 'user_id', 'name', 'city', 'address', 'contact_number',
+             'registration_number', 'created_at', 'latitude', 'longitude'],
+            (
+                (hospital_id, city.pk, user_id, name, city.name,
+                 f"{self.random.randint(1, 400)} {self.random.choice(self.streets)}, {city.name}",
+                 self.phone(), f"SEED-{hospital_id:08d}", self.now, latitude, longitude)
+                for (hospital_id, city, latitude, longitude), user_id, name in zip(hospitals, user_ids, names)
+            ),
+        )
+        return hospitals
+
+    def create_donors(self, count):
+        user_ids = self.reserve_ids(User, count)
+        donor_ids = self.reserve_ids(Donor, count)
+        donors_by_city = {}
+        names = (self.name() for _ in range(count))
+        self.copy(User, self.USER_COLUMNS, self.user_rows(user_ids, 'donor', names))
+
+        def rows():
+            for donor_id, user_id in zip(donor_ids, user_ids):
+                city = self.pick_city()
+                latitude, longitude = self.jitter(city)
+                donors_by_city.setdefault(city.pk, []).append(donor_id)
+                yield (donor_id, city.pk, user_id,
+                       self.blood_group(),
+                       city.name, self.phone(), self.random.random() < 0.9, self.now, latitude, longitude)
+
+        self.copy(
+            Donor,
+            ['id', 'canonical_city_id', 'user_id', 'blood_group', 'city', 'contact_number', 'is_available',
+             'created_at', 'latitude', 'longitude'],
+            rows(),
+        )
+        return donors_by_city
+
+    def create_requests(self, hospitals, donors_by_city, per_hospital, interests_per_request):
+        requests = []
+        for hospital_id, city, latitude, longitude in hospitals:
+            for _ in range(self.poisson(per_hospital)):
+                age = timedelta(seconds=self.random.uniform(0, REQUEST_MAX_AGE.total_seconds()))
+                requests.append((hospital_id, city, latitude, longitude, self.now - age))
+
+        request_ids = self.reserve_ids(BloodRequest, len(requests))
+        interests = []
+        request_rows = []
+        for request_id, (hospital_id, city, latitude, longitude, created_at) in zip(request_ids, requests):
+            candidates = donors_by_city.get(city.pk, [])
+            wanted = min(len(candidates), self.geometric(interests_per_request))
+            donors = self.random.sample(candidates, wanted) if wanted else []
+            interests.extend((donor_id, request_id, created_at) for donor_id in donors)
+            request_rows.append((
+                request_id, city.pk, hospital_id,
+                self.blood_group(),
+                city.name, self.random.randint(1, 5), self.random.random() < FULFILLED_RATIO, False,
+                len(donors), created_at, latitude, longitude, cell_key(latitude, longitude),
+            ))
+
+        self.copy(
+            BloodRequest,
+            ['id', 'canonical_city_id', 'hospital_id', 'blood_group', 'city', 'quantity', 'is_fulfilled',
+             'is_expired', 'interest_count', 'created_at', 'latitude', 'longitude', 'cell'],
+            request_rows,
+        )
+        interest_ids = self.reserve_ids(DonorInterest, len(interests))
+        self.copy(
+            DonorInterest,
+            ['id', 'donor_id', 'blood_request_id', 'timestamp'],
+            ((interest_id, donor_id, request_id,
+              created_at + timedelta(minutes=self.random.randint(1, 600)))
+             for interest_id, (donor_id, request_id, created_at) in zip(interest_ids, interests)),
+        )
+        return len(request_rows), len(interests)
+
+    def poisson(self, mean):
+        # Knuth's method; fine for the small means used here.
+        limit, k, p = math.exp(-mean), 0, 1.0
+        while True:
+            p *= self.random.random()
+            if p <= limit:
+                return k
+            k += 1
+
+    def geometric(self, mean):
+        if mean <= 0:
+            return 0
+        return int(math.log(1 - self.random.random()) / math.log(mean / (mean + 1)))
+
+
+def flush_seeded():
+    """Delete every seeded account and what hangs off it. Returns the number of users removed."""
+    users = f"SELECT id FROM {User._meta.db_table} WHERE email LIKE %s"
+    donors = f"SELECT id FROM {Donor._meta.db_table} WHERE user_id IN ({users})"
+    hospitals = f"SELECT id FROM {Hospital._meta.db_table} WHERE user_id IN ({users})"
+    requests = f"SELECT id FROM {BloodRequest._meta.db_table} WHERE hospital_id IN ({hospitals})"
+    pattern = [f"%@{SEED_EMAIL_DOMAIN}"]
+    from blood_request.models import RequestCandidate
+    from donor.models import DonorNotification
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        for model in (DonorInterest, RequestCandidate):
+            cursor.execute(f"DELETE FROM {model._meta.db_table} WHERE blood_request_id IN ({requests})", pattern)
+            cursor.execute(f"DELETE FROM {model._meta.db_table} WHERE donor_id IN ({donors})", pattern)
+        cursor.execute(f"DELETE FROM {DonorNotification._meta.db_table} WHERE donor_id IN ({donors})", pattern)
+        cursor.execute(f"DELETE FROM {BloodRequest._meta.db_table} WHERE hospital_id IN ({hospitals})", pattern)
+        cursor.execute(f"DELETE FROM {Donor._meta.db_table} WHERE user_id IN ({users})", pattern)
+        cursor.execute(f"DELETE FROM {Hospital._meta.db_table} WHERE user_id IN ({users})", pattern)
+        cursor.execute(f"DELETE FROM {User._meta.db_table} WHERE email LIKE %s", pattern)
+        return cursor.rowcount
@@ -36,12 +36,18 @@ INSTALLED_APPS = [
     "rest_framework",
     "drf_yasg",
     "users",
+    "city",
     "donor",
     "hospital",
     "blood_request",
 ]
 
 MIDDLEWARE = [
+    "raktseva.metrics.MetricsMiddleware",
+    "raktseva.timing.RequestTimingMiddleware",
+    "raktseva.profiling.ProfilingMiddleware",
+    "raktseva.capture.TrafficCaptureMiddleware",
+    "raktseva.replicas.ReplicaStickinessMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -86,6 +92,25 @@ DATABASES = {
     }
 }
 
+# Read replica for the list and search views (raktseva.replicas). Without DB_REPLICA_HOST the alias
+# is a stand-in: a second connection to the primary. Tests treat it as a mirror of default.
+DB_REPLICA_HOST = config('DB_REPLICA_HOST', default='')
+DATABASES['replica'] = {
+    **DATABASES['default'],
+    'HOST': DB_REPLICA_HOST or DATABASES['default']['HOST'],
+    'PORT': config('DB_REPLICA_PORT', default=DATABASES['default']['PORT']),
+    # Fail fast so a dead replica costs a health check, not a hung worker.
+    'OPTIONS': {'connect_timeout': config('DB_REPLICA_CONNECT_TIMEOUT', default=2, cast=int)},
+    'TEST': {'MIRROR': 'default'},
+}
+DATABASE_ROUTERS = ['raktseva.replicas.ReplicaRouter']
+REPLICA_ENABLED = config('REPLICA_ENABLED', default=bool(DB_REPLICA_HOST), cast=bool)
+# After a write, that user's reads stay on the primary this long so they see it.
+REPLICA_STICKY_SECONDS = config('REPLICA_STICKY_SECONDS', default=5, cast=int)
+# How often each process re-checks the replica, and how far behind it may fall before reads move back.
+REPLICA_HEALTH_CHECK_SECONDS = config('REPLICA_HEALTH_CHECK_SECONDS', default=10, cast=float)
+REPLICA_MAX_LAG_SECONDS = config('REPLICA_MAX_LAG_SECONDS', default=5, cast=float)
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -134,13 +159,15 @@ AUTH_USER_MODEL = 'users.User'
 
 EMAIL_BACKEND = config('EMAIL_BACKEND')
 EMAIL_HOST = config('EMAIL_HOST')
-EMAIL_PORT = config('EMAIL_PORT')
-EMAIL_USE_TLS = config('EMAIL_USE_TLS')
+EMAIL_PORT = config('EMAIL_PORT', cast=int)
+EMAIL_USE_TLS = config('EMAIL_USE_TLS', cast=bool)
 EMAIL_HOST_USER = config('EMAIL_HOST_USER')
 EMAIL_HOST_PASSWORD = config('EMAIL_HOST_PASSWORD')
+# Seconds before an SMTP connection attempt or command gives up (sync and async senders).
+EMAIL_TIMEOUT = config('EMAIL_TIMEOUT', default=30, cast=int)
 
 SECRET_KEY = config("SECRET_KEY")
-DEBUG = config("DEBUG", default=False)
+DEBUG = config("DEBUG", default=False, cast=bool)
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
@@ -151,6 +178,24 @@ REST_FRAMEWORK = {
     'PAGE_SIZE': 10,
 }
 
+# Shared across workers; run `manage.py createcachetable` for the database backend.
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.db.DatabaseCache'),
+        'LOCATION': config('CACHE_LOCATION', default='raktseva_cache'),
+    }
+}
+
+# Per-hospital token buckets: scope -> (burst capacity, tokens refilled per minute).
+# Notifying donors costs one token per recipient.
+HOSPITAL_RATE_LIMITS = {
+    'create_request': (config('CREATE_REQUEST_BURST', default=20, cast=int),
+                       config('CREATE_REQUEST_PER_MINUTE', default=5, cast=float)),
+    'notify_donors': (config('NOTIFY_DONORS_BURST', default=200, cast=int),
+                      config('NOTIFY_DONORS_PER_MINUTE', default=60, cast=float)),
+}
+NOTIFY_DONORS_MAX_RECIPIENTS = config('NOTIFY_DONORS_MAX_RECIPIENTS', default=100, cast=int)
+
 SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(minutes=1080),
     "REFRESH_TOKEN_LIFETIME": timedelta(days=7),
@@ -158,4 +203,113 @@ SIMPLE_JWT = {
 
 
 GOOGLE_MAPS_API_KEY = config('GOOGLE_MAPS_API_KEY')
+# Resolve coordinates from the City table and bundled gazetteer only, never the Maps API.
+GEOCODING_OFFLINE = config('GEOCODING_OFFLINE', default=False, cast=bool)
+GEOCODING_ENDPOINT = config('GEOCODING_ENDPOINT', default='https://maps.googleapis.com/maps/api/geocode/json')
+GEOCODING_CONNECT_TIMEOUT = config('GEOCODING_CONNECT_TIMEOUT', default=2.0, cast=float)
+GEOCODING_READ_TIMEOUT = config('GEOCODING_READ_TIMEOUT', default=5.0, cast=float)
+GEOCODING_MAX_RETRIES = config('GEOCODING_MAX_RETRIES', default=2, cast=int)
+# Consecutive failures before geocoding fails fast, and how long it stays open.
+GEOCODING_BREAKER_THRESHOLD = config('GEOCODING_BREAKER_THRESHOLD', default=5, cast=int)
+GEOCODING_BREAKER_RESET_SECONDS = config('GEOCODING_BREAKER_RESET_SECONDS', default=30.0, cast=float)
+# Concurrent Maps API connections per process for the async views (ASGI mode).
+GEOCODING_ASYNC_MAX_CONNECTIONS = config('GEOCODING_ASYNC_MAX_CONNECTIONS', default=100, cast=int)
+
+
+# Requests within this many hours of their 48h expiry count as "expiring soon".
+BLOOD_REQUEST_EXPIRING_SOON_HOURS = config('BLOOD_REQUEST_EXPIRING_SOON_HOURS', default=6, cast=int)
+
+# Donors within this radius of a hospital are pre-matched as request candidates.
+CANDIDATE_RADIUS_KM = config('CANDIDATE_RADIUS_KM', default=50, cast=float)
+# Build candidates on a background thread after commit instead of inline.
+CANDIDATE_MATCHING_ASYNC = config('CANDIDATE_MATCHING_ASYNC', default=True, cast=bool)
+# Threads per process that run those background rebuilds.
+CANDIDATE_MATCHING_WORKERS = config('CANDIDATE_MATCHING_WORKERS', default=2, cast=int)
+
+# Nearby donor search starts at this radius and may widen up to the maximum.
+NEARBY_DONORS_RADIUS_KM = config('NEARBY_DONORS_RADIUS_KM', default=20, cast=float)
+NEARBY_DONORS_MAX_RADIUS_KM = config('NEARBY_DONORS_MAX_RADIUS_KM', default=200, cast=float)
+# Hard ceiling on any radius a client may ask the nearby search for.
+NEARBY_DONORS_RADIUS_LIMIT_KM = config('NEARBY_DONORS_RADIUS_LIMIT_KM', default=500, cast=float)
+
+# Donors see open requests within this radius of their location.
+AVAILABLE_REQUESTS_RADIUS_KM = config('AVAILABLE_REQUESTS_RADIUS_KM', default=25, cast=float)
+AVAILABLE_REQUESTS_MAX_RADIUS_KM = config('AVAILABLE_REQUESTS_MAX_RADIUS_KM', default=100, cast=float)
+
+# Store the request/interest archive tables as monthly Postgres partitions
+# (applied by blood_request migration 0010 or `manage.py partition_archives`).
+BLOOD_REQUEST_ARCHIVE_PARTITIONING = config('BLOOD_REQUEST_ARCHIVE_PARTITIONING', default=False, cast=bool)
+# Sweeper: how often `run_scheduler` flags/archives requests, and the archive age in days.
+BLOOD_REQUEST_SWEEP_INTERVAL = config('BLOOD_REQUEST_SWEEP_INTERVAL', default=300, cast=int)
+BLOOD_REQUEST_ARCHIVE_AFTER_DAYS = config('BLOOD_REQUEST_ARCHIVE_AFTER_DAYS', default=30, cast=int)
+# Hospitals get one digest email for requests expiring within this many hours.
+BLOOD_REQUEST_REMINDER_WINDOW_HOURS = config('BLOOD_REQUEST_REMINDER_WINDOW_HOURS', default=6, cast=int)
+BLOOD_REQUEST_REMINDER_INTERVAL = config('BLOOD_REQUEST_REMINDER_INTERVAL', default=600, cast=int)
+# ?include_archived=true on the request list looks back this many days by default.
+BLOOD_REQUEST_HISTORY_DAYS = config('BLOOD_REQUEST_HISTORY_DAYS', default=365, cast=int)
+
+# Minimum similarity ratio (0-1) for a misspelt city to match a known one.
+CITY_FUZZY_THRESHOLD = config('CITY_FUZZY_THRESHOLD', default=0.85, cast=float)
+CITY_FUZZY_MIN_LENGTH = 4
+# Unknown free-text cities are only added while the table has fewer rows than this
+# (gazetteer places are always accepted).
+CITY_CREATE_LIMIT = config('CITY_CREATE_LIMIT', default=5000, cast=int)
+
+# Periodic jobs (`manage.py run_scheduler`): each interval varies by +/- this fraction.
+SCHEDULER_JITTER = config('SCHEDULER_JITTER', default=0.1, cast=float)
+# Port on which `run_scheduler` serves its job metrics to Prometheus (0 = off). Unauthenticated: keep it internal.
+SCHEDULER_METRICS_PORT = config('SCHEDULER_METRICS_PORT', default=0, cast=int)
+# Donor messages are coalesced into one digest email per donor per window.
+DONOR_DIGEST_WINDOW_MINUTES = config('DONOR_DIGEST_WINDOW_MINUTES', default=30, cast=int)
+DONOR_DIGEST_INTERVAL = config('DONOR_DIGEST_INTERVAL', default=60, cast=int)
+OTP_PURGE_INTERVAL = config('OTP_PURGE_INTERVAL', default=3600, cast=int)
+
+# Live OTPs live in the cache; the OTP table is only an audit log, purged after the retention period.
+OTP_MAX_ATTEMPTS = config('OTP_MAX_ATTEMPTS', default=5, cast=int)
+OTP_AUDIT_LOG = config('OTP_AUDIT_LOG', default=True, cast=bool)
+OTP_AUDIT_RETENTION_DAYS = config('OTP_AUDIT_RETENTION_DAYS', default=30, cast=int)
+
+# Per-request timing (Server-Timing header + JSON log line) for this fraction of requests.
+# Also turns on the per-view SQL counters in /metrics.
+REQUEST_TIMING_ENABLED = config('REQUEST_TIMING_ENABLED', default=False, cast=bool)
+REQUEST_TIMING_SAMPLE_RATE = config('REQUEST_TIMING_SAMPLE_RATE', default=1.0, cast=float)
+
+# Prometheus metrics at /metrics, served only with `Authorization: Bearer <METRICS_TOKEN>`
+# (or to anyone when DEBUG is on and no token is set).
+METRICS_ENABLED = config('METRICS_ENABLED', default=True, cast=bool)
+METRICS_TOKEN = config('METRICS_TOKEN', default='')
+
+# Staff can profile a request with `X-Profile: 1` or `?_profile=1`; the last few profiles are kept in the cache.
+# Off by default; the profiler is synchronous, so it also pushes every ASGI request back onto a thread.
+PROFILING_ENABLED = config('PROFILING_ENABLED', default=False, cast=bool)
+PROFILING_BUFFER_SIZE = config('PROFILING_BUFFER_SIZE', default=20, cast=int)
+PROFILING_TTL = config('PROFILING_TTL', default=24 * 60 * 60, cast=int)
+PROFILING_MAX_QUERIES = config('PROFILING_MAX_QUERIES', default=500, cast=int)
+
+# Record the shape of this fraction of API requests as NDJSON for `manage.py replay`; `{pid}` keeps workers apart.
+CAPTURE_ENABLED = config('CAPTURE_ENABLED', default=False, cast=bool)
+CAPTURE_SAMPLE_RATE = config('CAPTURE_SAMPLE_RATE', default=0.05, cast=float)
+CAPTURE_PATH = config('CAPTURE_PATH', default=str(BASE_DIR / 'captures' / 'traffic-{pid}.ndjson'))
+CAPTURE_QUEUE_SIZE = config('CAPTURE_QUEUE_SIZE', default=10000, cast=int)
+CAPTURE_MAX_BODY_BYTES = config('CAPTURE_MAX_BODY_BYTES', default=64 * 1024, cast=int)
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'raktseva.scheduler': {'handlers': ['console'], 'level': config('SCHEDULER_LOG_LEVEL', default='INFO')},
+        'raktseva.timing': {'handlers': ['console'], 'level': 'INFO'},
+        'raktseva.capture': {'handlers': ['console'], 'level': 'INFO'},
+    },
+}
 
+# Server-sent event streams (ASGI only): keepalive comments, a cap after which clients reconnect
+# and resume via Last-Event-ID, per-stream buffer, and how many missed events are replayed.
+EVENT_STREAM_KEEPALIVE_SECONDS = config('EVENT_STREAM_KEEPALIVE_SECONDS', default=15, cast=float)
+EVENT_STREAM_MAX_SECONDS = config('EVENT_STREAM_MAX_SECONDS', default=300, cast=float)
+EVENT_STREAM_RETRY_MS = config('EVENT_STREAM_RETRY_MS', default=2000, cast=int)
+EVENT_STREAM_QUEUE_SIZE = config('EVENT_STREAM_QUEUE_SIZE', default=100, cast=int)
+EVENT_STREAM_REPLAY_LIMIT = config('EVENT_STREAM_REPLAY_LIMIT', default=100, cast=int)
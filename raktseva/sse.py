@@ -0,0 +1,93 @@
+"""
+Server-sent event streams over ``raktseva.broker``.
+
+``event_stream`` subscribes to a broker once the response starts and turns
+its events into ``text/event-stream`` frames: events missed since the client's ``Last-Event-ID`` first, then live
+events, with a comment line every ``EVENT_STREAM_KEEPALIVE_SECONDS`` so
+proxies keep the connection open. A stream ends after
+``EVENT_STREAM_MAX_SECONDS`` (or when its subscriber falls too far behind);
+``EventSource`` reconnects by itself and resumes from the last id it saw, so
+a stream abandoned by a vanished client is reclaimed within that window.
+"""
+import json
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from rest_framework.renderers import BaseRenderer
+
+
+class EventStreamRenderer(BaseRenderer):
+    """Lets clients send ``Accept: text/event-stream``; errors go out as a single ``error`` event."""
+    media_type = 'text/event-stream'
+    format = 'event-stream'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return format_event('error', data).encode()
+
+
+class StreamsUnavailable(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = "Event streams need the ASGI deployment (APP_SERVER=asgi); poll instead."
+    default_code = 'streams_unavailable'
+
+
+def require_asgi(request):
+    # Under WSGI a stream would hold a whole worker for its lifetime.
+    if 'wsgi.version' in request.META:
+        raise StreamsUnavailable
+
+
+def last_event_id(request):
+    value = request.headers.get('Last-Event-ID') or request.query_params.get('last_event_id')
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def format_event(name, data, event_id=None):
+    lines = [f"id: {event_id}"] if event_id is not None else []
+    lines.append(f"event: {name}")
+    lines.append(f"data: {json.dumps(data, cls=DjangoJSONEncoder)}")
+    return "\n".join(lines) + "\n\n"
+
+
+async def event_stream(broker, name, keys, accept=None, backlog=None):
+    """
+    SSE frames for the events ``broker`` routes to ``keys`` (and ``accept``), which must
+    carry an ``id``. ``backlog``, if given, is a coroutine function returning the events
+    missed before the stream opened; it runs after subscribing, so none fall in between.
+    The subscription only exists while the response is being iterated.
+    """
+    subscription = await broker.subscribe(keys, settings.EVENT_STREAM_QUEUE_SIZE, accept)
+    try:
+        missed = await backlog() if backlog is not None else []
+        yield f"retry: {settings.EVENT_STREAM_RETRY_MS}\n\n"
+        seen = set()
+        for event in missed:
+            seen.add(event['id'])
+            yield format_event(name, event, event['id'])
+
+        remaining = settings.EVENT_STREAM_MAX_SECONDS
+        keepalive = settings.EVENT_STREAM_KEEPALIVE_SECONDS
+        while remaining > 0 and not subscription.overflowed:
+            started = broker.loop.time()
+            event = await subscription.get(min(keepalive, remaining))
+            remaining -= broker.loop.time() - started
+            if event is None:
+                yield ": keepalive\n\n"
+            elif event['id'] not in seen:
+                yield format_event(name, event, event['id'])
+    finally:
+        broker.unsubscribe(subscription)
+
+
+def stream_response(frames):
+    response = StreamingHttpResponse(frames, content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # nginx would otherwise buffer the stream.
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -10,10 +10,25 @@ from rest_framework.test import APIClient
 from django.contrib.auth import get_user_model
 
 from raktseva.factories import UserFactory, DonorFactory, HospitalFactory, BloodRequestFactory
+from city.utils import clear_city_cache
 
 User = get_user_model()
 
 
+@pytest.fixture(autouse=True)
+def reset_city_cache():
+    """The in-memory city alias map must not outlive each test's rolled-back rows."""
+    clear_city_cache()
+    yield
+    clear_city_cache()
+
+
+@pytest.fixture(autouse=True)
+def offline_geocoding(settings):
+    """Geocode from the City table and gazetteer only; tests never hit the network."""
+    settings.GEOCODING_OFFLINE = True
+
+
 @pytest.fixture
 def api_client():
     return APIClient()
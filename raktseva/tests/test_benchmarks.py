@@ -0,0 +1,37 @@
+import copy
+import importlib
+import pytest
+from django.core.management import call_command
+from benchmarks.endpoints import ClientTransport, compare
+from benchmarks.scenarios import SCENARIOS, STREAMING_ROUTES, URL_MODULES, BenchContext, resolve
+
+
+def test_every_endpoint_has_a_scenario():
+    names = {
+        pattern.name
+        for module in URL_MODULES
+        for pattern in importlib.import_module(module).urlpatterns
+    }
+    assert names - STREAMING_ROUTES == {scenario.name for scenario in SCENARIOS}
+
+
+@pytest.mark.django_db
+def test_scenarios_return_their_expected_status():
+    call_command('seed', donors=300, hospitals=5, seed=3)
+    ctx = BenchContext()
+    transport = ClientTransport(ctx)
+    for scenario in SCENARIOS:
+        assert transport.request(scenario, resolve(scenario, ctx)) == scenario.expected_status, scenario.name
+
+
+def test_compare_flags_slowdowns_beyond_the_threshold():
+    stats = {'p50_ms': 10.0, 'p95_ms': 20.0, 'p99_ms': 30.0, 'mean_ms': 12.0, 'rps': 100.0, 'errors': 0, 'n': 100}
+    baseline = {'results': {'1000': {'test': {'donor-list': dict(stats), 'donor-me': dict(stats)}}}}
+    current = copy.deepcopy(baseline)
+    current['results']['1000']['test']['donor-list'].update(p95_ms=23.0, p99_ms=40.0, rps=70.0)
+    current['results']['1000']['test']['new-endpoint'] = stats
+
+    regressions = compare(baseline, current, threshold=0.2)
+
+    assert {(r['endpoint'], r['metric']) for r in regressions} == {('donor-list', 'p99_ms'), ('donor-list', 'rps')}
+    assert compare(baseline, baseline) == []
@@ -1,6 +1,12 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import pytest
+from django.db import connection
 from django.urls import reverse
 from blood_request.models import BloodRequest
+from blood_request.matching import build_request_candidates, refresh_donor_candidates, run_logged
+from blood_request.models import RequestCandidate
+from blood_request.views import NearbyDonorsView
 from donor.models import DonorInterest
 from django.contrib.auth import get_user_model
 
@@ -267,18 +273,17 @@ def test_nearby_donors(api_client, hospital_user, donor_factory):
     assert d2.id not in ids
 
 @pytest.mark.django_db
-def test_notify_donors_endpoint(api_client, hospital_user, donor_factory, monkeypatch):
+def test_notify_donors_endpoint(api_client, hospital_user, donor_factory, mailoutbox):
     """
     POST /api/blood-requests/notify-donors/:
-    - hospital can send a message to a list of donor IDs
+    - hospital messages are queued and coalesced into one digest per donor
     """
+    from donor.models import DonorNotification
+    from donor.notifications import flush_digests
 
     d1 = donor_factory()
     d2 = donor_factory()
 
-    sent = []
-    monkeypatch.setattr('blood_request.views.send_mail', lambda *args, **kwargs: sent.append(args))
-
     # login as hospital
     login = api_client.post(
         reverse('token_obtain_pair'),
@@ -292,9 +297,42 @@ def test_notify_donors_endpoint(api_client, hospital_user, donor_factory, monkey
         "message":   "Urgent: need help!"
     }
     resp = api_client.post('/api/blood-requests/notify-donors/', payload, format='json')
-    print(sent)
     assert resp.status_code == 200
-    assert len(sent) == 2
+    assert resp.data['queued'] == 2
+    resp = api_client.post('/api/blood-requests/notify-donors/',
+                           {"donor_ids": [d1.id], "message": "Still looking."}, format='json')
+    assert resp.data['queued'] == 1
+    assert len(mailoutbox) == 0
+
+    # nothing is due until the window has passed
+    assert flush_digests(window_minutes=30) == (0, 0)
+    assert flush_digests(window_minutes=0) == (2, 3)
+    assert len(mailoutbox) == 2
+    digest = next(m for m in mailoutbox if m.to == [d1.user.email])
+    assert "Urgent: need help!" in digest.body and "Still looking." in digest.body
+    assert not DonorNotification.objects.exists()
+
+@pytest.mark.django_db
+def test_failed_digest_does_not_block_later_donors(donor_factory, mailoutbox, monkeypatch, caplog):
+    """A donor whose digest fails stays queued; donors after them still get theirs."""
+    from django.core.mail import EmailMessage
+    from donor.models import DonorNotification
+    from donor.notifications import enqueue_notifications, flush_digests
+
+    bad, good = donor_factory(), donor_factory()
+    enqueue_notifications([bad.id, good.id], "Urgent: need help!")
+    send = EmailMessage.send
+
+    def flaky_send(message, *args, **kwargs):
+        if message.to == [bad.user.email]:
+            raise OSError("mailbox unavailable")
+        return send(message, *args, **kwargs)
+
+    monkeypatch.setattr(EmailMessage, 'send', flaky_send)
+    assert flush_digests(window_minutes=0) == (1, 1)
+    assert [m.to for m in mailoutbox] == [[good.user.email]]
+    assert list(DonorNotification.objects.values_list('donor_id', flat=True)) == [bad.id]
+    assert f"Digest for donor {bad.id} failed" in caplog.text
 
 @pytest.mark.django_db
 def test_create_blood_request_missing_fields(api_client, hospital_user):
@@ -354,7 +392,7 @@ def test_cancel_request_not_owned(api_client, hospital_user, blood_request_facto
 
 @pytest.mark.django_db
 def test_duplicate_interest_help(api_client, donor_user, blood_request_factory):
-    """Posting /help/ twice returns 400 (duplicate interest)."""
+    """Posting /help/ twice is idempotent: 201 first, then 200 with no new row."""
     br = blood_request_factory()
     login = api_client.post(
         reverse('token_obtain_pair'),
@@ -367,5 +405,374 @@ def test_duplicate_interest_help(api_client, donor_user, blood_request_factory):
     assert first.status_code == 201
 
     second = api_client.post(f'/api/blood-requests/{br.id}/help/', format='json')
-    assert second.status_code == 400
+    assert second.status_code == 200
+    assert DonorInterest.objects.filter(blood_request=br, donor=donor_user.donor).count() == 1
+
+@pytest.mark.django_db
+def test_interest_help_rejects_closed_requests(api_client, donor_user, blood_request_factory):
+    """/help/ returns 404 for fulfilled, expired or missing requests and records nothing."""
+    fulfilled = blood_request_factory(is_fulfilled=True)
+    expired = blood_request_factory()
+    expired.created_at = timezone.now() - timedelta(hours=49)
+    expired.save()
+
+    login = api_client.post(
+        reverse('token_obtain_pair'),
+        {"email": donor_user.email, "password": "testpass123"},
+        format='json'
+    )
+    api_client.credentials(HTTP_AUTHORIZATION=f"Bearer {login.data['access']}")
+
+    for pk in (fulfilled.id, expired.id, expired.id + 1000):
+        resp = api_client.post(f'/api/blood-requests/{pk}/help/', format='json')
+        assert resp.status_code == 404
+
+    assert not DonorInterest.objects.filter(donor=donor_user.donor).exists()
+
+@pytest.mark.django_db
+def test_interest_count_tracks_interests(api_client, donor_user, donor_factory, blood_request_factory):
+    """interest_count follows DonorInterest creation (API and ORM) and deletion."""
+    br = blood_request_factory()
+
+    login = api_client.post(
+        reverse('token_obtain_pair'),
+        {"email": donor_user.email, "password": "testpass123"},
+        format='json'
+    )
+    api_client.credentials(HTTP_AUTHORIZATION=f"Bearer {login.data['access']}")
+
+    api_client.post(f'/api/blood-requests/{br.id}/help/', format='json')
+    api_client.post(f'/api/blood-requests/{br.id}/help/', format='json')
+    other = DonorInterest.objects.create(blood_request=br, donor=donor_factory())
+    br.refresh_from_db()
+    assert br.interest_count == 2
+
+    other.delete()
+    br.refresh_from_db()
+    assert br.interest_count == 1
+
+@pytest.mark.django_db
+def test_request_candidates_built_on_create(api_client, hospital_user, donor_factory, settings,
+                                            django_capture_on_commit_callbacks):
+    """
+    Creating a request pre-matches nearby compatible donors;
+    GET /api/blood-requests/{pk}/candidates/ lists them nearest first.
+    """
+    settings.CANDIDATE_MATCHING_ASYNC = False
+    hospital = hospital_user.hospital
+    hospital.latitude, hospital.longitude = 12.9716, 77.5946
+    hospital.save()
 
+    near = donor_factory(blood_group='O-', latitude=12.98, longitude=77.60)
+    nearest = donor_factory(blood_group='A+', latitude=12.9717, longitude=77.5947)
+    donor_factory(blood_group='B+', latitude=12.9717, longitude=77.5947)  # incompatible
+    donor_factory(blood_group='A+', latitude=19.07, longitude=72.87)      # too far
+
+    login = api_client.post(
+        reverse('token_obtain_pair'),
+        {"email": hospital_user.email, "password": "testpass123"},
+        format='json'
+    )
+    api_client.credentials(HTTP_AUTHORIZATION=f"Bearer {login.data['access']}")
+
+    with django_capture_on_commit_callbacks(execute=True):
+        created = api_client.post('/api/blood-requests/create/',
+                                  {"blood_group": "A+", "city": hospital.city, "quantity": 1}, format='json')
+    assert created.status_code == 201
+
+    resp = api_client.get(f"/api/blood-requests/{created.data['id']}/candidates/", format='json')
+    assert resp.status_code == 200
+    assert [c['donor']['id'] for c in resp.data['results']] == [nearest.id, near.id]
+
+    # a donor going unavailable drops out of the candidate list
+    with django_capture_on_commit_callbacks(execute=True):
+        near.is_available = False
+        near.save()
+    resp = api_client.get(f"/api/blood-requests/{created.data['id']}/candidates/", format='json')
+    assert [c['donor']['id'] for c in resp.data['results']] == [nearest.id]
+
+@pytest.mark.django_db(transaction=True)
+def test_overlapping_candidate_rebuilds_do_not_conflict(hospital_factory, donor_factory, blood_request_factory,
+                                                        settings, caplog):
+    """
+    Concurrent rebuilds touching the same (request, donor) pairs all succeed,
+    and failures on the matching pool are logged rather than lost.
+    """
+    settings.CANDIDATE_MATCHING_ASYNC = False
+    hospital = hospital_factory(latitude=12.9716, longitude=77.5946)
+    donors = [donor_factory(blood_group='O-', latitude=12.98, longitude=77.60) for _ in range(5)]
+    blood_request = blood_request_factory(hospital=hospital, blood_group='A+')
+    barrier = threading.Barrier(6)
+
+    def rebuild(func, pk):
+        try:
+            barrier.wait()
+            func(pk)
+        finally:
+            connection.close()
+
+    jobs = [(build_request_candidates, blood_request.id)] * 3 + [(refresh_donor_candidates, donors[0].id)] * 3
+    with ThreadPoolExecutor(len(jobs)) as pool:
+        for future in [pool.submit(rebuild, func, pk) for func, pk in jobs]:
+            future.result()
+    assert RequestCandidate.objects.filter(blood_request=blood_request).count() == len(donors)
+
+    def broken(pk):
+        raise RuntimeError("boom")
+
+    run_logged(broken, blood_request.id)
+    assert "Candidate matching broken" in caplog.text
+
+@pytest.mark.django_db
+def test_nearby_donors_expands_radius_and_sorts_by_distance(api_client, hospital_user, donor_factory, monkeypatch):
+    """
+    GET /api/blood-requests/nearby-donors/?radius=&min_results=&max_radius=:
+    - widens the search until min_results compatible donors are found
+    - returns donors nearest first with distance_km, paged by cursor
+    """
+    hospital = hospital_user.hospital
+    hospital.latitude, hospital.longitude = 12.9716, 77.5946
+    hospital.save()
+
+    far = donor_factory(blood_group='O-', latitude=13.30, longitude=77.5946)    # ~37 km
+    near = donor_factory(blood_group='A+', latitude=12.9816, longitude=77.5946)  # ~1 km
+    mid = donor_factory(blood_group='A-', latitude=13.10, longitude=77.5946)     # ~14 km
+    donor_factory(blood_group='B+', latitude=12.9717, longitude=77.5947)         # incompatible
+    donor_factory(blood_group='A+', latitude=19.07, longitude=72.87)             # beyond max_radius
+
+    login = api_client.post(
+        reverse('token_obtain_pair'),
+        {"email": hospital_user.email, "password": "testpass123"},
+        format='json'
+    )
+    api_client.credentials(HTTP_AUTHORIZATION=f"Bearer {login.data['access']}")
+
+    params = {'blood_group': 'A+', 'radius': 5, 'min_results': 3, 'max_radius': 100}
+    resp = api_client.get('/api/blood-requests/nearby-donors/', params, format='json')
+    assert resp.status_code == 200
+    assert resp.data['radius_km'] == 40
+    assert [d['id'] for d in resp.data['results']] == [near.id, mid.id, far.id]
+    distances = [d['distance_km'] for d in resp.data['results']]
+    assert distances == sorted(distances)
+    assert 1.0 <= distances[0] <= 1.2
+
+    monkeypatch.setattr('blood_request.pagination.DistanceCursorPagination.page_size', 2)
+    page1 = api_client.get('/api/blood-requests/nearby-donors/', params, format='json')
+    assert [d['id'] for d in page1.data['results']] == [near.id, mid.id]
+    page2 = api_client.get(page1.data['next'], format='json')
+    assert [d['id'] for d in page2.data['results']] == [far.id]
+    assert page2.data['next'] is None
+
+@pytest.mark.django_db
+def test_available_requests_within_radius(api_client, donor_user, hospital_factory, blood_request_factory):
+    """
+    GET /api/blood-requests/available/:
+    - donors with coordinates see nearby requests regardless of the city string
+    - mode=city falls back to exact city matching
+    """
+    donor = donor_user.donor
+    donor.latitude, donor.longitude = 12.9716, 77.5946
+    donor.save()
+
+    nearby_hospital = hospital_factory(latitude=13.00, longitude=77.60)   # ~3 km
+    far_hospital = hospital_factory(latitude=19.07, longitude=72.87)      # Mumbai
+    nearby = blood_request_factory(hospital=nearby_hospital, blood_group=donor.blood_group, city='Bangalore')
+    far = blood_request_factory(hospital=far_hospital, blood_group=donor.blood_group, city=donor.city)
+    assert nearby.cell and nearby.latitude == 13.00
+
+    login = api_client.post(
+        reverse('token_obtain_pair'),
+        {"email": donor_user.email, "password": "testpass123"},
+        format='json'
+    )
+    api_client.credentials(HTTP_AUTHORIZATION=f"Bearer {login.data['access']}")
+
+    resp = api_client.get('/api/blood-requests/available/', format='json')
+    assert resp.status_code == 200
+    assert {r['id'] for r in resp.data['results']} == {nearby.id}
+
+    resp = api_client.get('/api/blood-requests/available/', {'radius': 1}, format='json')
+    assert resp.data['results'] == []
+
+    resp = api_client.get('/api/blood-requests/available/', {'mode': 'city'}, format='json')
+    assert {r['id'] for r in resp.data['results']} == {far.id}
+
+@pytest.mark.django_db
+def test_sweeper_expires_and_archives(api_client, hospital_user, donor_factory, blood_request_factory):
+    """The sweep command flags stale requests and moves old closed ones, with interests, to the archive."""
+    from django.core.management import call_command
+    from blood_request.models import ArchivedBloodRequest, ArchivedDonorInterest
+
+    hospital = hospital_user.hospital
+    live = blood_request_factory(hospital=hospital)
+    stale = blood_request_factory(hospital=hospital)
+    old = blood_request_factory(hospital=hospital, is_fulfilled=True)
+    DonorInterest.objects.create(blood_request=old, donor=donor_factory())
+    BloodRequest.objects.filter(id=stale.id).update(created_at=timezone.now() - timedelta(hours=49))
+    BloodRequest.objects.filter(id=old.id).update(created_at=timezone.now() - timedelta(days=40))
+
+    call_command('sweep_blood_requests', '--archive-after-days', '30')
+
+    stale.refresh_from_db()
+    assert stale.is_expired
+    assert not BloodRequest.objects.get(id=live.id).is_expired
+    assert not BloodRequest.objects.filter(id=old.id).exists()
+    assert ArchivedBloodRequest.objects.get(id=old.id).interest_count == 1
+    assert ArchivedDonorInterest.objects.filter(blood_request_id=old.id).count() == 1
+
+    login = api_client.post(
+        reverse('token_obtain_pair'),
+        {"email": hospital_user.email, "password": "testpass123"},
+        format='json'
+    )
+    api_client.credentials(HTTP_AUTHORIZATION=f"Bearer {login.data['access']}")
+
+    resp = api_client.get('/api/blood-requests/my/', format='json')
+    assert {r['id'] for r in resp.data['results']} == {live.id, stale.id}
+
+    resp = api_client.get('/api/blood-requests/my/?include_archived=true', format='json')
+    assert resp.status_code == 200
+    results = {r['id']: r for r in resp.data['results']}
+    assert set(results) == {live.id, stale.id, old.id}
+    assert results[old.id]['archived'] and not results[live.id]['archived']
+    assert results[stale.id]['expired']
+    assert results[old.id]['hospital']['id'] == hospital.id
+
+@pytest.mark.django_db
+def test_sweeper_archives_after_the_configured_days_by_default(settings, hospital_user, blood_request_factory):
+    from django.core.management import call_command
+    from blood_request.models import ArchivedBloodRequest
+
+    settings.BLOOD_REQUEST_ARCHIVE_AFTER_DAYS = 7
+    old = blood_request_factory(hospital=hospital_user.hospital, is_fulfilled=True)
+    BloodRequest.objects.filter(id=old.id).update(created_at=timezone.now() - timedelta(days=10))
+
+    call_command('sweep_blood_requests')
+    assert ArchivedBloodRequest.objects.filter(id=old.id).exists()
+
+@pytest.mark.django_db
+def test_partitioned_archive_tables(hospital_user, blood_request_factory):
+    """Archive tables convert to monthly partitions, keep receiving rows, and old months detach."""
+    from django.core.management import call_command
+    from blood_request.models import ArchivedBloodRequest
+    from blood_request.partitioning import is_partitioned, list_partitions, partition_name, month_start
+
+    old = blood_request_factory(hospital=hospital_user.hospital, is_fulfilled=True)
+    long_ago = timezone.now() - timedelta(days=400)
+    BloodRequest.objects.filter(id=old.id).update(created_at=long_ago)
+    call_command('sweep_blood_requests', '--archive-after-days', '30')
+
+    call_command('partition_archives', '--convert', '--months-ahead', '2')
+    assert is_partitioned(ArchivedBloodRequest)
+    months = [month for _, month in list_partitions(ArchivedBloodRequest)]
+    assert months[0] == month_start(long_ago.date())
+    assert ArchivedBloodRequest.objects.get(id=old.id).hospital_id == hospital_user.hospital.id
+
+    recent = blood_request_factory(hospital=hospital_user.hospital, is_fulfilled=True)
+    BloodRequest.objects.filter(id=recent.id).update(created_at=timezone.now() - timedelta(days=40))
+    call_command('sweep_blood_requests', '--archive-after-days', '30')
+    assert ArchivedBloodRequest.objects.filter(id=recent.id).exists()
+
+    call_command('partition_archives', '--detach-older-than', '6', '--drop')
+    names = [name for name, _ in list_partitions(ArchivedBloodRequest)]
+    assert partition_name(ArchivedBloodRequest._meta.db_table, months[0]) not in names
+    assert not ArchivedBloodRequest.objects.filter(id=old.id).exists()
+    assert ArchivedBloodRequest.objects.filter(id=recent.id).exists()
+
+@pytest.mark.django_db
+def test_expiry_reminders_sent_once_per_hospital(hospital_user, user_factory, hospital_factory,
+                                                 blood_request_factory, mailoutbox):
+    """One digest per hospital for requests near expiry; a rerun sends nothing."""
+    from blood_request.reminders import send_expiry_reminders
+
+    other = hospital_factory(user=user_factory(role='hospital', is_verified=True))
+    near_expiry = timezone.now() - timedelta(hours=45)
+    due = [blood_request_factory(hospital=hospital_user.hospital) for _ in range(2)]
+    due.append(blood_request_factory(hospital=other))
+    fresh = blood_request_factory(hospital=hospital_user.hospital)
+    BloodRequest.objects.filter(id__in=[br.id for br in due]).update(created_at=near_expiry)
+
+    assert send_expiry_reminders(window_hours=6) == (2, 3)
+    assert sorted(m.to[0] for m in mailoutbox) == sorted([hospital_user.email, other.user.email])
+    digest = next(m for m in mailoutbox if m.to == [hospital_user.email])
+    assert f"#{due[0].id}" in digest.body and f"#{fresh.id}" not in digest.body
+
+    assert send_expiry_reminders(window_hours=6) == (0, 0)
+    assert len(mailoutbox) == 2
+    assert BloodRequest.objects.get(id=fresh.id).reminder_sent_at is None
+
+@pytest.mark.django_db
+def test_failed_expiry_reminder_does_not_block_later_hospitals(hospital_factory, blood_request_factory,
+                                                               mailoutbox, monkeypatch, caplog):
+    """A hospital whose reminder fails is released for the next run; later hospitals are still reminded."""
+    from django.core.mail import EmailMessage
+    from blood_request.reminders import send_expiry_reminders
+
+    bad, good = hospital_factory(), hospital_factory()
+    failed = blood_request_factory(hospital=bad)
+    sent = blood_request_factory(hospital=good)
+    BloodRequest.objects.update(created_at=timezone.now() - timedelta(hours=45))
+    send = EmailMessage.send
+
+    def flaky_send(message, *args, **kwargs):
+        if message.to == [bad.user.email]:
+            raise OSError("mailbox unavailable")
+        return send(message, *args, **kwargs)
+
+    monkeypatch.setattr(EmailMessage, 'send', flaky_send)
+    assert send_expiry_reminders(window_hours=6) == (1, 1)
+    assert [m.to for m in mailoutbox] == [[good.user.email]]
+    assert BloodRequest.objects.get(id=failed.id).reminder_sent_at is None
+    assert BloodRequest.objects.get(id=sent.id).reminder_sent_at is not None
+    assert f"Expiry reminder for hospital {bad.id} failed" in caplog.text
+
+@pytest.mark.django_db
+def test_hospital_rate_limits(api_client, hospital_user, donor_factory, settings):
+    """Per-hospital token buckets: notify costs one token per recipient; limited calls get Retry-After."""
+    settings.HOSPITAL_RATE_LIMITS = {'create_request': (2, 1), 'notify_donors': (3, 6)}
+    donors = [donor_factory().id for _ in range(3)]
+
+    login = api_client.post(
+        reverse('token_obtain_pair'),
+        {"email": hospital_user.email, "password": "testpass123"},
+        format='json'
+    )
+    api_client.credentials(HTTP_AUTHORIZATION=f"Bearer {login.data['access']}")
+
+    payload = {"blood_group": "B+", "city": "Chennai", "quantity": 2}
+    codes = [api_client.post('/api/blood-requests/create/', payload, format='json').status_code for _ in range(3)]
+    assert codes == [201, 201, 429]
+
+    resp = api_client.post('/api/blood-requests/notify-donors/',
+                           {"donor_ids": donors, "message": "Help"}, format='json')
+    assert resp.status_code == 200
+    resp = api_client.post('/api/blood-requests/notify-donors/',
+                           {"donor_ids": donors[:1], "message": "Help"}, format='json')
+    assert resp.status_code == 429
+    assert resp['Retry-After'] == '10'
+
+    from blood_request.serializers import NotifyDonorSerializer
+    too_many = list(range(1, settings.NOTIFY_DONORS_MAX_RECIPIENTS + 2))
+    assert not NotifyDonorSerializer(data={"donor_ids": too_many, "message": "Help"}).is_valid()
+
+@pytest.mark.django_db
+def test_nearby_donors_rejects_degenerate_search_params(api_client, hospital_user):
+    """
+    GET /api/blood-requests/nearby-donors/:
+    - zero, non-finite and oversized params are rejected instead of looping or erroring
+    - radii beyond the ceiling are clamped
+    """
+    hospital = hospital_user.hospital
+    hospital.latitude, hospital.longitude = 12.9716, 77.5946
+    hospital.save()
+    api_client.force_authenticate(hospital_user)
+
+    for params in ({'radius': 0, 'min_results': 1}, {'radius': 'nan', 'min_results': 1},
+                   {'max_radius': 'inf'}, {'min_results': 'inf'}, {'min_results': 'nan'}, {'min_results': 10 ** 6}):
+        resp = api_client.get('/api/blood-requests/nearby-donors/', params, format='json')
+        assert resp.status_code == 400, params
+
+    resp = api_client.get('/api/blood-requests/nearby-donors/',
+                          {'radius': 0.001, 'min_results': 1, 'max_radius': 10 ** 6}, format='json')
+    assert resp.status_code == 200
+    assert resp.data['radius_km'] == 0.001 * 2 ** NearbyDonorsView.max_expansions
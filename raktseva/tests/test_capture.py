@@ -0,0 +1,104 @@
+import json
+import pytest
+from django.core.management import call_command
+from django.urls import reverse
+from rest_framework_simplejwt.tokens import RefreshToken
+from raktseva import capture
+from raktseva.capture import CaptureWriter, anonymize
+from raktseva.replay import Replayer, ReplayActors
+from users.models import User
+
+
+def login(api_client, user, password="testpass123"):
+    resp = api_client.post(
+        reverse('token_obtain_pair'),
+        {"email": user.email, "password": password},
+        format='json'
+    )
+    api_client.credentials(HTTP_AUTHORIZATION=f"Bearer {resp.data['access']}")
+
+
+def test_anonymize_keeps_the_shape_but_not_personal_data():
+    body = {'email': 'a@b.com', 'password': 'secret', 'blood_group': 'O+', 'quantity': 2,
+            'donor_ids': [4, 8, 15], 'message': 'Call me on 98765'}
+    assert anonymize(body) == {'email': '<email>', 'password': '<password>', 'blood_group': 'O+', 'quantity': 2,
+                               'donor_ids': '<ids:3>', 'message': '<message>'}
+    assert anonymize({'latitude': 12.971598, 'longitude': '77.594566', 'note': 'eyJhbGciOi.eyJzdWIi.c2ln'}) == {
+        'latitude': 12.97, 'longitude': 77.59, 'note': '<jwt>'}
+
+
+@pytest.mark.django_db
+def test_sampled_requests_are_written_as_ndjson(api_client, hospital_user, settings, tmp_path, monkeypatch):
+    settings.CAPTURE_ENABLED = True
+    settings.CAPTURE_SAMPLE_RATE = 1.0
+    writer = CaptureWriter(str(tmp_path / 'traffic-{pid}.ndjson'))
+    monkeypatch.setattr(capture, '_writer', writer)
+    login(api_client, hospital_user)
+
+    api_client.post(reverse('blood-request-create'),
+                    {'blood_group': 'A+', 'city': 'Mumbai', 'quantity': 2}, format='json')
+    api_client.get(reverse('nearby-donors') + '?radius=10')
+    writer.flush()
+
+    records = [json.loads(line) for path in tmp_path.iterdir() for line in path.read_text().splitlines()]
+    assert [(r['method'], r['route'], r['role'], r['status']) for r in records] == [
+        ('POST', 'token_obtain_pair', 'anonymous', 200),
+        ('POST', 'blood-request-create', 'hospital', 201),
+        ('GET', 'nearby-donors', 'hospital', 200),
+    ]
+    assert records[0]['body'] == {'email': '<email>', 'password': '<password>'}
+    assert records[1]['body'] == {'blood_group': 'A+', 'city': 'Mumbai', 'quantity': 2}
+    assert records[2]['query'] == {'radius': '10'}
+    writer.close()
+
+
+@pytest.mark.django_db
+def test_captured_token_refresh_does_not_store_the_token(api_client, hospital_user, settings, tmp_path,
+                                                          monkeypatch):
+    settings.CAPTURE_ENABLED = True
+    settings.CAPTURE_SAMPLE_RATE = 1.0
+    writer = CaptureWriter(str(tmp_path / 'traffic-{pid}.ndjson'))
+    monkeypatch.setattr(capture, '_writer', writer)
+
+    refresh = str(RefreshToken.for_user(hospital_user))
+    assert api_client.post(reverse('token_refresh'), {'refresh': refresh}, format='json').status_code == 200
+    writer.flush()
+    writer.close()
+
+    text = ''.join(path.read_text() for path in tmp_path.iterdir())
+    assert refresh not in text and 'eyJ' not in text
+    assert json.loads(text)['body'] == {'refresh': '<refresh>'}
+
+
+@pytest.mark.django_db
+def test_replay_maps_captured_records_onto_seeded_data():
+    call_command('seed', donors=200, hospitals=4, seed=5)
+    actors = ReplayActors()
+    replayer = Replayer('http://replay.test', actors)
+
+    route, method, url, body, headers = replayer.prepare({
+        'ts': 1.0, 'method': 'PATCH', 'route': 'blood-request-fulfill', 'kwargs': {'pk': 999999},
+        'query': {}, 'body': None, 'role': 'hospital',
+    })
+    hospital_requests = {pk for pks in actors.requests_by_user.values() for pk in pks}
+    assert int(url.split('/')[-3]) in hospital_requests
+    assert headers['Authorization'].startswith('Bearer ')
+
+    *_, body, headers = replayer.prepare({
+        'ts': 2.0, 'method': 'POST', 'route': 'register', 'kwargs': {}, 'query': {},
+        'body': {'email': '<email>', 'password': '<password>', 'name': '<name>', 'role': 'donor'}, 'role': 'anonymous',
+    })
+    assert body['email'].endswith('.test') and body['password'] == 'testpass123' and body['role'] == 'donor'
+    assert headers == {}
+
+    *_, body, _ = replayer.prepare({
+        'ts': 3.0, 'method': 'POST', 'route': 'token_obtain_pair', 'kwargs': {}, 'query': {},
+        'body': {'email': '<email>', 'password': '<password>'}, 'role': 'anonymous',
+    })
+    assert User.objects.get(email=body['email']).check_password(body['password'])
+
+    *_, body, _ = replayer.prepare({
+        'ts': 4.0, 'method': 'POST', 'route': 'token_refresh', 'kwargs': {}, 'query': {},
+        'body': {'refresh': '<refresh>'}, 'role': 'anonymous',
+    })
+    assert body['refresh'].startswith('eyJ')
@@ -0,0 +1,102 @@
+import pytest
+from django.urls import reverse
+
+from city.models import City, CityAlias
+from city.utils import resolve_city
+
+
+@pytest.mark.django_db
+def test_resolve_city_aliases_and_spelling():
+    """
+    resolve_city():
+    - maps aliases, case and whitespace variants to one canonical City
+    - fuzzy-matches misspellings and remembers them as aliases
+    - creates unknown cities only when asked to
+    """
+    bengaluru = City.objects.get(name='Bengaluru')
+
+    assert resolve_city('Bangalore') == bengaluru
+    assert resolve_city('  bengaluru ') == bengaluru
+    assert resolve_city('Bangalor') == bengaluru
+    assert CityAlias.objects.filter(name='bangalor', city=bengaluru).exists()
+
+    assert resolve_city('Zyxville', create=False) is None
+    created = resolve_city('Zyxville')
+    assert created.name == 'Zyxville'
+    assert resolve_city('ZYXVILLE') == created
+
+
+@pytest.mark.django_db
+def test_unknown_cities_are_capped(settings, donor_factory):
+    """Past CITY_CREATE_LIMIT free text no longer adds cities; gazetteer places still do."""
+    settings.CITY_CREATE_LIMIT = City.objects.count()
+
+    assert resolve_city('Qwertyton') is None
+    donor = donor_factory(city='Qwertyton')
+    assert donor.city == 'Qwertyton' and donor.canonical_city is None
+    assert not City.objects.filter(name='Qwertyton').exists()
+
+    missing = City.objects.get(name='Pune')
+    missing.delete()
+    assert resolve_city('Pune').name == 'Pune'
+
+
+@pytest.mark.django_db
+def test_city_normalized_on_save(donor_factory, hospital_factory, blood_request_factory):
+    """Donor, Hospital and BloodRequest store the canonical city and its id."""
+    donor = donor_factory(city='bombay ')
+    hospital = hospital_factory(city='Mumbai')
+    blood_request = blood_request_factory(hospital=hospital, city='MUMBAI')
+
+    for obj in (donor, hospital, blood_request):
+        assert obj.city == 'Mumbai'
+        assert obj.canonical_city.name == 'Mumbai'
+
+
+@pytest.mark.django_db
+def test_donor_list_city_filter_uses_canonical_city(api_client, hospital_user, donor_factory):
+    """GET /api/donors/?city= matches any spelling of the same city."""
+    d1 = donor_factory(city='Bengaluru')
+    d2 = donor_factory(city='Bangalore')
+    donor_factory(city='Chennai')
+
+    login = api_client.post(
+        reverse('token_obtain_pair'),
+        {"email": hospital_user.email, "password": "testpass123"},
+        format='json'
+    )
+    api_client.credentials(HTTP_AUTHORIZATION=f"Bearer {login.data['access']}")
+
+    resp = api_client.get('/api/donors/', {'city': 'bangalore'}, format='json')
+    assert resp.status_code == 200
+    assert {d['id'] for d in resp.data['results']} == {d1.id, d2.id}
+
+    resp = api_client.get('/api/donors/', {'city': 'Atlantis'}, format='json')
+    assert resp.data['results'] == []
+
+
+def test_gazetteer_build_and_lookup(tmp_path):
+    """The binary gazetteer resolves any spelling variant of a listed name, offline."""
+    from city.gazetteer import Gazetteer, build
+
+    source = tmp_path / 'places.csv'
+    source.write_text("name,latitude,longitude\nKarnal,29.6857,76.9905\nLeh,34.1526,77.5771\n")
+    output = tmp_path / 'places.bin'
+    assert build(source, output) == 2
+
+    gazetteer = Gazetteer(output)
+    assert gazetteer.lookup(' karnal ') == pytest.approx((29.6857, 76.9905), abs=1e-4)
+    assert gazetteer.lookup('LEH') == pytest.approx((34.1526, 77.5771), abs=1e-4)
+    assert gazetteer.lookup('Atlantis') is None
+
+
+@pytest.mark.django_db
+def test_coordinates_come_from_gazetteer_without_network(monkeypatch):
+    """get_coordinates_from_city() answers from the gazetteer and caches it on the City."""
+    from users import utils
+
+    monkeypatch.setattr(utils, 'geocode_city', lambda name: pytest.fail("network geocoding called"))
+
+    assert utils.get_coordinates_from_city('Karnal') == pytest.approx((29.6857, 76.9905), abs=1e-4)
+    assert City.objects.get(name='Karnal').latitude == pytest.approx(29.6857, abs=1e-4)
+    assert utils.get_coordinates_from_city('Atlantis') == (None, None)
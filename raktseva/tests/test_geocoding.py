@@ -0,0 +1,129 @@
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from city.geocoding import AsyncGeocodingClient, CircuitBreaker, GeocodingClient
+
+
+class StubMapsHandler(BaseHTTPRequestHandler):
+    """Replays the server's scripted responses: (status, delay_seconds[, raw_body]) per call."""
+
+    def do_GET(self):
+        server = self.server
+        server.calls += 1
+        status, delay, *raw = server.script.pop(0) if server.script else (200, 0)
+        time.sleep(delay)
+        body = raw[0] if raw else json.dumps({
+            "results": [{"geometry": {"location": {"lat": 12.97, "lng": 77.59}}}]
+        } if status == 200 else {}).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def maps_stub():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubMapsHandler)
+    server.calls = 0
+    server.script = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    server.url = f"http://127.0.0.1:{server.server_address[1]}/geocode/json"
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def make_client(url, cls=GeocodingClient, **kwargs):
+    options = dict(connect_timeout=0.5, read_timeout=0.3, max_retries=2, backoff=0.01)
+    options.update(kwargs)
+    return cls(url, 'test-key', **options)
+
+
+def test_geocode_success_reuses_pooled_session(maps_stub):
+    client = make_client(maps_stub.url)
+    assert client.geocode('Bengaluru') == (12.97, 77.59)
+    assert client.geocode('Bengaluru') == (12.97, 77.59)
+    metrics = client.metrics()
+    assert metrics['requests'] == 2 and metrics['successes'] == 2
+    assert metrics['circuit_state'] == CircuitBreaker.CLOSED
+
+
+def test_geocode_retries_transient_errors_and_timeouts(maps_stub):
+    maps_stub.script = [(503, 0), (200, 1.0)]  # second attempt exceeds the read timeout
+    client = make_client(maps_stub.url)
+    assert client.geocode('Bengaluru') == (12.97, 77.59)
+    assert maps_stub.calls == 3
+    assert client.metrics()['retries'] == 2
+
+
+def test_circuit_breaker_fails_fast_then_recovers(maps_stub):
+    now = [0.0]
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10, clock=lambda: now[0])
+    client = make_client(maps_stub.url, max_retries=0, breaker=breaker)
+
+    maps_stub.script = [(500, 0), (500, 0)]
+    assert client.geocode('A') == (None, None)
+    assert client.geocode('B') == (None, None)
+    assert breaker.state == CircuitBreaker.OPEN
+
+    assert client.geocode('C') == (None, None)
+    assert maps_stub.calls == 2
+    assert client.metrics()['short_circuited'] == 1
+
+    now[0] = 11
+    assert client.geocode('D') == (12.97, 77.59)
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_unreachable_upstream_returns_no_coordinates():
+    client = make_client('http://127.0.0.1:9/geocode/json', max_retries=1)
+    assert client.geocode('Bengaluru') == (None, None)
+    assert client.metrics()['failures'] == 1
+
+
+def test_async_client_overlaps_slow_calls_and_retries(maps_stub):
+    client = make_client(maps_stub.url, AsyncGeocodingClient, read_timeout=1.0)
+
+    async def geocode_many():
+        return await asyncio.gather(*(client.geocode(f'City {n}') for n in range(5)))
+
+    maps_stub.script = [(200, 0.5)] * 5
+    started = time.monotonic()
+    assert asyncio.run(geocode_many()) == [(12.97, 77.59)] * 5
+    assert time.monotonic() - started < 1.5  # one after another would take 2.5s
+
+    maps_stub.script = [(503, 0)]
+    assert asyncio.run(client.geocode('Bengaluru')) == (12.97, 77.59)
+    assert client.metrics()['retries'] == 1
+
+
+def test_malformed_upstream_body_returns_no_coordinates(maps_stub):
+    maps_stub.script = [(200, 0, b'<html>Bad gateway</html>'), (200, 0, b'{"results": [{}]}')]
+    client = make_client(maps_stub.url)
+    assert client.geocode('Bengaluru') == (None, None)
+    assert client.geocode('Bengaluru') == (None, None)
+    assert client.metrics()['failures'] == 2
+
+
+def test_async_client_closes_its_pool_when_the_loop_shuts_down(maps_stub):
+    client = make_client(maps_stub.url, AsyncGeocodingClient)
+    pools = []
+
+    async def geocode():
+        pools.append(await client.http())
+        return await client.geocode('Bengaluru')
+
+    assert asyncio.run(geocode()) == (12.97, 77.59)
+    assert asyncio.run(geocode()) == (12.97, 77.59)
+    assert pools[0] is not pools[1]
+    assert all(pool.is_closed for pool in pools)
@@ -3,7 +3,10 @@ from django.urls import reverse
 from rest_framework.test import APIClient
 
 from hospital.models import Hospital
+from blood_request.serializers import BloodRequestSummarySerializer
 from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 
 User = get_user_model()
 
@@ -130,3 +133,53 @@ def test_view_update_forbidden_to_donor(api_client, donor_user):
     for method in ('get', 'patch'):
         resp = getattr(api_client, method)('/api/hospitals/me/', format='json')
         assert resp.status_code == 403
+
+
+@pytest.mark.django_db
+def test_hospital_dashboard_counts(api_client, hospital_user, blood_request_factory, donor_factory):
+    """
+    GET /api/hospitals/me/dashboard/:
+    - returns open / expiring-soon / fulfilled counts
+    - lists open requests with their interest counts
+    """
+    from datetime import timedelta
+    from django.utils import timezone
+    from donor.models import DonorInterest
+
+    hospital = hospital_user.hospital
+    fresh = blood_request_factory(hospital=hospital)
+    expiring = blood_request_factory(hospital=hospital)
+    expiring.created_at = timezone.now() - timedelta(hours=46)
+    expiring.save()
+    blood_request_factory(hospital=hospital, is_fulfilled=True)
+    blood_request_factory()  # another hospital's request
+
+    DonorInterest.objects.create(blood_request=fresh, donor=donor_factory())
+    DonorInterest.objects.create(blood_request=fresh, donor=donor_factory())
+
+    login = api_client.post(
+        reverse('token_obtain_pair'),
+        {"email": hospital_user.email, "password": "testpass123"},
+        format='json'
+    )
+    api_client.credentials(HTTP_AUTHORIZATION=f"Bearer {login.data['access']}")
+
+    with CaptureQueriesContext(connection) as queries:
+        resp = api_client.get('/api/hospitals/me/dashboard/', format='json')
+    assert resp.status_code == 200
+    assert len([q for q in queries if 'blood_request_bloodrequest' in q['sql']]) == 2
+    assert resp.data['open'] == 2
+    assert resp.data['expiring_soon'] == 1
+    assert resp.data['fulfilled'] == 1
+
+    counts = {r['id']: r['interest_count'] for r in resp.data['requests']}
+    assert counts == {fresh.id: 2, expiring.id: 0}
+    fresh.refresh_from_db()
+    assert resp.data['requests'][-1] == BloodRequestSummarySerializer(fresh).data
+
+
+@pytest.mark.django_db
+def test_hospital_dashboard_without_requests(api_client, hospital_user):
+    api_client.force_authenticate(hospital_user)
+    resp = api_client.get('/api/hospitals/me/dashboard/', format='json')
+    assert resp.data == {'open': 0, 'expiring_soon': 0, 'fulfilled': 0, 'requests': []}
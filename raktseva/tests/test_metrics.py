@@ -0,0 +1,73 @@
+import pytest
+from django.urls import reverse
+from prometheus_client import REGISTRY
+from raktseva.metrics import external_call
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+@pytest.mark.django_db
+def test_metrics_endpoint_reports_requests_and_queries(api_client, hospital_user, settings):
+    """Requests are counted and timed per URL name, with their SQL queries, and exposed at /metrics."""
+    settings.METRICS_TOKEN = 's3cret'
+    settings.REQUEST_TIMING_ENABLED = True
+    before = sample('raktseva_http_requests_total', view='blood-request-list', method='GET', status='200')
+    queries_before = sample('raktseva_db_queries_total', view='blood-request-list')
+
+    login = api_client.post(
+        reverse('token_obtain_pair'),
+        {"email": hospital_user.email, "password": "testpass123"},
+        format='json'
+    )
+    api_client.credentials(HTTP_AUTHORIZATION=f"Bearer {login.data['access']}")
+    assert api_client.get('/api/blood-requests/my/').status_code == 200
+
+    assert sample('raktseva_http_requests_total', view='blood-request-list', method='GET', status='200') == before + 1
+    assert sample('raktseva_db_queries_total', view='blood-request-list') > queries_before
+
+    api_client.credentials(HTTP_AUTHORIZATION='Bearer s3cret')
+    resp = api_client.get('/metrics')
+    assert resp.status_code == 200
+    body = resp.content.decode()
+    assert 'raktseva_http_request_duration_seconds_bucket{' in body
+    assert 'view="blood-request-list"' in body
+
+
+@pytest.mark.django_db
+def test_metrics_skip_sql_timing_when_request_timing_is_off(api_client, hospital_user, settings):
+    settings.REQUEST_TIMING_ENABLED = False
+    before = sample('raktseva_http_requests_total', view='blood-request-list', method='GET', status='200')
+    queries_before = sample('raktseva_db_queries_total', view='blood-request-list')
+
+    api_client.force_authenticate(hospital_user)
+    assert api_client.get('/api/blood-requests/my/').status_code == 200
+
+    assert sample('raktseva_http_requests_total', view='blood-request-list', method='GET', status='200') == before + 1
+    assert sample('raktseva_db_queries_total', view='blood-request-list') == queries_before
+
+
+@pytest.mark.django_db
+def test_metrics_token_required(api_client, settings):
+    settings.METRICS_TOKEN = 's3cret'
+    assert api_client.get('/metrics').status_code == 403
+    assert api_client.get('/metrics', HTTP_AUTHORIZATION='Bearer s3cret').status_code == 200
+
+    # Without a token the endpoint is closed unless DEBUG is on.
+    settings.METRICS_TOKEN = ''
+    assert api_client.get('/metrics').status_code == 403
+    settings.DEBUG = True
+    assert api_client.get('/metrics').status_code == 200
+
+
+def test_external_call_counts_failures():
+    failures = sample('raktseva_external_call_failures_total', service='smtp')
+    calls = sample('raktseva_external_call_duration_seconds_count', service='smtp')
+    with pytest.raises(ConnectionError):
+        with external_call('smtp'):
+            raise ConnectionError
+    with external_call('smtp'):
+        pass
+    assert sample('raktseva_external_call_failures_total', service='smtp') == failures + 1
+    assert sample('raktseva_external_call_duration_seconds_count', service='smtp') == calls + 2
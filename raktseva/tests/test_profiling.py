@@ -0,0 +1,51 @@
+import marshal
+import pytest
+from django.urls import reverse
+
+
+def login(api_client, user, password="testpass123"):
+    resp = api_client.post(
+        reverse('token_obtain_pair'),
+        {"email": user.email, "password": password},
+        format='json'
+    )
+    api_client.credentials(HTTP_AUTHORIZATION=f"Bearer {resp.data['access']}")
+
+
+@pytest.mark.django_db
+def test_staff_can_profile_a_request(api_client, admin_user, donor_factory, settings):
+    """A staff request with X-Profile is profiled, with SQL and EXPLAIN, and downloadable afterwards."""
+    settings.PROFILING_ENABLED = True
+    settings.PROFILING_BUFFER_SIZE = 2
+    donor_factory()
+    login(api_client, admin_user, password='adminpass123')
+
+    resp = api_client.get('/api/donors/', HTTP_X_PROFILE='1')
+    assert resp.status_code == 200
+    profile_id = resp['X-Profile-Id']
+
+    detail = api_client.get(f'/api/profiles/{profile_id}/')
+    assert detail.status_code == 200
+    assert detail.data['path'] == '/api/donors/'
+    assert 'cumulative' in detail.data['stats']
+    assert any(q.get('explain') for q in detail.data['queries'])
+    assert not any('params' in q for q in detail.data['queries'])
+
+    download = api_client.get(f'/api/profiles/{profile_id}/download/')
+    assert download['Content-Disposition'].endswith('.prof"')
+    assert isinstance(marshal.loads(download.content), dict)
+
+    # the ring buffer keeps only the newest PROFILING_BUFFER_SIZE profiles
+    newer = [api_client.get('/api/donors/?_profile=1')['X-Profile-Id'] for _ in range(2)]
+    listed = [p['id'] for p in api_client.get('/api/profiles/').data]
+    assert listed == newer[::-1]
+    assert api_client.get(f'/api/profiles/{profile_id}/').status_code == 404
+
+
+@pytest.mark.django_db
+def test_profiling_ignored_for_non_staff(api_client, hospital_user):
+    login(api_client, hospital_user)
+    resp = api_client.get('/api/donors/', HTTP_X_PROFILE='1')
+    assert resp.status_code == 200
+    assert 'X-Profile-Id' not in resp
+    assert api_client.get('/api/profiles/').status_code == 403
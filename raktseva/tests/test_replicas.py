@@ -0,0 +1,70 @@
+import pytest
+from django.core.cache import cache
+from django.db import OperationalError, connections
+from django.test.utils import CaptureQueriesContext
+from donor.views import DonorListView
+from raktseva.replicas import ReplicaHealth, _read_alias, replica_health, sticky_key
+
+pytestmark = pytest.mark.django_db(transaction=True, databases=['default', 'replica'])
+
+
+@pytest.fixture
+def replica(settings):
+    settings.REPLICA_ENABLED = True
+    replica_health.reset()
+    yield connections['replica']
+    replica_health.reset()
+
+
+def replica_queries(client, path):
+    with CaptureQueriesContext(connections['replica']) as queries:
+        assert client.get(path).status_code == 200
+    return len(queries)
+
+
+def test_list_views_read_from_the_replica_until_the_user_writes(api_client, hospital_user, replica):
+    hospital = hospital_user.hospital
+    hospital.latitude, hospital.longitude = 19.07, 72.88
+    hospital.save()
+    api_client.force_authenticate(hospital_user)
+    assert replica_queries(api_client, '/api/blood-requests/nearby-donors/?radius=10') > 0
+    # Views without the mixin stay on the primary.
+    assert replica_queries(api_client, '/api/blood-requests/my/') == 0
+
+    created = api_client.post('/api/blood-requests/create/', {'blood_group': 'A+', 'city': 'Mumbai', 'quantity': 1},
+                              format='json')
+    assert created.status_code == 201
+    assert replica_queries(api_client, f"/api/blood-requests/{created.data['id']}/interested-donors/") == 0
+
+    cache.delete(sticky_key(hospital_user.pk))
+    assert replica_queries(api_client, f"/api/blood-requests/{created.data['id']}/interested-donors/") > 0
+
+
+def test_unhealthy_or_lagging_replica_falls_back_to_the_primary(api_client, admin_user, replica, settings,
+                                                                 monkeypatch):
+    api_client.force_authenticate(admin_user)
+
+    def unreachable(self):
+        raise OperationalError("could not connect to server")
+
+    monkeypatch.setattr(ReplicaHealth, 'probe', unreachable)
+    assert replica_queries(api_client, '/api/users/all/') == 0
+
+    replica_health.reset()
+    monkeypatch.setattr(ReplicaHealth, 'probe', lambda self: 30.0)
+    assert replica_queries(api_client, '/api/users/all/') == 0
+
+    settings.REPLICA_MAX_LAG_SECONDS = 60
+    replica_health.reset()
+    assert replica_queries(api_client, '/api/users/all/') > 0
+
+
+def test_replica_is_released_when_a_view_raises(api_client, hospital_user, replica, monkeypatch):
+    def broken(self):
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(DonorListView, 'get_queryset', broken)
+    api_client.force_authenticate(hospital_user)
+    with pytest.raises(RuntimeError):
+        api_client.get('/api/donors/')
+    assert _read_alias.get() is None
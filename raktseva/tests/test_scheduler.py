@@ -0,0 +1,110 @@
+import pytest
+from datetime import timedelta
+from django.core.management import call_command
+from django.db import connections
+from django.utils import timezone
+from prometheus_client import REGISTRY
+from raktseva.scheduler import Job, Scheduler, autodiscover, run_job
+from users.models import OTP
+
+
+@pytest.mark.django_db
+def test_run_job_records_metrics():
+    """Successful and failing runs are both counted and timed."""
+    calls = []
+    ok = Job('test.ok', lambda: calls.append(1), interval=60)
+    broken = Job('test.broken', lambda: 1 / 0, interval=60)
+
+    assert run_job(ok) and run_job(ok)
+    assert run_job(broken)
+
+    assert calls == [1, 1]
+    assert ok.stats.runs == 2 and ok.stats.failures == 0
+    assert ok.stats.last_seconds is not None
+    assert broken.stats.failures == 1 and 'ZeroDivisionError' in broken.stats.last_error
+
+
+@pytest.mark.django_db
+def test_run_job_exports_prometheus_metrics():
+    def sample(name, job):
+        return REGISTRY.get_sample_value(name, {'job': job}) or 0
+
+    runs = sample('raktseva_scheduler_job_duration_seconds_count', 'test.exported')
+    failures = sample('raktseva_scheduler_job_failures_total', 'test.exported')
+    job = Job('test.exported', lambda: 1 / 0, interval=60)
+
+    assert run_job(job)
+    assert sample('raktseva_scheduler_job_duration_seconds_count', 'test.exported') == runs + 1
+    assert sample('raktseva_scheduler_job_failures_total', 'test.exported') == failures + 1
+
+
+@pytest.mark.django_db
+def test_run_job_skips_when_locked_elsewhere():
+    """A job whose advisory lock is held by another session is skipped."""
+    calls = []
+    job = Job('test.locked', lambda: calls.append(1), interval=60)
+    other = connections.create_connection('default')
+    try:
+        with other.cursor() as cursor:
+            cursor.execute("SELECT pg_advisory_lock(%s)", [job.lock_key])
+        assert not run_job(job)
+        assert job.stats.skipped == 1
+
+        with other.cursor() as cursor:
+            cursor.execute("SELECT pg_advisory_unlock(%s)", [job.lock_key])
+        assert run_job(job)
+    finally:
+        other.close()
+    assert calls == [1]
+
+
+@pytest.mark.django_db
+def test_scheduler_runs_due_jobs_and_reschedules():
+    calls = []
+    job = Job('test.due', lambda: calls.append(1), interval=60, jitter=0)
+    scheduler = Scheduler([job])
+
+    wait = scheduler.run_pending()
+    assert calls == [1]
+    assert 59 < wait <= 60
+    scheduler.run_pending()
+    assert calls == [1]
+    scheduler.release_locks()
+
+
+@pytest.mark.django_db
+def test_scheduler_keeps_job_leadership_between_runs():
+    """The loop keeps a job's lock after running it, so other nodes skip it until it is released."""
+    job = Job('test.leader', lambda: None, interval=60, jitter=0)
+    scheduler = Scheduler([job])
+    scheduler.run_pending()
+    assert job.holds_lock()
+
+    other = connections.create_connection('default')
+    try:
+        with other.cursor() as cursor:
+            cursor.execute("SELECT pg_try_advisory_lock(%s)", [job.lock_key])
+            assert not cursor.fetchone()[0]
+        assert run_job(job, hold=True) and job.stats.runs == 2
+
+        scheduler.release_locks()
+        with other.cursor() as cursor:
+            cursor.execute("SELECT pg_try_advisory_lock(%s)", [job.lock_key])
+            assert cursor.fetchone()[0]
+        assert not run_job(job, hold=True)
+    finally:
+        other.close()
+
+
+@pytest.mark.django_db
+def test_run_scheduler_once_purges_otp_audit_log(capsys):
+    """Jobs are discovered from the apps' jobs.py; the OTP purge keeps recent audit rows."""
+    assert 'users.jobs.purge_otps' in autodiscover()
+    fresh = OTP.objects.create(email='a@example.com', code='111111')
+    stale = OTP.objects.create(email='b@example.com', code='222222')
+    OTP.objects.filter(id=stale.id).update(created_at=timezone.now() - timedelta(days=40))
+
+    call_command('run_scheduler', '--once', '--job', 'users.jobs.purge_otps')
+
+    assert list(OTP.objects.values_list('id', flat=True)) == [fresh.id]
+    assert '"runs": 1' in capsys.readouterr().out
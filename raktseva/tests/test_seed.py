@@ -0,0 +1,33 @@
+import pytest
+from django.core.management import call_command
+from django.db.models import Count
+from blood_request.models import BloodRequest
+from donor.models import Donor
+from raktseva.seeding import SEED_EMAIL_DOMAIN
+
+
+def seeded_snapshot():
+    return list(
+        Donor.objects.filter(user__email__endswith=SEED_EMAIL_DOMAIN)
+        .order_by('id').values_list('user__name', 'blood_group', 'city', 'latitude')
+    )
+
+
+@pytest.mark.django_db
+def test_seed_is_consistent_and_deterministic():
+    """Seeded rows carry what save()/signals would derive, and the same seed yields the same data."""
+    call_command('seed', donors=400, hospitals=10, seed=7)
+
+    donors = Donor.objects.filter(user__email__endswith=SEED_EMAIL_DOMAIN)
+    assert donors.count() == 400
+    assert not donors.filter(canonical_city__isnull=True).exists()
+    requests = BloodRequest.objects.filter(hospital__user__email__endswith=SEED_EMAIL_DOMAIN)
+    assert requests.exists()
+    assert not requests.filter(cell='').exists()
+    for request in requests.annotate(n=Count('donorinterest')):
+        assert request.interest_count == request.n
+    assert donors.first().user.check_password('testpass123')
+
+    first = seeded_snapshot()
+    call_command('seed', donors=400, hospitals=10, seed=7, flush=True)
+    assert seeded_snapshot() == first
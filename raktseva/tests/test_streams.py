@@ -0,0 +1,162 @@
+import asyncio
+import json
+from types import SimpleNamespace
+import pytest
+from asgiref.sync import sync_to_async
+from django.db import connections
+from django.test import AsyncClient
+from rest_framework_simplejwt.tokens import RefreshToken
+from blood_request.events import donor_subscription, interest_broker, request_broker, request_keys
+from blood_request.utils import cell_key, record_donor_interest
+from raktseva.broker import Broker, Subscription
+from raktseva.sse import event_stream
+
+
+def parse_frame(frame):
+    fields = dict(line.split(': ', 1) for line in frame.decode().strip().splitlines())
+    return fields['id'], fields['event'], json.loads(fields['data'])
+
+
+async def close(broker):
+    broker.stop()
+    # The async ORM ran on asgiref's executor thread; close its connection.
+    await sync_to_async(connections.close_all)()
+
+
+@pytest.mark.django_db
+def test_streams_refuse_wsgi_workers(api_client, hospital_user):
+    api_client.force_authenticate(hospital_user)
+    resp = api_client.get('/api/blood-requests/interest-stream/')
+    assert resp.status_code == 503
+
+
+@pytest.mark.django_db(transaction=True)
+def test_hospital_stream_pushes_new_interest_and_replays_missed_events(hospital_user, donor_user,
+                                                                       blood_request_factory):
+    blood_request = blood_request_factory(hospital=hospital_user.hospital)
+    headers = {'Authorization': f"Bearer {RefreshToken.for_user(hospital_user).access_token}"}
+
+    async def scenario():
+        try:
+            client = AsyncClient()
+            resp = await client.get('/api/blood-requests/interest-stream/', headers=headers)
+            assert resp.status_code == 200 and resp['Content-Type'] == 'text/event-stream'
+            frames = aiter(resp.streaming_content)
+            assert (await anext(frames)).startswith(b'retry: ')
+
+            await sync_to_async(record_donor_interest)(donor_user.donor, blood_request.id)
+            event_id, name, data = parse_frame(await asyncio.wait_for(anext(frames), 5))
+            assert name == 'donor-interest'
+            assert data['request'] == blood_request.id and data['donor'] == donor_user.donor.id
+            await frames.aclose()
+
+            resp = await client.get('/api/blood-requests/interest-stream/', headers={**headers, 'Last-Event-ID': '0'})
+            frames = aiter(resp.streaming_content)
+            await anext(frames)
+            assert parse_frame(await anext(frames)) == (event_id, name, data)
+            await frames.aclose()
+        finally:
+            await close(interest_broker)
+
+    asyncio.run(scenario())
+
+
+def test_request_fan_out_reaches_only_matching_donors_in_range():
+    broker = Broker('test', route=request_keys)
+    donors = {
+        'near': SimpleNamespace(blood_group='O+', latitude=19.07, longitude=72.88, canonical_city_id=1, city='Mumbai'),
+        'other-group': SimpleNamespace(blood_group='A+', latitude=19.07, longitude=72.88, canonical_city_id=1, city='Mumbai'),
+        'far': SimpleNamespace(blood_group='O+', latitude=28.61, longitude=77.21, canonical_city_id=2, city='Delhi'),
+        'city-mode': SimpleNamespace(blood_group='O+', latitude=None, longitude=None, canonical_city_id=1, city='Mumbai'),
+    }
+    subscriptions = {}
+    for name, donor in donors.items():
+        keys, accept = donor_subscription(donor, radius=25)
+        subscriptions[name] = broker.add(Subscription(keys, 10, accept))
+
+    event = {'id': 1, 'blood_group': 'O+', 'latitude': 19.2, 'longitude': 72.95, 'cell': cell_key(19.2, 72.95),
+             'canonical_city': 1, 'city': 'Mumbai'}
+    assert broker.publish(event) == 2
+    assert {name for name, sub in subscriptions.items() if not sub.queue.empty()} == {'near', 'city-mode'}
+
+    for subscription in subscriptions.values():
+        broker.unsubscribe(subscription)
+    assert not broker.index
+
+
+def test_city_mode_donors_without_a_canonical_city_match_by_name():
+    broker = Broker('test', route=request_keys)
+    donors = {
+        'canonical': SimpleNamespace(blood_group='O+', latitude=None, longitude=None, canonical_city_id=1,
+                                     city='Bombay'),
+        'by-name': SimpleNamespace(blood_group='O+', latitude=None, longitude=None, canonical_city_id=None,
+                                   city='Mumbai'),
+        'other-name': SimpleNamespace(blood_group='O+', latitude=None, longitude=None, canonical_city_id=None,
+                                      city='Pune'),
+    }
+    subscriptions = {}
+    for name, donor in donors.items():
+        keys, accept = donor_subscription(donor, radius=25)
+        subscriptions[name] = broker.add(Subscription(keys, 10, accept))
+
+    event = {'id': 1, 'blood_group': 'O+', 'latitude': None, 'longitude': None, 'cell': None,
+             'canonical_city': 1, 'city': 'Mumbai'}
+    assert broker.publish(event) == 2
+    assert {name for name, sub in subscriptions.items() if not sub.queue.empty()} == {'canonical', 'by-name'}
+
+    for subscription in subscriptions.values():
+        broker.unsubscribe(subscription)
+    assert not broker.index
+
+
+def test_streams_only_hold_a_subscription_while_iterated(monkeypatch):
+    """No subscription is left behind by an unstarted response or a failing backlog query."""
+    broker = Broker('test', route=lambda event: [event['key']])
+
+    async def started():
+        pass
+
+    async def broken_backlog():
+        raise RuntimeError("backlog query failed")
+
+    monkeypatch.setattr(broker, 'start', started)
+    event_stream(broker, 'test', [1])
+    assert not broker.index
+
+    async def scenario():
+        frames = event_stream(broker, 'test', [1], backlog=broken_backlog)
+        with pytest.raises(RuntimeError):
+            await anext(frames)
+
+    asyncio.run(scenario())
+    assert not broker.index
+
+
+@pytest.mark.django_db(transaction=True)
+def test_donor_stream_pushes_matching_new_requests(donor_factory, hospital_factory):
+    hospital = hospital_factory(latitude=19.07, longitude=72.88)
+    donor = donor_factory(blood_group='O+', latitude=19.1, longitude=72.9)
+    donor_headers = {'Authorization': f"Bearer {RefreshToken.for_user(donor.user).access_token}"}
+    hospital_headers = {'Authorization': f"Bearer {RefreshToken.for_user(hospital.user).access_token}"}
+
+    async def scenario():
+        try:
+            client = AsyncClient()
+            resp = await client.get('/api/blood-requests/available/stream/?radius=25', headers=donor_headers)
+            assert resp.status_code == 200
+            frames = aiter(resp.streaming_content)
+            await anext(frames)
+
+            for group in ('A+', 'O+'):
+                created = await client.post('/api/blood-requests/create/',
+                                            {'blood_group': group, 'city': 'Mumbai', 'quantity': 2},
+                                            content_type='application/json', headers=hospital_headers)
+                assert created.status_code == 201
+            event_id, name, data = parse_frame(await asyncio.wait_for(anext(frames), 5))
+            assert name == 'blood-request' and data['blood_group'] == 'O+' and int(event_id) == created.json()['id']
+            assert data['hospital']['id'] == hospital.id
+            await frames.aclose()
+        finally:
+            await close(request_broker)
+
+    asyncio.run(scenario())
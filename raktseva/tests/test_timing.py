@@ -0,0 +1,82 @@
+import asyncio
+import json
+import logging
+import pytest
+from asgiref.sync import sync_to_async
+from django.db import connections
+from django.test import AsyncClient
+from django.urls import reverse
+from raktseva import timing
+
+
+@pytest.mark.django_db
+def test_server_timing_header_and_log(api_client, hospital_user, blood_request_factory, settings, caplog):
+    """Sampled requests report total, SQL and serializer time in Server-Timing and one JSON log line."""
+    settings.REQUEST_TIMING_ENABLED = True
+    settings.REQUEST_TIMING_SAMPLE_RATE = 1.0
+    blood_request_factory(hospital=hospital_user.hospital)
+
+    login = api_client.post(
+        reverse('token_obtain_pair'),
+        {"email": hospital_user.email, "password": "testpass123"},
+        format='json'
+    )
+    api_client.credentials(HTTP_AUTHORIZATION=f"Bearer {login.data['access']}")
+
+    with caplog.at_level(logging.INFO, logger='raktseva.timing'):
+        resp = api_client.get('/api/blood-requests/my/')
+
+    header = resp['Server-Timing']
+    assert header.startswith('total;dur=')
+    assert 'db;dur=' in header and 'serialize;dur=' in header
+    line = json.loads(caplog.records[-1].getMessage())
+    assert line['view'] == 'blood-request-list'
+    assert line['status'] == 200
+    assert line['spans']['db']['count'] >= 1
+
+
+@pytest.mark.django_db
+def test_timing_disabled_or_unsampled(api_client, settings):
+    settings.REQUEST_TIMING_ENABLED = True
+    settings.REQUEST_TIMING_SAMPLE_RATE = 0.0
+    assert 'Server-Timing' not in api_client.get('/api/users/me/')
+
+    with timing.span('db'):
+        timing.record('geocode', 1.0)
+    assert timing.current() is None
+
+
+def test_nested_spans_count_once():
+    timings = timing.RequestTimings()
+    token = timing._current.set(timings)
+    try:
+        with timing.span('serialize'):
+            with timing.span('serialize'):
+                pass
+        timing.record('geocode', 0.5)
+    finally:
+        timing._current.reset(token)
+    assert timings.spans['serialize'][0] == 1
+    assert timings.spans['geocode'] == (1, 0.5)
+
+
+@pytest.mark.django_db(transaction=True)
+def test_async_views_under_asgi_count_their_queries(settings, mailoutbox):
+    """Under ASGI the middleware runs async and still sees SQL from sync_to_async threads."""
+    settings.REQUEST_TIMING_ENABLED = True
+    settings.REQUEST_TIMING_SAMPLE_RATE = 1.0
+    settings.PROFILING_ENABLED = False
+    payload = {"email": "asgi@example.com", "name": "Asgi User", "password": "testpass123", "role": "donor"}
+
+    async def register():
+        try:
+            return await AsyncClient().post('/api/users/register/', payload, content_type='application/json')
+        finally:
+            # The async ORM ran on asgiref's executor thread; close its connection.
+            await sync_to_async(connections.close_all)()
+
+    resp = asyncio.run(register())
+
+    assert resp.status_code == 201
+    assert 'db;dur=' in resp['Server-Timing'] and 'smtp;dur=' in resp['Server-Timing']
+    assert mailoutbox[0].to == [payload['email']]
@@ -1,11 +1,12 @@
 import pytest
 from users.models import OTP
-from users.utils  import generate_otp
+from django.core.cache import cache
+from users.utils  import generate_otp, otp_attempts_key
 from rest_framework.test import APIClient
 
 @pytest.mark.django_db
-def test_user_registration(api_client):
-    """POST /api/users/register/ returns email and id."""
+def test_user_registration(api_client, mailoutbox):
+    """POST /api/users/register/ returns email and id, and mails the OTP."""
     payload = {
         "email":    "new@example.com",
         "name":     "New User",
@@ -16,11 +17,12 @@ def test_user_registration(api_client):
     assert resp.status_code == 201
     assert resp.data['email'] == payload['email']
     assert 'id' in resp.data
+    assert [mail.to for mail in mailoutbox] == [[payload['email']]]
 
 @pytest.mark.django_db
 def test_generate_and_verify_otp(monkeypatch, api_client, unverified_user):
     """OTP generation writes to DB and verify endpoint succeeds."""
-    monkeypatch.setattr('users.utils.random.randint', lambda a, b: 424242)
+    monkeypatch.setattr('users.utils.secrets.randbelow', lambda n: 424242)
     monkeypatch.setattr('users.utils.send_mail', lambda *args, **kw: 1)
 
     generate_otp(unverified_user.email)
@@ -53,14 +55,15 @@ def test_login_and_refresh_token(api_client, verified_user):
     assert 'access' in refresh.data
 
 @pytest.mark.django_db
-def test_resend_otp(monkeypatch, api_client, unverified_user):
+def test_resend_otp(api_client, unverified_user, mailoutbox):
     """POST /api/users/resend-otp/ triggers OTP resend."""
-    monkeypatch.setattr('users.utils.generate_otp', lambda email: None)
     resp = api_client.post('/api/users/resend-otp/', {
         "email": unverified_user.email
     }, format='json')
     assert resp.status_code == 200
     assert 'otp' in resp.data['message'].lower()
+    assert mailoutbox[0].to == [unverified_user.email]
+    assert OTP.objects.filter(email=unverified_user.email).exists()
 
 @pytest.mark.django_db
 def test_current_logged_in_user(api_client, verified_user):
@@ -95,3 +98,47 @@ def test_list_all_users_admin_only(api_client, admin_user, donor_user):
     api_client.force_authenticate(donor_user)
     resp = api_client.get('/api/users/all/')
     assert resp.status_code == 403
+
+@pytest.mark.django_db
+def test_verify_otp_limits_attempts(monkeypatch, api_client, unverified_user, settings):
+    """Wrong codes count against OTP_MAX_ATTEMPTS; after that the code is burnt, even if correct."""
+    settings.OTP_MAX_ATTEMPTS = 2
+    settings.OTP_AUDIT_LOG = False
+    monkeypatch.setattr('users.utils.secrets.randbelow', lambda n: 424242)
+    monkeypatch.setattr('users.utils.send_mail', lambda *args, **kw: 1)
+
+    generate_otp(unverified_user.email)
+    assert not OTP.objects.exists()
+
+    def verify(code):
+        return api_client.post('/api/users/verify/', {"email": unverified_user.email, "code": code}, format='json')
+
+    assert verify("000000").status_code == 400
+    assert verify("111111").status_code == 400
+    assert verify("424242").status_code == 429
+    resp = verify("424242")
+    assert resp.status_code == 400 and 'expired' in resp.data['message'].lower()
+
+    # a fresh code does not reset the counter until the attempt window runs out
+    generate_otp(unverified_user.email)
+    assert verify("424242").status_code == 429
+    cache.delete(otp_attempts_key(unverified_user.email))
+    generate_otp(unverified_user.email)
+    assert verify("424242").status_code == 200
+
+
+@pytest.mark.django_db
+def test_resending_otp_keeps_the_attempt_count(monkeypatch, api_client, unverified_user, settings):
+    """Guess, resend, guess: the resend does not hand out a fresh set of attempts."""
+    settings.OTP_MAX_ATTEMPTS = 2
+    monkeypatch.setattr('users.utils.secrets.randbelow', lambda n: 424242)
+    monkeypatch.setattr('users.utils.send_mail', lambda *args, **kw: 1)
+
+    def verify(code):
+        return api_client.post('/api/users/verify/', {"email": unverified_user.email, "code": code}, format='json')
+
+    generate_otp(unverified_user.email)
+    assert verify("000000").status_code == 400
+    assert api_client.post('/api/users/resend-otp/', {"email": unverified_user.email}, format='json').status_code == 200
+    assert verify("111111").status_code == 400
+    assert verify("424242").status_code == 429
@@ -0,0 +1,186 @@
+"""
+Per-request timing breakdown.
+
+``RequestTimingMiddleware`` times each sampled request and collects spans
+recorded while it runs: SQL queries (through ``connection.execute_wrapper``),
+serializer ``to_representation`` and explicit ``span()``/``record()`` calls
+around external services such as geocoding and SMTP. The result goes out as a
+``Server-Timing`` header and one JSON log line on the ``raktseva.timing``
+logger.
+
+Every connection routes its queries through ``sql_wrapper`` from the moment it
+opens, and the collection lives in a context variable, so SQL issued by async
+views through ``sync_to_async`` (on another thread's connection) is counted
+against the request that awaited it.
+
+Outside a sampled request ``span()`` and ``record()`` are no-ops, and with
+``REQUEST_TIMING_ENABLED`` off the middleware removes itself.
+"""
+import functools
+import json
+import logging
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+logger = logging.getLogger(__name__)
+
+_current = ContextVar('request_timings', default=None)
+
+
+class RequestTimings:
+    """Count and total seconds per span name, for one request."""
+
+    def __init__(self):
+        self.spans = {}
+        self.active = set()
+
+    def add(self, name, seconds):
+        count, total = self.spans.get(name, (0, 0.0))
+        self.spans[name] = (count + 1, total + seconds)
+
+
+def current():
+    return _current.get()
+
+
+def record(name, seconds):
+    timings = _current.get()
+    if timings is not None:
+        timings.add(name, seconds)
+
+
+@contextmanager
+def span(name):
+    """Time the block as ``name``. Nested spans of the same name count once."""
+    timings = _current.get()
+    if timings is None or name in timings.active:
+        yield
+        return
+    timings.active.add(name)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.active.discard(name)
+        timings.add(name, time.perf_counter() - started)
+
+
+def timed(name):
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+        wrapper.timed_span = name
+        return wrapper
+    return decorator
+
+
+def sql_wrapper(execute, sql, params, many, context):
+    if _current.get() is None:
+        return execute(sql, params, many, context)
+    with span('db'):
+        return execute(sql, params, many, context)
+
+
+def instrument(connection, **kwargs):
+    """Route ``connection``'s queries through ``sql_wrapper``. Safe to call more than once."""
+    if sql_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(sql_wrapper)
+
+
+connection_created.connect(instrument, dispatch_uid='raktseva.timing.instrument')
+
+
+@contextmanager
+def collect():
+    """
+    Collect spans, including SQL on every connection, for the enclosed block.
+    Nested calls share the outer collection.
+    """
+    timings = _current.get()
+    if timings is not None:
+        yield timings
+        return
+    # Connections opened before this module was imported missed connection_created.
+    for connection in connections.all():
+        instrument(connection)
+    timings = RequestTimings()
+    token = _current.set(timings)
+    try:
+        yield timings
+    finally:
+        _current.reset(token)
+
+
+def instrument_serializers():
+    """Time DRF serializer output as the ``serialize`` span. Safe to call more than once."""
+    from rest_framework import serializers
+
+    for cls in (serializers.Serializer, serializers.ListSerializer):
+        if not hasattr(cls.to_representation, 'timed_span'):
+            cls.to_representation = timed('serialize')(cls.to_representation)
+
+
+def server_timing(timings, total):
+    parts = [f"total;dur={total * 1000:.1f}"]
+    for name, (count, seconds) in sorted(timings.spans.items()):
+        parts.append(f'{name};dur={seconds * 1000:.1f};desc="{count}"')
+    return ", ".join(parts)
+
+
+class RequestTimingMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.REQUEST_TIMING_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+        instrument_serializers()
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        if random.random() >= settings.REQUEST_TIMING_SAMPLE_RATE:
+            return self.get_response(request)
+
+        started = time.perf_counter()
+        with collect() as timings:
+            response = self.get_response(request)
+        return self.report(request, response, timings, time.perf_counter() - started)
+
+    async def __acall__(self, request):
+        if random.random() >= settings.REQUEST_TIMING_SAMPLE_RATE:
+            return await self.get_response(request)
+
+        started = time.perf_counter()
+        with collect() as timings:
+            response = await self.get_response(request)
+        return self.report(request, response, timings, time.perf_counter() - started)
+
+    def report(self, request, response, timings, total):
+        response['Server-Timing'] = server_timing(timings, total)
+        match = request.resolver_match
+        logger.info(json.dumps({
+            'method': request.method,
+            'path': request.path,
+            'view': match.view_name if match else None,
+            'status': response.status_code,
+            'total_ms': round(total * 1000, 2),
+            'spans': {
+                name: {'count': count, 'ms': round(seconds * 1000, 2)}
+                for name, (count, seconds) in timings.spans.items()
+            },
+        }))
+        return response
@@ -24,6 +24,8 @@ from users.custom_token import CustomTokenObtainPairView, CustomTokenRefreshView
 from rest_framework import permissions
 from drf_yasg.views import get_schema_view
 from drf_yasg import openapi
+from raktseva.metrics import metrics_view
+from raktseva.profiling import ProfileListView, ProfileDetailView, ProfileDownloadView
 
 schema_view = get_schema_view(
    openapi.Info(
@@ -47,6 +49,14 @@ urlpatterns = [
     path('api/token/', CustomTokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('api/token/refresh/', CustomTokenRefreshView.as_view(), name='token_refresh'),
 
+    # Staff request profiles
+    path('api/profiles/', ProfileListView.as_view(), name='profile-list'),
+    path('api/profiles/<str:profile_id>/', ProfileDetailView.as_view(), name='profile-detail'),
+    path('api/profiles/<str:profile_id>/download/', ProfileDownloadView.as_view(), name='profile-download'),
+
+    # Prometheus scrape endpoint
+    path('metrics', metrics_view, name='metrics'),
+
     #swagger-docs
     path('swagger/', schema_view.with_ui('swagger', cache_timeout=0), name='schema-swagger-ui'),
 ]
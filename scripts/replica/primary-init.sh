@@ -0,0 +1,9 @@
+#!/bin/sh
+# Runs once when the primary's data volume is initialised: lets the replica stream WAL.
+set -e
+
+psql -v ON_ERROR_STOP=1 --username "$POSTGRES_USER" --dbname "$POSTGRES_DB" <<-EOSQL
+	CREATE ROLE replicator WITH REPLICATION LOGIN PASSWORD '$DB_REPLICATION_PASSWORD';
+EOSQL
+
+echo "host replication replicator all scram-sha-256" >> "$PGDATA/pg_hba.conf"
@@ -0,0 +1,14 @@
+#!/bin/sh
+# Streaming replica of the `db` service: clones it on first start, then runs as a hot standby.
+set -e
+
+if [ ! -s "$PGDATA/PG_VERSION" ]; then
+  until pg_basebackup -h "$PRIMARY_HOST" -U replicator -D "$PGDATA" -R -X stream; do
+    echo "Waiting for the primary..."
+    rm -rf "${PGDATA:?}"/*
+    sleep 2
+  done
+  chmod 0700 "$PGDATA"
+fi
+
+exec postgres
@@ -6,10 +6,26 @@ python manage.py wait_for_db
 
 echo "Applying migrations..."
 python manage.py migrate --noinput
+python manage.py createcachetable
 
 echo "Collecting static files..."
 python manage.py collectstatic --noinput
 
+echo "Preparing metrics directory..."
+export PROMETHEUS_MULTIPROC_DIR=${PROMETHEUS_MULTIPROC_DIR:-/tmp/prometheus}
+rm -rf "$PROMETHEUS_MULTIPROC_DIR"
+mkdir -p "$PROMETHEUS_MULTIPROC_DIR"
+
+if [ "${APP_SERVER:-uwsgi}" = "asgi" ]; then
+  exec uvicorn raktseva.asgi:application \
+    --app-dir /app \
+    --host 0.0.0.0 \
+    --port 9000 \
+    --workers "${ASGI_WORKERS:-4}" \
+    --proxy-headers \
+    --no-access-log
+fi
+
 uwsgi \
   --chdir /app \
   --socket :9000 \
@@ -0,0 +1,8 @@
+from django.conf import settings
+from raktseva.scheduler import job
+from .utils import purge_otp_audit_log
+
+
+@job(interval=settings.OTP_PURGE_INTERVAL)
+def purge_otps():
+    purge_otp_audit_log()
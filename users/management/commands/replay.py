@@ -0,0 +1,48 @@
+import glob
+import json
+from django.core.management.base import BaseCommand, CommandError
+from raktseva.replay import Replayer, ReplayActors, load_records
+
+
+class Command(BaseCommand):
+    help = 'Replays captured traffic (CAPTURE_ENABLED NDJSON files) against a seeded instance'
+
+    def add_arguments(self, parser):
+        parser.add_argument('files', nargs='+', help='Capture files or glob patterns.')
+        parser.add_argument('--base-url', default='http://127.0.0.1:8000',
+                            help='Instance to replay against; it must share this database.')
+        parser.add_argument('--speed', type=float, default=1.0,
+                            help='Multiple of the captured pace; 0 sends as fast as the workers allow.')
+        parser.add_argument('--concurrency', type=int, default=8, help='Concurrent client threads.')
+        parser.add_argument('--limit', type=int, help='Replay at most this many records.')
+        parser.add_argument('--seed', type=int, default=42, help='Random seed for picking users and ids.')
+        parser.add_argument('--output', help='Also write the summary as JSON to this file.')
+
+    def handle(self, *args, **options):
+        if options['speed'] < 0 or options['concurrency'] < 1:
+            raise CommandError("--speed must be >= 0 and --concurrency >= 1.")
+        paths = sorted({path for pattern in options['files'] for path in glob.glob(pattern)})
+        if not paths:
+            raise CommandError("No capture files matched.")
+        records = load_records(paths, options['limit'])
+        try:
+            actors = ReplayActors(seed=options['seed'])
+        except ValueError as exc:
+            raise CommandError(str(exc))
+
+        self.stdout.write(f"Replaying {len(records)} records from {len(paths)} file(s) against "
+                          f"{options['base_url']} at {options['speed']:g}x with {options['concurrency']} workers.")
+        summary = Replayer(options['base_url'], actors, options['speed'], options['concurrency']).run(records)
+
+        self.stdout.write(f"{'route':28} {'n':>6} {'p50':>8} {'p95':>8} {'p99':>8} {'errors':>6}  statuses")
+        for route, stats in summary['routes'].items():
+            statuses = ' '.join(f"{status}:{n}" for status, n in sorted(stats['statuses'].items()))
+            self.stdout.write(f"{route:28} {stats['n']:6} {stats['p50_ms']:8.2f} {stats['p95_ms']:8.2f} "
+                              f"{stats['p99_ms']:8.2f} {stats['errors']:6}  {statuses}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Sent {summary['sent']} requests in {summary['elapsed_s']}s ({summary['rps']} req/s), "
+            f"skipped {summary['skipped']}, max lag behind schedule {summary['max_lag_s']}s."
+        ))
+        if options['output']:
+            with open(options['output'], 'w') as fh:
+                json.dump(summary, fh, indent=2)
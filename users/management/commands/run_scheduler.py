@@ -0,0 +1,46 @@
+import json
+import signal
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from prometheus_client import start_http_server
+from raktseva.scheduler import Scheduler, autodiscover, run_job
+
+
+class Command(BaseCommand):
+    help = 'Runs the periodic maintenance jobs declared in <app>/jobs.py'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--job', action='append', dest='jobs', metavar='NAME',
+                            help='Only run this job (repeatable). Defaults to all jobs.')
+        parser.add_argument('--once', action='store_true', help='Run the selected jobs once and exit.')
+        parser.add_argument('--list', action='store_true', help='List the registered jobs and exit.')
+
+    def handle(self, *args, **options):
+        registry = autodiscover()
+        if options['list']:
+            for name, job in sorted(registry.items()):
+                self.stdout.write(f"{name}\tevery {job.interval:g}s")
+            return
+
+        names = options['jobs'] or sorted(registry)
+        unknown = [name for name in names if name not in registry]
+        if unknown:
+            raise CommandError(f"Unknown jobs: {', '.join(unknown)}")
+        jobs = [registry[name] for name in names]
+
+        if options['once']:
+            for job in jobs:
+                ran = run_job(job)
+                self.stdout.write(f"{job.name}: {'ran' if ran else 'skipped (locked)'}")
+        else:
+            if settings.SCHEDULER_METRICS_PORT:
+                start_http_server(settings.SCHEDULER_METRICS_PORT)
+            scheduler = Scheduler(jobs)
+            for sig in (signal.SIGINT, signal.SIGTERM):
+                signal.signal(sig, lambda *_: scheduler.stop())
+            self.stdout.write(f"Scheduler started with {len(jobs)} jobs.")
+            scheduler.run_forever()
+
+        metrics = {job.name: job.stats.as_dict() for job in jobs}
+        self.stdout.write(json.dumps(metrics, indent=2))
+        self.stdout.write(self.style.SUCCESS('Scheduler stopped.'))
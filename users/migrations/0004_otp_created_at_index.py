@@ -0,0 +1,18 @@
+# Generated by Django 4.2.20 on 2026-10-19 16:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0003_alter_user_options'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='otp',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, db_index=True),
+        ),
+    ]
@@ -38,11 +38,13 @@ class User(AbstractBaseUser, PermissionsMixin):
     class Meta:
         ordering = ['id']
 
-# OTP model
+OTP_LIFETIME = timedelta(minutes=10)
+
+# OTP audit log; live codes are kept in the cache (see users.utils.generate_otp)
 class OTP(models.Model):
     email = models.EmailField()
     code = models.CharField(max_length=6)
-    created_at = models.DateTimeField(auto_now_add=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
 
     def is_expired(self):
-        return self.created_at + timedelta(minutes=10) < timezone.now()
+        return self.created_at + OTP_LIFETIME < timezone.now()
@@ -1,32 +1,129 @@
-import random
+import secrets
+from asgiref.sync import sync_to_async
 from django.core.mail import send_mail
-from users.models import OTP
+from datetime import timedelta
+from django.core.cache import cache
+from django.utils import timezone
+from django.utils.crypto import constant_time_compare
+from users.models import OTP, OTP_LIFETIME
+from raktseva.mail import asend_mail
+from raktseva.metrics import external_call, cache_lookup
 from django.conf import settings
-import requests
+from city.models import City
+from city.utils import resolve_city
+from city import gazetteer
+from city.geocoding import get_async_geocoding_client, get_geocoding_client
+
+def otp_cache_key(email):
+    return f"otp:{email.lower()}"
+
+def otp_attempts_key(email):
+    return f"otp:attempts:{email.lower()}"
+
+OTP_SUBJECT = "RaktSeva OTP Verification"
+
+def store_otp(email):
+    """
+    Cache a fresh code for ``email`` (and audit it if OTP_AUDIT_LOG). Returns the code.
+    The wrong-guess counter is left alone, so resending does not buy more guesses.
+    """
+    code = f"{secrets.randbelow(1_000_000):06d}"
+    ttl = int(OTP_LIFETIME.total_seconds())
+    cache.set(otp_cache_key(email), code, ttl)
+    if settings.OTP_AUDIT_LOG:
+        OTP.objects.create(email=email, code=code)
+    return code
 
 def generate_otp(email):
-    code = f"{random.randint(100000, 999999)}"
-    OTP.objects.create(email=email, code=code)
+    code = store_otp(email)
+    with external_call('smtp'):
+        send_mail(OTP_SUBJECT, f"Your OTP code is {code}", settings.EMAIL_HOST_USER, [email])
+
+async def agenerate_otp(email):
+    """``generate_otp`` for async views; the mail goes out without blocking a thread."""
+    code = await sync_to_async(store_otp)(email)
+    with external_call('smtp'):
+        await asend_mail(OTP_SUBJECT, f"Your OTP code is {code}", settings.EMAIL_HOST_USER, [email])
+
+def verify_otp(email, code):
+    """
+    Check ``code`` against the cached OTP for ``email``. Returns ``"ok"``,
+    ``"invalid"``, ``"expired"`` (nothing cached) or ``"locked"`` once
+    ``OTP_MAX_ATTEMPTS`` wrong guesses burn the code. Guesses are counted per
+    email for OTP_LIFETIME from the first one, across resent codes.
+    """
+    expected = cache_lookup('otp', cache.get(otp_cache_key(email)))
+    if expected is None:
+        return "expired"
+    attempts_key = otp_attempts_key(email)
+    ttl = int(OTP_LIFETIME.total_seconds())
+    cache.add(attempts_key, 0, ttl)
+    try:
+        attempts = cache.incr(attempts_key)
+    except ValueError:
+        # The counter expired between add() and incr().
+        cache.set(attempts_key, 1, ttl)
+        attempts = 1
+    if attempts > settings.OTP_MAX_ATTEMPTS:
+        cache.delete(otp_cache_key(email))
+        return "locked"
+    if not constant_time_compare(expected, str(code)):
+        return "invalid"
+    cache.delete_many([otp_cache_key(email), attempts_key])
+    return "ok"
 
-    send_mail(
-        "RaktSeva OTP Verification",
-        f"Your OTP code is {code}",
-        settings.EMAIL_HOST_USER,
-        [email],
-    )
+def purge_otp_audit_log(batch_size=1000):
+    """Delete audit OTP rows older than OTP_AUDIT_RETENTION_DAYS in batches. Returns the number deleted."""
+    cutoff = timezone.now() - timedelta(days=settings.OTP_AUDIT_RETENTION_DAYS)
+    total = 0
+    while True:
+        ids = list(OTP.objects.filter(created_at__lt=cutoff).values_list('id', flat=True)[:batch_size])
+        if not ids:
+            return total
+        total += OTP.objects.filter(id__in=ids).delete()[0]
 
 def get_coordinates_from_city(city_name):
-    api_key = settings.GOOGLE_MAPS_API_KEY
-    endpoint = f"https://maps.googleapis.com/maps/api/geocode/json"
-    params = {
-        "address": city_name,
-        "key": api_key
-    }
-    response = requests.get(endpoint, params=params)
-    if response.status_code == 200:
-        results = response.json().get('results')
-        if results:
-            location = results[0]['geometry']['location']
-            return location['lat'], location['lng']
-    return None, None
+    """
+    Coordinates for a city: the canonical City row first, then the offline
+    gazetteer, and the Maps API only for names neither of them knows.
+    """
+    city, location = local_coordinates(city_name)
+    if location is None and not settings.GEOCODING_OFFLINE:
+        location = geocode_city(city_name)
+    return remember_coordinates(city, location)
+
+async def aget_coordinates_from_city(city_name):
+    """``get_coordinates_from_city`` that awaits the Maps API instead of blocking on it."""
+    city, location = await sync_to_async(local_coordinates)(city_name)
+    if location is None and not settings.GEOCODING_OFFLINE:
+        location = await get_async_geocoding_client().geocode(city_name)
+    return await sync_to_async(remember_coordinates)(city, location)
+
+def local_coordinates(city_name):
+    """``(city, location)`` from the City table and the gazetteer; ``location`` is None if neither knows it."""
+    city = resolve_city(city_name)
+    if city is not None and city.latitude is not None:
+        return city, (city.latitude, city.longitude)
+
+    location = gazetteer.lookup(city_name)
+    if location is None and city is not None:
+        location = gazetteer.lookup(city.name)
+    return city, location
+
+def remember_coordinates(city, location):
+    """Store newly found coordinates on the City row. Returns ``(latitude, longitude)``."""
+    latitude, longitude = location or (None, None)
+    if city is not None and latitude is not None and city.latitude is None:
+        City.objects.filter(pk=city.pk, latitude__isnull=True).update(latitude=latitude, longitude=longitude)
+        city.latitude, city.longitude = latitude, longitude
+    return latitude, longitude
+
+def geocode_city(city_name):
+    return get_geocoding_client().geocode(city_name)
 
+async def asave_with_coordinates(serializer, **kwargs):
+    """Save a donor/hospital serializer, geocoding a submitted ``city`` first without blocking."""
+    city = serializer.validated_data.get('city')
+    if city is not None:
+        kwargs['latitude'], kwargs['longitude'] = await aget_coordinates_from_city(city)
+    return await sync_to_async(serializer.save)(**kwargs)
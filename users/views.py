@@ -1,14 +1,17 @@
 # coding=utf-8
+from adrf import generics as async_generics
+from asgiref.sync import sync_to_async
 from rest_framework import generics, status
 from rest_framework.response import Response
 from .serializers import UserSerializer, OTPVerifySerializer, UserListSerializer, ResendOTPSerializer
-from .models import User, OTP
+from .models import User
 from rest_framework.views import APIView
 from rest_framework.permissions import IsAuthenticated, IsAdminUser, AllowAny
 from rest_framework.exceptions import ValidationError
-from .utils import generate_otp
+from .utils import agenerate_otp, verify_otp
+from raktseva.replicas import ReplicaReadMixin
 
-class RegisterView(generics.CreateAPIView):
+class RegisterView(async_generics.CreateAPIView):
     """
         Register a new user and send an OTP.
 
@@ -26,9 +29,9 @@ class RegisterView(generics.CreateAPIView):
     """
     serializer_class = UserSerializer
 
-    def perform_create(self, serializer):
-        user = serializer.save()
-        generate_otp(user.email)
+    async def perform_acreate(self, serializer):
+        user = await sync_to_async(serializer.save)()
+        await agenerate_otp(user.email)
 
 
 class VerifyOTPView(generics.GenericAPIView):
@@ -44,6 +47,7 @@ class VerifyOTPView(generics.GenericAPIView):
         Responses:
           - 200 OK: `{ "message": "OTP verified. You can now login." }`
           - 400 Bad Request: invalid or expired code
+          - 429 Too Many Requests: `OTP_MAX_ATTEMPTS` wrong codes; the code is discarded
     """
     serializer_class = OTPVerifySerializer
 
@@ -59,20 +63,21 @@ class VerifyOTPView(generics.GenericAPIView):
         if user.is_verified:
             return Response({"message": "User is already verified."}, status=status.HTTP_400_BAD_REQUEST)
 
-        try:
-            otp = OTP.objects.filter(email=email, code=code).latest('created_at')
-        except OTP.DoesNotExist:
+        result = verify_otp(email, code)
+        if result == "invalid":
             return Response({"message": "Invalid OTP"}, status=status.HTTP_400_BAD_REQUEST)
-
-        if otp.is_expired():
+        if result == "expired":
             return Response({"message": "OTP expired"}, status=status.HTTP_400_BAD_REQUEST)
+        if result == "locked":
+            return Response({"message": "Too many attempts. Request a new OTP."},
+                            status=status.HTTP_429_TOO_MANY_REQUESTS)
 
         user.is_verified = True
         user.save()
 
         return Response({"message": "OTP verified. You can now login."}, status=status.HTTP_200_OK)
 
-class ResendOTPView(generics.GenericAPIView):
+class ResendOTPView(async_generics.GenericAPIView):
     """
         Resend a new OTP to a user’s email.
 
@@ -87,12 +92,12 @@ class ResendOTPView(generics.GenericAPIView):
     """
     serializer_class = ResendOTPSerializer
 
-    def post(self, request):
+    async def post(self, request):
         serializer = self.get_serializer(data=request.data)
-        serializer.is_valid(raise_exception=True)
+        await sync_to_async(serializer.is_valid)(raise_exception=True)
 
         email = serializer.validated_data['email']
-        generate_otp(email)
+        await agenerate_otp(email)
 
         return Response({"message": "OTP resent to your email."})
 
@@ -120,7 +125,7 @@ class MeView(APIView):
         }
         return Response(data)
 
-class UserListView(generics.ListAPIView):
+class UserListView(ReplicaReadMixin, generics.ListAPIView):
     """
         List all registered users (admin-only).
 